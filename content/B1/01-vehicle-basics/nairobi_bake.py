@@ -0,0 +1,359 @@
+"""
+================================================================================
+  NAIROBI CITY MODEL — Lightmap Baker
+  NTSA B1 Driving Simulator — Cycles lighting for phones that can't afford it
+================================================================================
+  Bakes ambient occlusion and direct sun into one lightmap atlas per tile and
+  writes a GLB that carries them, so the web simulator can draw the static
+  city with unlit materials and still look close to the Cycles render.
+
+  1. Plan (plain Python). The static objects are split into the tiles of
+     nairobi_glb.tile_scene(); every face of a tile becomes a chart of its
+     atlas, laid out at one texel density by a shelf packer. The plan only
+     depends on seed, tile size and atlas size, so every process rebuilds it
+     and gets the same UVs.
+  2. Bake (Blender). One `blender -b` process per tile, several at once,
+     writes the plan's UVs as a `Lightmap` layer, bakes AO and the sun's
+     shadow for its objects against the whole city, and saves the atlas:
+        R  ambient occlusion
+        G  direct sun, shadow x max(0, N.L) with the face normal
+        B  sun shadow alone
+  3. Export (plain Python). nairobi_glb.py writes the city with TEXCOORD_1 on
+     baked meshes and each tile's atlas as their occlusionTexture; glTF
+     viewers pick up the AO, and materials[].extras.lightmap names the
+     channels. Props and coarser LOD levels are not baked.
+
+  USAGE:
+    python3 nairobi_bake.py                          # build, bake and export
+    python3 nairobi_bake.py --blend renders/nairobi_dusk.blend --lighting dusk
+    python3 nairobi_bake.py -j 8 --size 2048 --samples 128
+    python3 nairobi_bake.py --plan                   # atlas layout only
+    python3 nairobi_bake.py --export-only            # reuse baked atlases
+
+  Requires: Python 3.8+, NumPy, Blender 3.3+ (on PATH, $BLENDER or --blender)
+================================================================================
+"""
+
+import argparse
+import json
+import math
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)  # Blender runs this file without its directory on the path
+
+import nairobi_city_model as city
+import nairobi_glb
+import nairobi_render
+
+try:
+    import bpy
+except ImportError:
+    bpy = None
+
+TILE_SIZE = 100.0     # metres, as nairobi_glb.py --tiles
+ATLAS = 1024          # texels per side of a tile atlas
+BASE_ATLAS = 2048     # ground, river and the other objects wider than a tile
+PADDING = 2           # texels around every chart (and the bake margin)
+MAX_DENSITY = 16.0    # texels per metre
+AO_DISTANCE = 8.0     # metres
+LIGHTMAP_UV = 'Lightmap'
+DEFAULT_OUTPUT = os.path.join(HERE, 'lesson-01-town-simulation', 'nairobi_baked.glb')
+
+# ── Plan ─────────────────────────────────────────────────────────────────────
+#
+#  A chart is one face, flattened into its own plane: its first edge is the
+#  chart's u axis. Faces pointing down (box bottoms, the underside of the
+#  ground) are never seen and all share one 4 x 4 texel block, packed with
+#  the charts.
+
+def _face_charts(builder, loc):
+    """[(corner coords (k, 2) in metres, world normal)] per face of a MeshBuilder."""
+    verts = np.asarray(builder.verts, float) + loc
+    charts = []
+    for face in builder.faces:
+        p = verts[list(face)]
+        n = np.cross(p, np.roll(p, -1, axis=0)).sum(axis=0)  # Newell
+        n /= np.linalg.norm(n) or 1.0
+        u = p[1] - p[0]
+        u /= np.linalg.norm(u) or 1.0
+        v = np.cross(n, u)
+        charts.append((np.stack([(p - p[0]) @ u, (p - p[0]) @ v], axis=1), n))
+    return charts
+
+def _pack(sizes, side):
+    """Shelf-pack (w, h) texel rectangles into side x side: [(x, y)] or None."""
+    order = sorted(range(len(sizes)), key=lambda i: (-sizes[i][1], -sizes[i][0]))
+    spots, x, y, shelf = [None] * len(sizes), 0, 0, 0
+    for i in order:
+        w, h = sizes[i]
+        if x + w > side:
+            x, y, shelf = 0, y + shelf, 0
+        if y + h > side or w > side:
+            return None
+        spots[i] = (x, y)
+        x += w
+        shelf = max(shelf, h)
+    return spots
+
+def plan_tile(prims, side):
+    """
+    Lay out the faces of `prims` in one side x side atlas. Returns
+    {'size', 'density' (texels per metre), 'objects': {name: (corners, 2) UVs},
+     'charts': [(x0, y0, x1, y1, normal)]} with texel rectangles counted from
+    the bottom-left, as Blender stores images.
+    """
+    faces = []  # (object name, coords, normal, hidden)
+    for prim in prims:
+        builder = nairobi_glb.parts_builder(prim.parts)
+        for coords, normal in _face_charts(builder, prim.loc):
+            faces.append((prim.name, coords, normal, normal[2] < -0.9))
+    extent = [(np.ptp(c[:, 0]), np.ptp(c[:, 1])) for _, c, _, hidden in faces if not hidden]
+    area = sum(w * h for w, h in extent) or 1.0
+    density = min(MAX_DENSITY, math.sqrt(0.5 * side * side / area),
+                  (side - 2 * PADDING - 4) / max(max(e) for e in extent))
+
+    while True:
+        sizes = [(4, 4)] + [(math.ceil(w * density) + 2 * PADDING,
+                             math.ceil(h * density) + 2 * PADDING) for w, h in extent]
+        spots = _pack(sizes, side)
+        if spots:
+            break
+        density *= 0.9
+
+    objects, charts, k = {}, [], 1
+    hidden_uv = (np.array(spots[0]) + 2) / side  # the middle of the shared block
+    for name, coords, normal, hidden in faces:
+        if hidden:
+            uv = np.tile(hidden_uv, (len(coords), 1))
+        else:
+            (x, y), (w, h) = spots[k], sizes[k]
+            k += 1
+            lo = coords.min(axis=0)
+            uv = (np.array([x, y]) + PADDING + (coords - lo) * density) / side
+            charts.append((x, y, x + w, y + h, normal))
+        objects.setdefault(name, []).append(uv)
+    return {'size': side, 'density': density, 'charts': charts,
+            'objects': {name: np.concatenate(uvs).astype(np.float32)
+                        for name, uvs in objects.items()}}
+
+def plan_lightmaps(scene, tile_size=TILE_SIZE, size=ATLAS):
+    """{tile key: plan_tile()} for 'base' and every 'ix_iy' of nairobi_glb.tile_scene()."""
+    base, tiles, _ = nairobi_glb.tile_scene(scene, tile_size)
+    groups = {'base': (base, max(size, BASE_ATLAS))}
+    groups.update({f'{ix}_{iy}': (sub, size) for (ix, iy), sub in sorted(tiles.items())})
+    plan = {}
+    for key, (sub, side) in groups.items():
+        prims = [prim for col in sub.collections.values() for prim in col.primitives]
+        if prims:
+            plan[key] = plan_tile(prims, side)
+    return plan
+
+def sun_term(tile, to_sun):
+    """max(0, N.L) over a tile's atlas, face by face (rows bottom-up)."""
+    size = tile['size']
+    ndotl = np.zeros((size, size), np.float32)
+    for x0, y0, x1, y1, normal in tile['charts']:
+        ndotl[y0:y1, x0:x1] = max(0.0, float(np.dot(normal, to_sun)))
+    return ndotl
+
+# ── Orchestration ────────────────────────────────────────────────────────────
+
+def atlas_path(out_dir, key):
+    return os.path.join(out_dir, f'lightmap_{key}.png')
+
+def worker_command(blender, blend, key, args, threads=0):
+    """`blender -b` command that bakes tile `key` of `blend`."""
+    return [blender, '-b', blend, '--python-exit-code', '1', '-t', str(threads),
+            '-P', os.path.abspath(__file__), '--', '--worker', '--tile', key,
+            '--seed', str(args.seed), '--tile-size', str(args.tile_size),
+            '--size', str(args.size), '--samples', str(args.samples),
+            '--lightmaps', args.lightmaps]
+
+def bake_tiles(blender, blend, keys, args, jobs=1, log=print):
+    """Bake every tile in `keys`, `jobs` Blender processes at a time. Returns seconds."""
+    t0 = time.perf_counter()
+    os.makedirs(args.lightmaps, exist_ok=True)
+    threads = max(1, (os.cpu_count() or 1) // jobs)
+
+    def bake(key):
+        t = time.perf_counter()
+        subprocess.run(worker_command(blender, blend, key, args, threads),
+                       check=True, stdout=subprocess.DEVNULL)
+        return key, time.perf_counter() - t
+
+    with ThreadPoolExecutor(jobs) as pool:
+        times = dict(pool.map(bake, keys))
+    log(f"  {len(keys)} tiles on {jobs} process(es) x {threads} thread(s): "
+        f"slowest {max(times.values()):.1f} s ({max(times, key=times.get)}), "
+        f"sum {sum(times.values()):.1f} s")
+    return time.perf_counter() - t0
+
+def export_baked(path, plan, lightmap_dir, scene, batch=False, lighting='day'):
+    """Write `scene` to `path` with the baked atlases of `plan`. Returns the bytes."""
+    writer = nairobi_glb.GlbWriter()
+    lightmaps = {}
+    for key, tile in plan.items():
+        with open(atlas_path(lightmap_dir, key), 'rb') as f:
+            texture = writer.texture(f.read(), f'Lightmap_{key}')
+        for name, uvs in tile['objects'].items():
+            lightmaps[name] = (texture, uvs)
+    light = city.LIGHTING_PROFILES[lighting]
+    writer.gltf['asset']['extras'] = {'lightmap': {
+        'profile': lighting, 'sunColor': list(light['sun_color']),
+        'sunEnergy': light['sun_energy'], 'skyStrength': light['sky_strength']}}
+    data = nairobi_glb.write_scene(scene, writer, batch=batch, lightmaps=lightmaps).to_bytes()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return data
+
+# ── Blender Worker ───────────────────────────────────────────────────────────
+
+def bake_in_blender(args):
+    """Inside `blender -b`: bake one tile's atlas and write it as a PNG."""
+    scene = bpy.context.scene
+    plan = plan_lightmaps(city.describe_city(args.seed, None), args.tile_size, args.size)
+    tile = plan[args.tile]
+    size = tile['size']
+
+    city.setup_render('preview')
+    scene.cycles.samples = args.samples
+    scene.world.light_settings.distance = AO_DISTANCE
+    bake = scene.render.bake
+    bake.margin = PADDING
+    bake.use_clear = True
+    bake.use_selected_to_active = False
+
+    # The plan comes from describe_city(), so the .blend must hold the same
+    # objects: built with this seed and default densities, and not batched
+    missing = [name for name in tile['objects'] if name not in bpy.data.objects]
+    if missing:
+        raise RuntimeError(
+            f"tile {args.tile}: {len(missing)} of {len(tile['objects'])} planned objects "
+            f"are not in {bpy.data.filepath or 'the .blend'} (e.g. {', '.join(missing[:3])}); "
+            f"build it with --seed {args.seed}, default densities and no --batch-static")
+
+    # Each tile bakes into its own copies of the materials it uses
+    image = bpy.data.images.new(f'Lightmap_{args.tile}', size, size, float_buffer=True)
+    image.colorspace_settings.name = 'Non-Color'
+    copies, blank = {}, None
+    for obj in bpy.context.view_layer.objects:
+        obj.select_set(False)
+    for name, uvs in tile['objects'].items():
+        obj = bpy.data.objects[name]
+        layer = obj.data.uv_layers.new(name=LIGHTMAP_UV)
+        layer.data.foreach_set('uv', uvs.ravel())
+        obj.data.uv_layers.active = layer
+        if not obj.material_slots:
+            obj.data.materials.append(None)
+        for slot in obj.material_slots:
+            if slot.material is None:  # an empty slot has nowhere to put the bake target
+                blank = blank or bpy.data.materials.new('Lightmap_Blank')
+                slot.material = blank
+            if slot.material.name not in copies:
+                mat = copies[slot.material.name] = slot.material.copy()
+                mat.use_nodes = True
+                node = mat.node_tree.nodes.new('ShaderNodeTexImage')
+                node.image = image
+                mat.node_tree.nodes.active = node
+            slot.material = copies[slot.material.name]
+        obj.select_set(True)
+        bpy.context.view_layer.objects.active = obj
+
+    def bake_pass(kind):
+        bpy.ops.object.bake(type=kind, margin=PADDING, use_clear=True)
+        pixels = np.empty(size * size * 4, np.float32)
+        image.pixels.foreach_get(pixels)
+        return pixels.reshape(size, size, 4)[..., 0].copy()
+
+    ao = bake_pass('AO')
+    sun = None
+    for obj in bpy.data.objects:  # the shadow pass adds up every lamp: keep the sun only
+        if obj.type == 'LIGHT':
+            if obj.data.type == 'SUN':
+                sun = obj
+            else:
+                obj.hide_render = True
+    shadow = bake_pass('SHADOW')
+    to_sun = np.array(sun.matrix_world.col[2][:3]) if sun else np.array([0.0, 0.0, 1.0])
+    rgb = np.stack([ao, shadow * sun_term(tile, to_sun / np.linalg.norm(to_sun)), shadow],
+                   axis=-1)
+    nairobi_render.write_png(atlas_path(args.lightmaps, args.tile),
+                             (np.clip(rgb[::-1], 0, 1) * 255 + 0.5).astype(np.uint8))
+
+# ── CLI ──────────────────────────────────────────────────────────────────────
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else sys.argv[1:]
+    parser = argparse.ArgumentParser(description='Bake lightmaps for the Nairobi GLB.')
+    parser.add_argument('--blend', help='built city .blend (default: build one first)')
+    parser.add_argument('--lighting', choices=sorted(city.LIGHTING_PROFILES), default='day',
+                        help='lighting when building the .blend (default day)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('-o', '--output', default=DEFAULT_OUTPUT)
+    parser.add_argument('--lightmaps', default=os.path.join(HERE, 'lightmaps'),
+                        help='directory for the baked atlases')
+    parser.add_argument('--tile-size', type=float, default=TILE_SIZE)
+    parser.add_argument('--size', type=int, default=ATLAS, help='atlas texels per side')
+    parser.add_argument('--samples', type=int, default=64)
+    parser.add_argument('-j', '--jobs', type=int, default=min(os.cpu_count() or 1, 8),
+                        help='Blender processes at once')
+    parser.add_argument('--batch', action='store_true', help='one mesh per collection and tile')
+    parser.add_argument('--plan', action='store_true', help='print the atlas layout and stop')
+    parser.add_argument('--export-only', action='store_true',
+                        help='skip baking; export with the atlases already in --lightmaps')
+    parser.add_argument('--blender', default=os.environ.get('BLENDER', 'blender'))
+    # Used by the processes started above
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--tile', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    args.lightmaps = os.path.abspath(args.lightmaps)
+
+    if args.worker:
+        bake_in_blender(args)
+        return
+
+    t0 = time.perf_counter()
+    scene = city.describe_city(args.seed, None)
+    plan = plan_lightmaps(scene, args.tile_size, args.size)
+    print(f"Planned {len(plan)} atlases in {time.perf_counter() - t0:.2f} s")
+    if args.plan:
+        for key, tile in plan.items():
+            print(f"  {key:<6} {tile['size']:>5} px  {len(tile['objects']):4} objects  "
+                  f"{len(tile['charts']):5} charts  {tile['density']:5.2f} texels/m")
+        return
+
+    if not args.export_only:
+        if shutil.which(args.blender) is None:
+            parser.error(f"Blender not found at {args.blender!r}; set --blender or $BLENDER")
+        with tempfile.TemporaryDirectory(prefix='nairobi_blend_') as tmp:
+            blend = args.blend
+            if blend is None:
+                blend = os.path.join(tmp, 'nairobi.blend')
+                print(f"Building the city ({args.lighting})...")
+                nairobi_render.build_blend(args.blender, blend, args.lighting, args.seed)
+            seconds = bake_tiles(args.blender, os.path.abspath(blend), list(plan), args,
+                                 args.jobs)
+        print(f"Baked {len(plan)} atlases in {seconds:.1f} s -> {args.lightmaps}")
+
+    data = export_baked(args.output, plan, args.lightmaps, scene, args.batch, args.lighting)
+    with open(os.path.splitext(args.output)[0] + '.lightmaps.json', 'w') as f:
+        json.dump({'version': 1, 'seed': args.seed, 'lighting': args.lighting,
+                   'tileSize': args.tile_size,
+                   'tiles': {key: {'size': tile['size'], 'density': round(tile['density'], 3),
+                                   'objects': sorted(tile['objects'])}
+                             for key, tile in plan.items()}}, f, indent=1)
+    print(f"Wrote {args.output} ({len(data) / 1024:.1f} KiB)")
+
+if __name__ == "__main__":
+    main()
@@ -10,7 +10,17 @@
   4. Paste this entire script
   5. Click "Run Script" (▶) or press Alt+P
   6. The full Nairobi model will be generated in the 3D viewport
-  7. Optional: File > Export > glTF 2.0 (.glb) to use in the web simulator
+  7. Optional: File > Export > glTF 2.0 (.glb) to use in the web simulator,
+     or call export_glb('/path/to/nairobi.glb') to keep props GPU-instanced
+
+  WITHOUT BLENDER:
+  `python3 nairobi_city_model.py` builds the scene description only (layout,
+  primitives, prop instances, materials), checks it and prints a summary.
+  Needs NumPy (Blender ships its own).
+  Other exporters can `import nairobi_city_model` and call describe_city().
+
+  MESH BACKEND BENCHMARK (bpy.ops vs. the data API, instead of building):
+  blender -b --factory-startup -P nairobi_city_model.py -- --benchmark [N ...]
 
   FEATURES:
   • CBD streets modelled on actual Nairobi grid (Kenyatta Ave, Moi Ave, Tom Mboya)
@@ -26,114 +36,554 @@
 ================================================================================
 """
 
-import bpy
+import hashlib
+import json
 import math
+import os
 import random
-from mathutils import Vector, Euler
-
-random.seed(42)  # Deterministic build
+import sys
+import time
 
-# ── Utilities ────────────────────────────────────────────────────────────────
+import numpy as np  # bundled with Blender
 
-def clear_scene():
-    """Remove all default objects."""
-    bpy.ops.object.select_all(action='SELECT')
-    bpy.ops.object.delete(use_global=False)
-    for col in list(bpy.data.collections):
-        bpy.data.collections.remove(col)
-
-def new_collection(name):
-    col = bpy.data.collections.new(name)
-    bpy.context.scene.collection.children.link(col)
-    return col
+try:
+    import bpy
+except ImportError:  # plain CPython: scene description only
+    bpy = None
 
-def link_to(obj, collection):
-    collection.objects.link(obj)
-    if obj.name in bpy.context.scene.collection.objects:
-        bpy.context.scene.collection.objects.unlink(obj)
+# ── Scene Model ──────────────────────────────────────────────────────────────
+#
+#  The build_* functions never touch Blender. They append compact records to a
+#  CityScene: standalone primitives (a name, an origin and a few parametric
+#  parts), prop instances (a prototype key plus a transform) and the material
+#  definitions those parts reference. The Blender backend further down
+#  realises a CityScene with bpy; other exporters can read it directly.
+
+PALETTE_ATTRIBUTE = 'Col'
+
+class MaterialDef:
+    """PBR parameters of one material; `palette` takes colour from `Col`."""
+    __slots__ = ('key', 'name', 'color', 'roughness', 'metallic', 'emission',
+                 'alpha', 'specular', 'palette')
+
+    def __init__(self, name, color, roughness, metallic, emission, alpha,
+                 specular, palette=False):
+        self.name = name
+        self.color = tuple(color)
+        self.roughness = roughness
+        self.metallic = metallic
+        self.emission = tuple(emission) if emission else None
+        self.alpha = alpha
+        self.specular = specular
+        self.palette = palette
+        self.key = (palette, tuple(round(c, 4) for c in self.color), roughness,
+                    metallic, self.emission, alpha, specular)
+
+class Part:
+    """One parametric primitive, rotated then offset from its object origin."""
+    __slots__ = ('kind', 'args', 'material', 'rot', 'offset', 'color')
+
+    def __init__(self, kind, args, material, rot, offset, color):
+        self.kind = kind
+        self.args = args
+        self.material = material
+        self.rot = tuple(rot)
+        self.offset = tuple(offset)
+        self.color = color
+
+    def geometry(self):
+        """(verts, faces, uvs) before `rot` / `offset` are applied."""
+        return GEOMETRY[self.kind](*self.args)
+
+class PartList:
+    """Collects the Parts of one object or prototype; methods chain."""
+    __slots__ = ('parts',)
+
+    def __init__(self):
+        self.parts = []
+
+    def _add(self, kind, args, mat, rot, offset, color):
+        self.parts.append(Part(kind, args, mat, rot, offset, color))
+        return self
+
+    def box(self, dims, mat, rot=(0, 0, 0), offset=(0, 0, 0), color=None):
+        return self._add('box', (tuple(dims),), mat, rot, offset, color)
+
+    def cylinder(self, radius, depth, mat, verts=12, rot=(0, 0, 0),
+                 offset=(0, 0, 0), color=None):
+        return self._add('cylinder', (radius, depth, verts), mat, rot, offset, color)
+
+    def plane(self, size, mat, rot=(0, 0, 0), offset=(0, 0, 0), color=None):
+        return self._add('plane', (size,), mat, rot, offset, color)
+
+    def polygon(self, points, mat, rot=(0, 0, 0), offset=(0, 0, 0), color=None):
+        return self._add('polygon', (tuple(map(tuple, points)),), mat, rot, offset, color)
+
+    def ring(self, inner, outer, mat, segments=48, rot=(0, 0, 0),
+             offset=(0, 0, 0), color=None):
+        return self._add('ring', (inner, outer, segments), mat, rot, offset, color)
+
+    def icosphere(self, radius, mat, subdivisions=2, rot=(0, 0, 0),
+                  offset=(0, 0, 0), color=None):
+        return self._add('icosphere', (radius, subdivisions), mat, rot, offset, color)
+
+class Primitive:
+    """A standalone object: its own parts around origin `loc`."""
+    __slots__ = ('name', 'loc', 'parts')
+
+    def __init__(self, name, loc, parts):
+        self.name = name
+        self.loc = tuple(loc)
+        self.parts = parts
+
+class Instance:
+    """A placement of a shared prop prototype."""
+    __slots__ = ('name', 'key', 'loc', 'rot_z', 'scale')
+
+    def __init__(self, name, key, loc, rot_z=0.0, scale=1.0):
+        self.name = name
+        self.key = key
+        self.loc = tuple(loc)
+        self.rot_z = rot_z
+        self.scale = scale
+
+class LodChain:
+    """
+    Coarser stand-ins for a group of primitives (a building and its roof,
+    glass and rooftop plant). The members are the full-detail level; each
+    entry of `levels` is (distance, parts) around `loc`, shown from `distance`
+    metres onwards. Blender renders the members; nairobi_glb.py exports the
+    whole chain.
+    """
+    __slots__ = ('name', 'loc', 'members', 'levels')
+
+    def __init__(self, name, loc, members, levels):
+        self.name = name
+        self.loc = tuple(loc)
+        self.members = members
+        self.levels = levels
+
+class CollectionDef:
+    __slots__ = ('name', 'scene', 'primitives', 'instances', 'lods')
+
+    def __init__(self, name, scene):
+        self.name = name
+        self.scene = scene
+        self.primitives = []
+        self.instances = []
+        self.lods = []
+
+    def add(self, name, loc, parts):
+        prim = Primitive(name, loc, parts.parts)
+        self.primitives.append(prim)
+        return prim
+
+def local_bounds(parts):
+    """Object-space AABB ((min x, y, z), (max x, y, z)) of a list of Parts."""
+    lo, hi = [math.inf] * 3, [-math.inf] * 3
+    for part in parts:
+        verts = transform_verts(part.geometry()[0], part.rot, part.offset)
+        for k in range(3):
+            lo[k] = min(lo[k], min(v[k] for v in verts))
+            hi[k] = max(hi[k], max(v[k] for v in verts))
+    return tuple(lo), tuple(hi)
+
+def placed_bounds(bounds, loc, rot_z=0.0, scale=1.0):
+    """World AABB of object-space `bounds` scaled, turned about Z and moved."""
+    (x0, y0, z0), (x1, y1, z1) = bounds
+    c, s = math.cos(rot_z), math.sin(rot_z)
+    xs = [scale * (c * x - s * y) for x in (x0, x1) for y in (y0, y1)]
+    ys = [scale * (s * x + c * y) for x in (x0, x1) for y in (y0, y1)]
+    lx, ly, lz = loc
+    return ((lx + min(xs), ly + min(ys), lz + scale * z0),
+            (lx + max(xs), ly + max(ys), lz + scale * z1))
+
+class CityScene:
+    """Everything the generator produces, as plain Python records."""
+    __slots__ = ('collections', 'prototypes', 'prototype_lods', 'roads', 'density',
+                 '_proto_bounds')
+
+    def __init__(self, density=None):
+        self.collections = {}
+        self.prototypes = {}
+        self.prototype_lods = {}
+        self.roads = RoadNetwork()
+        self.density = dict(density or {})
+        self._proto_bounds = {}
+
+    # Density multipliers ('vegetation', 'ground', 'furniture', 'vehicles')
+    # scale how many scattered objects the stages place; 1.0 is the full city.
+
+    def scaled(self, key, n):
+        """`n` scaled by the density multiplier for `key`."""
+        return max(0, round(n * self.density.get(key, 1.0)))
+
+    def row(self, key, start, stop, step):
+        """range(start, stop, step), resampled evenly over the same span when
+        the density for `key` is not 1."""
+        full = list(range(start, stop, step))
+        n = self.scaled(key, len(full))
+        if n == len(full) or n < 2:
+            return full[:n]
+        return [full[0] + k * (full[-1] - full[0]) / (n - 1) for k in range(n)]
+
+    def thin(self, key, items):
+        """An evenly spread subset of fixed `items` (never more than all)."""
+        n = min(len(items), self.scaled(key, len(items)))
+        return [items[int(k * len(items) / n)] for k in range(n)]
+
+    def bounds(self, obj):
+        """World AABB of a Primitive or Instance."""
+        if isinstance(obj, Instance):
+            if obj.key not in self._proto_bounds:
+                self._proto_bounds[obj.key] = local_bounds(self.prototypes[obj.key])
+            return placed_bounds(self._proto_bounds[obj.key], obj.loc, obj.rot_z, obj.scale)
+        return placed_bounds(local_bounds(obj.parts), obj.loc)
+
+    def merge(self, other):
+        """Append another scene's output (one build stage's) to this one."""
+        for name, col in other.collections.items():
+            mine = self.collection(name)
+            mine.primitives += col.primitives
+            mine.instances += col.instances
+            mine.lods += col.lods
+        for key, parts in other.prototypes.items():
+            self.prototypes.setdefault(key, parts)
+        for key, levels in other.prototype_lods.items():
+            self.prototype_lods.setdefault(key, levels)
+        for field in RoadNetwork.__slots__:
+            getattr(self.roads, field).extend(getattr(other.roads, field))
+
+    def digest(self):
+        """Content hash of every record in the scene, stable across processes."""
+        def flat(parts):
+            return [(p.kind, p.args, p.material.name, p.material.key, p.rot, p.offset,
+                     p.color) for p in parts]
+
+        h = hashlib.sha256()
+        for name, col in self.collections.items():
+            h.update(repr((
+                name,
+                [(p.name, p.loc, flat(p.parts)) for p in col.primitives],
+                [(i.name, i.key, i.loc, i.rot_z, i.scale) for i in col.instances],
+                [(c.name, c.loc, [m.name for m in c.members],
+                  [(d, flat(parts)) for d, parts in c.levels]) for c in col.lods],
+            )).encode())
+        for key in sorted(self.prototypes):
+            h.update(repr((key, flat(self.prototypes[key]),
+                           [(d, flat(parts)) for d, parts in self.prototype_lods.get(key, [])],
+                           )).encode())
+        roads = self.roads
+        h.update(repr(([(r.name, r.start, r.end, r.width, r.speed) for r in roads.roads],
+                       roads.roundabouts, roads.signals, roads.signs)).encode())
+        return h.hexdigest()
+
+    def collection(self, name):
+        if name not in self.collections:
+            self.collections[name] = CollectionDef(name, self)
+        return self.collections[name]
+
+    def materials(self):
+        """Distinct MaterialDefs in use, keyed by shader parameters."""
+        found = {}
+        part_lists = [p.parts for c in self.collections.values() for p in c.primitives]
+        part_lists += list(self.prototypes.values())
+        part_lists += [parts for c in self.collections.values()
+                       for chain in c.lods for _, parts in chain.levels]
+        part_lists += [parts for levels in self.prototype_lods.values()
+                       for _, parts in levels]
+        for parts in part_lists:
+            for part in parts:
+                found.setdefault(part.material.key, part.material)
+        return found
+
+    def summary(self):
+        cols = self.collections.values()
+        return {
+            'collections': len(self.collections),
+            'primitives': sum(len(c.primitives) for c in cols),
+            'instances': sum(len(c.instances) for c in cols),
+            'prototypes': len(self.prototypes),
+            'lod_chains': sum(len(c.lods) for c in cols) + len(self.prototype_lods),
+            'parts': sum(len(p.parts) for c in cols for p in c.primitives)
+                     + sum(len(parts) for parts in self.prototypes.values()),
+            'materials': len(self.materials()),
+        }
+
+    def check(self, extent=300.0):
+        """List layout problems; empty when the city is consistent."""
+        problems, seen = [], set()
+        for col in self.collections.values():
+            for obj in col.primitives + col.instances:
+                if obj.name in seen:
+                    problems.append(f"duplicate object name '{obj.name}'")
+                seen.add(obj.name)
+                if abs(obj.loc[0]) > extent or abs(obj.loc[1]) > extent:
+                    problems.append(f"'{obj.name}' lies outside the ground plane")
+            for inst in col.instances:
+                if inst.key not in self.prototypes:
+                    problems.append(f"'{inst.name}' uses unknown prop '{inst.key}'")
+        return problems
 
 def make_material(name, color, roughness=0.7, metallic=0.0,
                   emission=None, alpha=1.0, specular=0.5):
-    mat = bpy.data.materials.new(name=name)
-    mat.use_nodes = True
-    nodes = mat.node_tree.nodes
-    links = mat.node_tree.links
-    nodes.clear()
+    return MaterialDef(name, color, roughness, metallic, emission, alpha, specular)
 
-    output = nodes.new('ShaderNodeOutputMaterial')
-    output.location = (400, 0)
-
-    bsdf = nodes.new('ShaderNodeBsdfPrincipled')
-    bsdf.location = (0, 0)
-    bsdf.inputs['Base Color'].default_value = (*color, 1.0)
-    bsdf.inputs['Roughness'].default_value = roughness
-    bsdf.inputs['Metallic'].default_value = metallic
-    bsdf.inputs['Specular IOR Level'].default_value = specular if 'Specular IOR Level' in bsdf.inputs else 0
-    if 'Specular' in bsdf.inputs:
-        bsdf.inputs['Specular'].default_value = specular
-    if alpha < 1.0:
-        bsdf.inputs['Alpha'].default_value = alpha
-        mat.blend_method = 'BLEND'
-
-    if emission:
-        bsdf.inputs['Emission Color'].default_value = (*emission, 1.0) if 'Emission Color' in bsdf.inputs else None
-        if 'Emission' in bsdf.inputs:
-            bsdf.inputs['Emission'].default_value = (*emission, 1.0)
-        bsdf.inputs['Emission Strength'].default_value = 3.0
-
-    links.new(bsdf.outputs['BSDF'], output.inputs['Surface'])
-    return mat
+def make_palette_material(name, roughness=0.7, metallic=0.0, specular=0.5):
+    """Shared material coloured per object through the `Col` attribute."""
+    return MaterialDef(name, (1.0, 1.0, 1.0), roughness, metallic, None, 1.0,
+                       specular, palette=True)
 
 def add_box(name, loc, dims, mat, collection, rot=(0,0,0), cast_shadow=True):
     """Create a UV-unwrapped box mesh."""
-    bpy.ops.mesh.primitive_cube_add(size=1, location=loc)
-    obj = bpy.context.active_object
-    obj.name = name
-    obj.scale = dims
-    obj.rotation_euler = Euler(rot)
-    bpy.ops.object.transform_apply(scale=True, rotation=True)
-    if obj.data.materials:
-        obj.data.materials[0] = mat
-    else:
-        obj.data.materials.append(mat)
-    obj.cycles.use_shadow_catcher = False
-    link_to(obj, collection)
-    return obj
+    return collection.add(name, loc, PartList().box(dims, mat, rot))
 
 def add_cylinder(name, loc, radius, depth, mat, collection, rot=(0,0,0), verts=12):
-    bpy.ops.mesh.primitive_cylinder_add(vertices=verts, radius=radius,
-                                         depth=depth, location=loc)
-    obj = bpy.context.active_object
-    obj.name = name
-    obj.rotation_euler = Euler(rot)
-    bpy.ops.object.transform_apply(rotation=True)
-    if obj.data.materials:
-        obj.data.materials[0] = mat
-    else:
-        obj.data.materials.append(mat)
-    link_to(obj, collection)
-    return obj
+    return collection.add(name, loc, PartList().cylinder(radius, depth, mat, verts, rot))
 
-def add_plane(name, loc, size, mat, collection, rot=(math.pi/2, 0, 0)):
-    bpy.ops.mesh.primitive_plane_add(size=size, location=loc)
-    obj = bpy.context.active_object
-    obj.name = name
-    obj.rotation_euler = Euler(rot)
-    bpy.ops.object.transform_apply(rotation=True)
-    if obj.data.materials:
-        obj.data.materials[0] = mat
-    else:
-        obj.data.materials.append(mat)
-    link_to(obj, collection)
-    return obj
+def add_plane(name, loc, size, mat, collection, rot=(0, 0, 0)):
+    return collection.add(name, loc, PartList().plane(size, mat, rot))
+
+def add_polygon(name, loc, points, mat, collection):
+    return collection.add(name, loc, PartList().polygon(points, mat))
+
+def add_ring(name, loc, inner, outer, mat, collection, segments=48):
+    return collection.add(name, loc, PartList().ring(inner, outer, mat, segments))
+
+def add_icosphere(name, loc, radius, mat, collection, subdivisions=2):
+    return collection.add(name, loc, PartList().icosphere(radius, mat, subdivisions))
+
+def add_lod(name, loc, members, levels, collection):
+    """
+    Give the primitives in `members` coarser levels; `levels` holds
+    (distance, PartList) pairs, nearest first, with parts around `loc`.
+    """
+    chain = LodChain(name, loc, list(members),
+                     [(distance, parts.parts) for distance, parts in levels])
+    collection.lods.append(chain)
+    return chain
+
+def add_instance(name, key, build, loc, collection, rot_z=0.0, scale=1.0, lods=()):
+    """
+    Place an instance of prop variant `key`. Repeated props (trees, lampposts,
+    matatus, traffic lights, stalls) are described once per variant around the
+    prop's ground point; `build(parts)` fills a PartList with that prototype
+    and only runs the first time `key` is requested, so it must depend on
+    nothing but the variant itself. `lods` holds (distance, build) pairs for
+    coarser versions of the prototype, built the same way.
+    """
+    scene = collection.scene
+    prototypes = scene.prototypes
+    if key not in prototypes:
+        parts = PartList()
+        build(parts)
+        prototypes[key] = parts.parts
+        if lods:
+            scene.prototype_lods[key] = []
+            for distance, build_level in lods:
+                level = PartList()
+                build_level(level)
+                scene.prototype_lods[key].append((distance, level.parts))
+    inst = Instance(name, key, loc, rot_z, scale)
+    collection.instances.append(inst)
+    return inst
+
+# ── Geometry ─────────────────────────────────────────────────────────────────
+#
+#  Primitives are generated as plain vertex / face / UV lists, and the Blender
+#  backend writes them straight into bpy.data.meshes. No operator runs per
+#  object, so there is no active-object juggling, no transform_apply and no
+#  depsgraph update or undo push for each of the thousands of parts in the city.
+#
+#  Every generator returns (verts, faces, uvs) centred on the origin; `uvs`
+#  holds one (u, v) per face corner, in face order.
+
+def euler_matrix(rot):
+    """3x3 rotation matrix for an XYZ Euler (Blender's default order)."""
+    rx, ry, rz = rot
+    cx, sx = math.cos(rx), math.sin(rx)
+    cy, sy = math.cos(ry), math.sin(ry)
+    cz, sz = math.cos(rz), math.sin(rz)
+    return ((cz * cy, cz * sy * sx - sz * cx, cz * sy * cx + sz * sx),
+            (sz * cy, sz * sy * sx + cz * cx, sz * sy * cx - cz * sx),
+            (-sy,     cy * sx,                cy * cx))
+
+def transform_verts(verts, rot=(0, 0, 0), offset=(0, 0, 0)):
+    """Rotate `verts` about the origin, then translate them by `offset`."""
+    ox, oy, oz = offset
+    if not any(rot):
+        return [(x + ox, y + oy, z + oz) for x, y, z in verts]
+    (a, b, c), (d, e, f), (g, h, i) = euler_matrix(rot)
+    return [(a * x + b * y + c * z + ox,
+             d * x + e * y + f * z + oy,
+             g * x + h * y + i * z + oz) for x, y, z in verts]
+
+def box_geometry(dims):
+    hx, hy, hz = dims[0] / 2, dims[1] / 2, dims[2] / 2
+    verts = [(-hx, -hy, -hz), (hx, -hy, -hz), (hx, hy, -hz), (-hx, hy, -hz),
+             (-hx, -hy,  hz), (hx, -hy,  hz), (hx, hy,  hz), (-hx, hy,  hz)]
+    faces = [(0, 3, 2, 1), (4, 5, 6, 7), (0, 1, 5, 4),
+             (1, 2, 6, 5), (2, 3, 7, 6), (3, 0, 4, 7)]
+    uvs = [(0, 0), (1, 0), (1, 1), (0, 1)] * 6
+    return verts, faces, uvs
+
+def plane_geometry(size):
+    """Flat XY quad; `size` is a side length or a (width, length) pair."""
+    w, l = (size, size) if isinstance(size, (int, float)) else size
+    hw, hl = w / 2, l / 2
+    verts = [(-hw, -hl, 0), (hw, -hl, 0), (hw, hl, 0), (-hw, hl, 0)]
+    return verts, [(0, 1, 2, 3)], [(0, 0), (1, 0), (1, 1), (0, 1)]
+
+def polygon_geometry(points):
+    """
+    Flat polygon in the XY plane, corners counter-clockwise. Exporters fan it
+    from the first corner, so every other corner must be in view of that one.
+    """
+    xs, ys = [x for x, _ in points], [y for _, y in points]
+    x0, y0 = min(xs), min(ys)
+    span = max(max(xs) - x0, max(ys) - y0) or 1.0
+    verts = [(x, y, 0) for x, y in points]
+    uvs = [((x - x0) / span, (y - y0) / span) for x, y in points]
+    return verts, [tuple(range(len(points)))], uvs
+
+def cylinder_geometry(radius, depth, verts=12):
+    n, hz = verts, depth / 2
+    ring = [(radius * math.cos(2 * math.pi * i / n),
+             radius * math.sin(2 * math.pi * i / n)) for i in range(n)]
+    vs = [(x, y, -hz) for x, y in ring] + [(x, y, hz) for x, y in ring]
+    faces, uvs = [], []
+    for i in range(n):
+        j = (i + 1) % n
+        faces.append((i, j, n + j, n + i))
+        uvs += [(i / n, 0), ((i + 1) / n, 0), ((i + 1) / n, 1), (i / n, 1)]
+    cap_uv = [(0.5 + 0.5 * x / radius, 0.5 + 0.5 * y / radius) for x, y in ring]
+    faces.append(tuple(range(n, 2 * n)))
+    uvs += cap_uv
+    faces.append(tuple(range(n - 1, -1, -1)))
+    uvs += cap_uv[::-1]
+    return vs, faces, uvs
+
+def ring_geometry(inner, outer, segments=48):
+    """Flat annulus in the XY plane (roundabout carriageway)."""
+    n = segments
+    dirs = [(math.cos(2 * math.pi * i / n), math.sin(2 * math.pi * i / n))
+            for i in range(n)]
+    verts = [(inner * c, inner * s, 0) for c, s in dirs] + \
+            [(outer * c, outer * s, 0) for c, s in dirs]
+    faces, uvs = [], []
+    for i in range(n):
+        j = (i + 1) % n
+        faces.append((i, n + i, n + j, j))
+        for k in faces[-1]:
+            x, y, _ = verts[k]
+            uvs.append((0.5 + 0.5 * x / outer, 0.5 + 0.5 * y / outer))
+    return verts, faces, uvs
+
+def icosphere_geometry(radius, subdivisions=2):
+    """Icosphere matching primitive_ico_sphere_add (1 = bare icosahedron)."""
+    t = (1 + 5 ** 0.5) / 2
+    base = [(-1, t, 0), (1, t, 0), (-1, -t, 0), (1, -t, 0),
+            (0, -1, t), (0, 1, t), (0, -1, -t), (0, 1, -t),
+            (t, 0, -1), (t, 0, 1), (-t, 0, -1), (-t, 0, 1)]
+    verts = []
+    for x, y, z in base:
+        k = 1 / math.sqrt(x * x + y * y + z * z)
+        verts.append((x * k, y * k, z * k))
+    faces = [(0, 11, 5), (0, 5, 1), (0, 1, 7), (0, 7, 10), (0, 10, 11),
+             (1, 5, 9), (5, 11, 4), (11, 10, 2), (10, 7, 6), (7, 1, 8),
+             (3, 9, 4), (3, 4, 2), (3, 2, 6), (3, 6, 8), (3, 8, 9),
+             (4, 9, 5), (2, 4, 11), (6, 2, 10), (8, 6, 7), (9, 8, 1)]
+    for _ in range(subdivisions - 1):
+        midpoints = {}
+
+        def midpoint(a, b):
+            key = (a, b) if a < b else (b, a)
+            if key not in midpoints:
+                x, y, z = (verts[a][k] + verts[b][k] for k in range(3))
+                m = 1 / math.sqrt(x * x + y * y + z * z)
+                verts.append((x * m, y * m, z * m))
+                midpoints[key] = len(verts) - 1
+            return midpoints[key]
+
+        split = []
+        for a, b, c in faces:
+            ab, bc, ca = midpoint(a, b), midpoint(b, c), midpoint(c, a)
+            split += [(a, ab, ca), (b, bc, ab), (c, ca, bc), (ab, bc, ca)]
+        faces = split
+    uvs = []
+    for f in faces:
+        for k in f:
+            x, y, z = verts[k]
+            uvs.append((0.5 + math.atan2(y, x) / (2 * math.pi),
+                        0.5 + math.asin(max(-1.0, min(1.0, z))) / math.pi))
+    return [(x * radius, y * radius, z * radius) for x, y, z in verts], faces, uvs
+
+GEOMETRY = {
+    'box': box_geometry,
+    'plane': plane_geometry,
+    'polygon': polygon_geometry,
+    'cylinder': cylinder_geometry,
+    'ring': ring_geometry,
+    'icosphere': icosphere_geometry,
+}
+
+class MeshBuilder:
+    """
+    Collects primitive geometry in bulk and writes it into one mesh datablock
+    through from_pydata / foreach_set. Parts may use different materials; each
+    distinct material becomes a slot and faces carry the matching index.
+
+    `color` tints a part for palette materials: one (r, g, b) for the whole
+    part, or one per face corner. Uncoloured parts are stored as white.
+    """
+
+    def __init__(self):
+        self.verts = []
+        self.faces = []
+        self.uvs = []
+        self.colors = None
+        self.face_materials = []
+        self.materials = []
+
+    def add(self, geom, mat, rot=(0, 0, 0), offset=(0, 0, 0), color=None):
+        verts, faces, uvs = geom
+        base = len(self.verts)
+        self.verts.extend(transform_verts(verts, rot, offset))
+        self.faces.extend(tuple(base + k for k in f) for f in faces)
+        if color is not None and self.colors is None:
+            self.colors = [(1.0, 1.0, 1.0)] * len(self.uvs)
+        if self.colors is not None:
+            if color is None or isinstance(color[0], (int, float)):
+                self.colors.extend([tuple(color or (1.0, 1.0, 1.0))] * len(uvs))
+            else:
+                self.colors.extend(color)
+        self.uvs.extend(uvs)
+        if mat not in self.materials:
+            self.materials.append(mat)
+        self.face_materials.extend([self.materials.index(mat)] * len(faces))
+        return self
+
+    def to_mesh(self, name):
+        mesh = bpy.data.meshes.new(name)
+        mesh.from_pydata(self.verts, [], self.faces)
+        uv_layer = mesh.uv_layers.new(name='UVMap')
+        uv_layer.data.foreach_set('uv', [c for uv in self.uvs for c in uv])
+        if self.colors is not None:
+            attr = mesh.color_attributes.new(PALETTE_ATTRIBUTE, 'FLOAT_COLOR', 'CORNER')
+            attr.data.foreach_set('color', [c for rgb in self.colors for c in (*rgb, 1.0)])
+        for mat in self.materials:
+            mesh.materials.append(mat)
+        mesh.polygons.foreach_set('material_index', self.face_materials)
+        mesh.update()
+        return mesh
 
 # ── Master Collections ────────────────────────────────────────────────────────
 
-def setup_collections():
+def setup_collections(scene):
     cols = {}
     for name in ['Ground', 'Roads', 'Buildings', 'Landmarks', 'Vegetation',
                  'Traffic', 'Vehicles', 'Street_Furniture', 'Sky', 'Water']:
-        cols[name] = new_collection(name)
+        cols[name] = scene.collection(name)
     return cols
 
 # ── Materials Library ─────────────────────────────────────────────────────────
@@ -211,26 +661,165 @@ def setup_materials():
     M['bench']        = make_material('M_Bench',      (0.35, 0.22, 0.10), roughness=0.88)
     M['matatu_body']  = make_material('M_Matatu',     (0.90, 0.90, 0.90), roughness=0.5)
     M['matatu_stripe']= make_material('M_MatatuStripe',(0.70, 0.05, 0.05), roughness=0.5)
-    M['stall_fabric'] = make_material('M_StallFabric',(0.80, 0.30, 0.10), roughness=0.97)
+    M['stall_fabric'] = make_palette_material('M_StallFabric', roughness=0.97)
+    M['car_paint']    = make_palette_material('M_CarPaint',    roughness=0.35, metallic=0.05)
     M['river']        = make_material('M_River',      (0.18, 0.35, 0.28), roughness=0.05,
                                       metallic=0.1, alpha=0.75)
     M['sidewalk']     = make_material('M_Sidewalk',   (0.72, 0.70, 0.65), roughness=0.88)
 
     return M
 
+# ── Scatter Placement ────────────────────────────────────────────────────────
+#
+#  Scattered props (park trees, laterite patches) are blue-noise samples: no
+#  two closer than a spacing, none on a road, pavement, building or the river.
+#  Those footprints come from describing the layout stages on their own, so a
+#  scatter stage stays independent of what else was built, and sit in a
+#  spatial hash whose cells list every footprint within reach. Sampling is
+#  parallel dart throwing on a grid of spacing/√2 cells (at most one sample
+#  each): cells three apart can't conflict, so each of nine phases throws one
+#  dart into every empty cell of its lattice at once and tests the 5×5
+#  neighbourhood and the footprints as whole arrays.
+
+FOOTPRINT_STAGES = ['build_roads', 'build_cbd_buildings', 'build_kicc',
+                    'build_times_tower', 'build_parliament', 'build_river']
+FOOTPRINT_COLLECTIONS = ('Roads', 'Buildings', 'Landmarks', 'Water')
+
+class FootprintIndex:
+    """Ground rectangles (x0, y0, x1, y1) in a uniform spatial hash."""
+
+    def __init__(self, rects, cell=8.0, reach=20.0):
+        self.cell, self.reach = cell, reach
+        rects = np.asarray(rects, float).reshape(-1, 4)
+        # Padding entries (-1) pick the last row, a rectangle at infinity
+        self.rects = np.vstack([rects, np.full((1, 4), np.inf)])
+        if not len(rects):
+            self.origin, self.shape = np.zeros(2, int), (1, 1)
+            self.table = np.full((1, 1), -1)
+            return
+        lo = np.floor((rects[:, :2] - reach) / cell).astype(int)
+        hi = np.floor((rects[:, 2:] + reach) / cell).astype(int)
+        self.origin = lo.min(axis=0)
+        self.shape = tuple(hi.max(axis=0) - self.origin + 1)
+        buckets = [[] for _ in range(self.shape[0] * self.shape[1])]
+        for i, ((ax, ay), (bx, by)) in enumerate(zip(lo - self.origin, hi - self.origin)):
+            for cx in range(ax, bx + 1):
+                for cy in range(ay, by + 1):
+                    buckets[cx * self.shape[1] + cy].append(i)
+        self.table = np.full((len(buckets), max(map(len, buckets))), -1)
+        for k, bucket in enumerate(buckets):
+            self.table[k, :len(bucket)] = bucket
+
+    def extended(self, rects):
+        """A new index holding these footprints and `rects`."""
+        return FootprintIndex(np.vstack([self.rects[:-1], np.reshape(rects, (-1, 4))]),
+                              self.cell, self.reach)
+
+    def clearance(self, points):
+        """Distance from each (x, y) in `points` to the nearest footprint:
+        0 inside one, capped at `reach`."""
+        points = np.asarray(points, float).reshape(-1, 2)
+        cells = np.floor(points / self.cell).astype(int) - self.origin
+        inside = ((cells >= 0) & (cells < self.shape)).all(axis=1)
+        cells = np.clip(cells, 0, np.array(self.shape) - 1)
+        rects = self.rects[self.table[cells[:, 0] * self.shape[1] + cells[:, 1]]]
+        px, py = points[:, :1], points[:, 1:]
+        with np.errstate(invalid='ignore'):
+            dx = np.maximum(np.maximum(rects[..., 0] - px, px - rects[..., 2]), 0)
+            dy = np.maximum(np.maximum(rects[..., 1] - py, py - rects[..., 3]), 0)
+        gap = np.sqrt((dx * dx + dy * dy).min(axis=1))
+        return np.where(inside, np.minimum(gap, self.reach), self.reach)
+
+_layout_index = []
+
+def layout_footprints():
+    """
+    FootprintIndex of every ground-level object of FOOTPRINT_STAGES. Nothing
+    those stages draw from their generators moves a footprint, so the index
+    is the same for every seed and is built once per process.
+    """
+    if not _layout_index:
+        scene = describe_city(0, None, FOOTPRINT_STAGES)
+        rects = []
+        for name in FOOTPRINT_COLLECTIONS:
+            for prim in scene.collections[name].primitives:
+                (x0, y0, z0), (x1, y1, _) = scene.bounds(prim)
+                if z0 < 1.0:
+                    rects.append((x0, y0, x1, y1))
+        # Lane markings, kerbs and glazing lie inside a bigger footprint
+        r = np.unique(np.array(rects), axis=0)
+        inside = ((r[:, None, :2] >= r[None, :, :2]) & (r[:, None, 2:] <= r[None, :, 2:])
+                  ).all(axis=2)
+        np.fill_diagonal(inside, False)
+        _layout_index.append(FootprintIndex(r[~inside.any(axis=1)]))
+    return _layout_index[0]
+
+def scatter(rng, area, count, spacing, footprints=None, clearance=0.0, rounds=24):
+    """
+    Up to `count` points in `area` (x0, y0, x1, y1), in random order, no two
+    closer than `spacing` and none within `clearance` of `footprints`. The
+    spacing shrinks when `count` would not otherwise fit the area; fewer
+    points come back when the free ground is full.
+    """
+    x0, y0, x1, y1 = area
+    if count <= 0:
+        return np.zeros((0, 2))
+    spacing = min(spacing, math.sqrt(0.5 * (x1 - x0) * (y1 - y0) / count))
+    gen = np.random.default_rng(rng.getrandbits(64))
+    size = spacing / math.sqrt(2)
+    nx, ny = math.ceil((x1 - x0) / size), math.ceil((y1 - y0) / size)
+    grid = np.full((nx + 4, ny + 4, 2), np.nan)    # two empty cells of margin
+    ix, iy = np.meshgrid(np.arange(nx), np.arange(ny), indexing='ij')
+    live = np.ones((nx, ny), bool)
+    if footprints is not None:
+        # A cell whose centre is further inside a footprint than its
+        # half-diagonal can never take a sample
+        centres = np.column_stack([x0 + (ix.ravel() + 0.5) * size,
+                                   y0 + (iy.ravel() + 0.5) * size])
+        live = (footprints.clearance(centres) + spacing / 2 >= clearance).reshape(nx, ny)
+    phases = [(ix[a::3, b::3][live[a::3, b::3]], iy[a::3, b::3][live[a::3, b::3]])
+              for a in range(3) for b in range(3)]
+    ax, ay = np.mgrid[-2:3, -2:3].reshape(2, -1) + 2   # 5×5 neighbourhood offsets
+
+    for _ in range(rounds):
+        for cx, cy in phases:
+            empty = np.isnan(grid[cx + 2, cy + 2, 0])
+            cx, cy = cx[empty], cy[empty]
+            if not len(cx):
+                continue
+            p = np.column_stack([x0 + (cx + gen.random(len(cx))) * size,
+                                 y0 + (cy + gen.random(len(cy))) * size])
+            # Empty neighbours are NaN and never compare as too close
+            near = grid[cx[:, None] + ax, cy[:, None] + ay] - p[:, None]
+            ok = (p[:, 0] < x1) & (p[:, 1] < y1)
+            ok &= ~((near ** 2).sum(axis=2) < spacing * spacing).any(axis=1)
+            if footprints is not None and ok.any():
+                ok[ok] = footprints.clearance(p[ok]) >= clearance
+            grid[cx[ok] + 2, cy[ok] + 2] = p[ok]
+
+    points = grid[2:-2, 2:-2].reshape(-1, 2)
+    points = points[~np.isnan(points[:, 0])]
+    return points[gen.permutation(len(points))[:count]]
+
 # ── Ground Plane ─────────────────────────────────────────────────────────────
 
-def build_ground(cols, M):
+def build_ground(cols, M, rng):
     # Main ground
     add_box('Ground_Main', (0, 0, -0.5), (600, 600, 1), M['ground'], cols['Ground'])
 
-    # Laterite soil patches (Kenya red earth on unpaved areas)
-    for i in range(15):
-        x = random.uniform(-200, 200)
-        y = random.uniform(-200, 200)
-        w = random.uniform(15, 60)
-        d = random.uniform(15, 60)
-        add_box(f'Laterite_{i}', (x, y, 0.02), (w, d, 0.04), M['laterite'], cols['Ground'])
+    # Laterite soil patches (Kenya red earth on unpaved areas), shrunk to fit
+    # between the roads and buildings and to stay clear of each other
+    footprints = layout_footprints()
+    spacing = 40.0
+    centres = scatter(rng, (-200, -200, 200, 200), cols['Ground'].scene.scaled('ground', 15),
+                      spacing, footprints, clearance=3.0)
+    room = np.minimum(footprints.clearance(centres), spacing / 2)
+    for i, ((x, y), limit) in enumerate(zip(centres.tolist(), room.tolist())):
+        w = rng.uniform(15, 60)
+        d = rng.uniform(15, 60)
+        k = min(1.0, limit / math.hypot(w / 2, d / 2))
+        add_box(f'Laterite_{i}', (x, y, 0.02), (w * k, d * k, 0.04), M['laterite'],
+                cols['Ground'])
 
 # ── Road Network ─────────────────────────────────────────────────────────────
 #
@@ -242,114 +831,378 @@ def build_ground(cols, M):
 #  University Way   — E-W at y=80
 #  Kimathi Street   — N-S at x=-40
 #  Harambee Ave     — E-W at y=40
-
-def build_roads(cols, M):
+#
+#  Besides the rendered planes, build_roads records every carriageway in the
+#  scene's RoadNetwork; RoadNetwork.graph() turns that into junction and
+#  roundabout nodes joined by edges, with the traffic lights and signs linked
+#  to the node or edge they control. nairobi_roads.py exports it for the
+#  simulator.
+
+LANE_WIDTH = 3.5   # metres
+SHOULDER = 1.0     # kerbside strip outside the outermost lane
+MERGE_TOL = 0.5    # crossings closer than this are one junction
+
+def lanes_per_direction(width):
+    return max(1, int((width / 2 - SHOULDER) // LANE_WIDTH))
+
+class Road:
+    """A straight two-way carriageway from `start` to `end` (ground x, y)."""
+    __slots__ = ('name', 'start', 'end', 'width', 'speed')
+
+    def __init__(self, name, start, end, width, speed=50):
+        self.name = name
+        self.start = tuple(start)
+        self.end = tuple(end)
+        self.width = width
+        self.speed = speed
+
+    def project(self, pos):
+        """(distance along the road, signed offset to its left) of `pos`."""
+        (ax, ay), (bx, by) = self.start, self.end
+        dx, dy = bx - ax, by - ay
+        length = math.hypot(dx, dy)
+        px, py = pos[0] - ax, pos[1] - ay
+        return (px * dx + py * dy) / length, (dx * py - dy * px) / length
+
+class RoadNode:
+    """A junction, roundabout or dead end; `radius` is how far it reaches."""
+    __slots__ = ('id', 'kind', 'name', 'pos', 'radius', 'roads', 'signals')
+
+    def __init__(self, id, kind, pos, radius=0.0, name=None):
+        self.id = id
+        self.kind = kind
+        self.name = name
+        self.pos = tuple(pos)
+        self.radius = radius
+        self.roads = []
+        self.signals = []
+
+class RoadEdge:
+    """The stretch of `road` between two consecutive nodes along it."""
+    __slots__ = ('id', 'road', 'a', 'b', 'signs')
+
+    def __init__(self, id, road, a, b):
+        self.id = id
+        self.road = road
+        self.a = a
+        self.b = b
+        self.signs = []
+
+    @property
+    def length(self):
+        return math.dist(self.a.pos, self.b.pos)
+
+def _crossing(r, s):
+    """Point where roads `r` and `s` cross or touch, else None (parallel: None)."""
+    (ax, ay), (bx, by) = r.start, r.end
+    (cx, cy), (dx, dy) = s.start, s.end
+    ux, uy, vx, vy = bx - ax, by - ay, dx - cx, dy - cy
+    den = ux * vy - uy * vx
+    if abs(den) < 1e-9:
+        return None
+    t = ((cx - ax) * vy - (cy - ay) * vx) / den
+    u = ((cx - ax) * uy - (cy - ay) * ux) / den
+    if -1e-9 <= t <= 1 + 1e-9 and -1e-9 <= u <= 1 + 1e-9:
+        return (ax + t * ux, ay + t * uy)
+    return None
+
+class RoadNetwork:
+    """Carriageways, roundabouts and the signals and signs placed along them."""
+    __slots__ = ('roads', 'roundabouts', 'signals', 'signs')
+
+    def __init__(self):
+        self.roads = []
+        self.roundabouts = []   # (name, centre, radius)
+        self.signals = []       # (name, pos, phase)
+        self.signs = []         # (name, pos, kind)
+
+    def add_road(self, name, start, end, width, speed=50):
+        road = Road(name, start, end, width, speed)
+        self.roads.append(road)
+        return road
+
+    def add_roundabout(self, name, centre, radius):
+        self.roundabouts.append((name, tuple(centre[:2]), radius))
+
+    def add_signal(self, name, pos, phase):
+        self.signals.append((name, tuple(pos[:2]), phase))
+
+    def add_sign(self, name, pos, kind):
+        self.signs.append((name, tuple(pos[:2]), kind))
+
+    def graph(self):
+        """
+        Derive (nodes, edges). Roundabouts come first and absorb any crossing
+        inside their ring; road ends that meet nothing become 'end' nodes.
+        Where two roads share a stretch (Waiyaki Way running into Harambee
+        Avenue) the wider one keeps the edge. Each signal joins the nearest
+        node, each sign the nearest edge.
+        """
+        nodes = []
+
+        def node_at(pos, kind='junction', radius=0.0, name=None):
+            for node in nodes:
+                if math.dist(node.pos, pos) <= max(node.radius, MERGE_TOL):
+                    return node
+            nodes.append(RoadNode(len(nodes), kind, pos, radius, name))
+            return nodes[-1]
+
+        for name, centre, radius in self.roundabouts:
+            node_at(centre, 'roundabout', radius, name)
+        for i, road in enumerate(self.roads):
+            for other in self.roads[i + 1:]:
+                hit = _crossing(road, other)
+                if hit:
+                    node_at(hit)
+        for road in self.roads:
+            node_at(road.start, 'end')
+            node_at(road.end, 'end')
+
+        edges, spans = [], {}
+        for road in sorted(self.roads, key=lambda r: -r.width):
+            length = math.dist(road.start, road.end)
+            along = []
+            for node in nodes:
+                t, offset = road.project(node.pos)
+                reach = max(node.radius, MERGE_TOL)
+                if abs(offset) <= reach and -reach <= t <= length + reach:
+                    along.append((t, node))
+                    node.roads.append(road.name)
+            along.sort(key=lambda item: item[0])
+            for (_, a), (_, b) in zip(along, along[1:]):
+                if (a.id, b.id) not in spans:
+                    spans[a.id, b.id] = spans[b.id, a.id] = road
+                    edges.append(RoadEdge(len(edges), road, a, b))
+        for node in nodes:
+            if node.kind == 'end' and len(node.roads) > 1:
+                node.kind = 'junction'
+
+        for name, pos, phase in self.signals:
+            node = min(nodes, key=lambda n: math.dist(n.pos, pos) - n.radius)
+            node.signals.append((name, phase))
+        for name, pos, kind in self.signs:
+            def gap(edge):
+                t, offset = edge.road.project(pos)
+                ta, _ = edge.road.project(edge.a.pos)
+                tb, _ = edge.road.project(edge.b.pos)
+                return abs(offset) + max(0.0, ta - t, t - tb)
+            min(edges, key=gap).signs.append((name, kind))
+        return nodes, edges
+
+# ── Road Meshing ─────────────────────────────────────────────────────────────
+#
+#  The road surface is cut from RoadNetwork.graph() so nothing is drawn twice:
+#  every edge becomes one carriageway strip, set back from each end node far
+#  enough to clear the roads crossing there, and each junction gets one patch
+#  covering the square between those set-backs. At a roundabout the arms stop
+#  where the ring's outline leaves their strip and two apron pieces fill the
+#  corners between arm and ring. Centre and edge lines, zebra stripes and
+#  kerbs belong to one strip and end with it, so no marking crosses a junction
+#  or another marking. Patches are exact for the right-angled CBD grid.
+
+RING_LANE = 5.0       # half the roundabout carriageway
+RING_SEGMENTS = 48
+KERB = 0.6            # kerb strip outside the carriageway (0.4 wide, 0.2 gap)
+ZEBRA_STRIPES = 9
+ZEBRA_PITCH = 1.2
+
+def _strip(name, a, b, width, z, mat, collection, depth=0.0):
+    """A plane (or box, with `depth`) of `width` from ground point `a` to `b`."""
+    (ax, ay), (bx, by) = a, b
+    length = math.dist(a, b)
+    if length < 1e-6:
+        return None
+    loc = ((ax + bx) / 2, (ay + by) / 2, z)
+    if abs(by - ay) < 1e-9:
+        size, rot = (length, width), (0, 0, 0)
+    elif abs(bx - ax) < 1e-9:
+        size, rot = (width, length), (0, 0, 0)
+    else:
+        size, rot = (length, width), (0, 0, math.atan2(by - ay, bx - ax))
+    if depth:
+        return add_box(name, loc, (*size, depth), mat, collection, rot)
+    return add_plane(name, loc, size, mat, collection, rot)
+
+def _area(points):
+    return sum(x0 * y1 - x1 * y0 for (x0, y0), (x1, y1)
+               in zip(points, points[1:] + points[:1])) / 2
+
+def _hull(points):
+    """Convex hull, counter-clockwise (monotone chain)."""
+    pts = sorted(set(points))
+    if len(pts) < 3:
+        return pts
+
+    def half(seq):
+        out = []
+        for p in seq:
+            while len(out) > 1 and ((out[-1][0] - out[-2][0]) * (p[1] - out[-2][1]) -
+                                    (out[-1][1] - out[-2][1]) * (p[0] - out[-2][0])) <= 1e-12:
+                out.pop()
+            out.append(p)
+        return out[:-1]
+    return half(pts) + half(pts[::-1])
+
+def _clip(poly, axis, limit, keep_below):
+    """Sutherland-Hodgman: the part of `poly` with coordinate `axis` <= (or >=) limit."""
+    def inside(p):
+        return p[axis] <= limit if keep_below else p[axis] >= limit
+    out = []
+    for p, q in zip(poly, poly[1:] + poly[:1]):
+        if inside(p):
+            out.append(p)
+        if inside(p) != inside(q):
+            t = (limit - p[axis]) / (q[axis] - p[axis])
+            out.append((p[0] + t * (q[0] - p[0]), p[1] + t * (q[1] - p[1])))
+    return out
+
+def _ring_arm(radius, half_width, heading):
+    """
+    Where an arm of `half_width` leaving at angle `heading` meets a ring of
+    outer `radius`, in the arm's frame (x out along the arm, y to its left):
+    (set-back, [apron polygons]).
+    """
+    n = RING_SEGMENTS
+    outline = [(radius * math.cos(2 * math.pi * i / n - heading),
+                radius * math.sin(2 * math.pi * i / n - heading)) for i in range(n)]
+    cut = _clip(_clip(_clip(outline, 1, half_width, True), 1, -half_width, False), 0, 0, False)
+    x0 = max(x for x, _ in cut)
+    y0 = next(y for x, y in cut if x == x0)
+    aprons = []
+    for sign in (1, -1):
+        # The outline from the strip's edge round to its outermost point
+        chain = sorted(((x, y) for x, y in cut if x > 1e-9 and sign * y >= sign * y0),
+                       key=lambda p: -sign * p[1])
+        poly = [(x0, sign * half_width)] + [p for p in chain if p[0] < x0 - 1e-9] + [(x0, y0)]
+        if abs(_area(poly)) > 1e-4:
+            # Concave along the ring, but every corner is in view of the first
+            aprons.append(poly if _area(poly) > 0 else poly[:1] + poly[:0:-1])
+    return x0, aprons
+
+def build_road_mesh(network, zebras, sidewalks, cols, M):
+    """
+    Carriageway strips, junction patches, roundabout aprons, markings and kerbs
+    for `network`. zebras: [(road crossed, road at the junction)] gets a
+    crossing on each arm there; sidewalks: roads with pavements both sides.
+    """
+    col = cols['Roads']
+    nodes, edges = network.graph()
+    arms = {node.id: [] for node in nodes}
+    for edge in edges:
+        (ax, ay), (bx, by) = edge.a.pos, edge.b.pos
+        length = edge.length
+        d = ((bx - ax) / length, (by - ay) / length)
+        arms[edge.a.id].append((edge, d))
+        arms[edge.b.id].append((edge, (-d[0], -d[1])))
+
+    # How far each edge end stays clear of its node, and how far its kerb runs in
+    setback, kerb_in, zebra_at = {}, {}, {}
+    for node in nodes:
+        ends = arms[node.id]
+        lead = max(ends, key=lambda end: end[0].road.width)[0].road if ends else None
+        if node.kind == 'roundabout':
+            for k, (edge, (dx, dy)) in enumerate(ends):
+                x0, aprons = _ring_arm(node.radius + RING_LANE, edge.road.width / 2,
+                                       math.atan2(dy, dx))
+                setback[edge.id, node.id] = kerb_in[edge.id, node.id] = x0
+                for side, poly in enumerate(aprons):
+                    world = [(node.pos[0] + x * dx - y * dy, node.pos[1] + x * dy + y * dx)
+                             for x, y in poly]
+                    add_polygon(f'RoundaboutApron_{node.id}_{k}_{side}', (0, 0, 0.02), world,
+                                M['tarmac'], col)
+        else:
+            corners = []
+            for edge, d in ends:
+                back = 0.0
+                for other, f in ends:
+                    sin = abs(d[0] * f[1] - d[1] * f[0])
+                    if other is not edge and sin > 1e-6:
+                        cos = d[0] * f[0] + d[1] * f[1]
+                        back = max(back, (other.road.width / 2 + edge.road.width / 2 * cos)
+                                   / sin)
+                setback[edge.id, node.id] = back
+                # The widest road's kerbs turn the corner; the others stop short
+                kerb_in[edge.id, node.id] = back + (KERB - 0.4 if edge.road is lead
+                                                    else KERB) * (back > 0)
+                hw = edge.road.width / 2
+                for side in (-1, 1):
+                    corners.append((node.pos[0] + d[0] * back - d[1] * hw * side,
+                                    node.pos[1] + d[1] * back + d[0] * hw * side))
+            patch = _hull(corners)
+            if len(patch) > 2 and _area(patch) > 1e-3:
+                add_polygon(f'Junction_{node.id}', (0, 0, 0.02), patch, M['tarmac'], col)
+        for edge, _ in ends:
+            if any(edge.road.name == crossed and met in node.roads for crossed, met in zebras):
+                zebra_at[edge.id, node.id] = True
+
+    band = (ZEBRA_STRIPES - 1) * ZEBRA_PITCH + 0.9
+    for edge in edges:
+        road, w = edge.road, edge.road.width
+        (ax, ay), (bx, by) = edge.a.pos, edge.b.pos
+        length = edge.length
+        dx, dy = (bx - ax) / length, (by - ay) / length
+
+        def at(t, across=0.0):
+            return (ax + dx * t - dy * across, ay + dy * t + dx * across)
+
+        t0, t1 = setback[edge.id, edge.a.id], length - setback[edge.id, edge.b.id]
+        if t1 - t0 < 1e-3:
+            continue
+        i = edge.id
+        _strip(f'Road_{i}', at(t0), at(t1), w, 0.02, M['tarmac'], col)
+
+        # Zebras a metre clear of the junction, the centre line stopping short of them
+        c0, c1 = t0, t1
+        for end, node, sign, t in ((0, edge.a, 1, t0), (1, edge.b, -1, t1)):
+            if zebra_at.get((i, node.id)):
+                first = t + sign * (1.0 + 0.45)
+                for k in range(ZEBRA_STRIPES):
+                    tk = first + sign * k * ZEBRA_PITCH
+                    _strip(f'Zebra_{i}_{end}_{k}', at(tk - 0.45), at(tk + 0.45), w - 1.6,
+                           0.05, M['road_line_w'], col)
+                if end == 0:
+                    c0 = t0 + 1.0 + band + 1.0
+                else:
+                    c1 = t1 - 1.0 - band - 1.0
+        if c1 > c0:
+            _strip(f'CentreLine_{i}', at(c0), at(c1), 0.3, 0.04, M['road_line_y'], col)
+
+        for side in (-1, 1):
+            _strip(f'EdgeLine_{i}_{side}', at(t0, (w / 2 - 0.4) * side),
+                   at(t1, (w / 2 - 0.4) * side), 0.25, 0.04, M['road_line_w'], col)
+            k0, k1 = kerb_in[i, edge.a.id], length - kerb_in[i, edge.b.id]
+            _strip(f'Kerb_{i}_{side}', at(k0, (w / 2 + 0.4) * side),
+                   at(k1, (w / 2 + 0.4) * side), 0.4, 0.06, M['kerb'], col, depth=0.12)
+            if road.name in sidewalks:
+                # Pavement (5 m, starting 2.5 m out) clear of the crossing kerbs
+                p0 = t0 + KERB * (t0 > 0 and edge.a.kind != 'roundabout')
+                p1 = t1 - KERB * (t1 < length and edge.b.kind != 'roundabout')
+                _strip(f'Sidewalk_{i}_{side}', at(p0, (w / 2 + 5) * side),
+                       at(p1, (w / 2 + 5) * side), 5, 0.07, M['sidewalk'], col, depth=0.14)
+
+def build_roads(cols, M, rng):
     road_w = 18   # two-lane with shoulder
 
-    # Main arterials [x_centre, y_centre, width, length, is_NS]
+    # Main arterials [name, x_centre, y_centre, width, length, is_NS, km/h]
     arterials = [
-        # Kenyatta Avenue (E-W)
-        (0,    0,   road_w, 400, False),
-        # University Way (E-W)
-        (0,   80,   road_w, 400, False),
-        # Haile Selassie Ave (E-W)
-        (0,  -70,   road_w, 400, False),
-        # Harambee Ave (E-W)
-        (0,   40,   14,     300, False),
-        # Kenyatta continuation (inner ring)
-        (0,  -30,   12,     300, False),
-
-        # Moi Avenue (N-S)
-        (0,    0,   road_w, 400, True),
-        # Tom Mboya Street (N-S)
-        (50,   0,   14,     360, True),
-        # Kimathi Street (N-S)
-        (-50,  0,   14,     360, True),
-        # Uhuru Highway (N-S, wide)
-        (-120, 0,   24,     500, True),
-        # Waiyaki Way (E-W, western)
-        (-160, 40,  22,     200, False),
+        ('Kenyatta Avenue',     0,    0,   road_w, 400, False, 50),
+        ('University Way',      0,   80,   road_w, 400, False, 50),
+        ('Haile Selassie Ave',  0,  -70,   road_w, 400, False, 50),
+        ('Harambee Ave',        0,   40,   14,     300, False, 50),
+        ('Kenyatta Inner Ring', 0,  -30,   12,     300, False, 50),
+
+        ('Moi Avenue',          0,    0,   road_w, 400, True,  50),
+        ('Tom Mboya Street',   50,    0,   14,     360, True,  50),
+        ('Kimathi Street',    -50,    0,   14,     360, True,  50),
+        ('Uhuru Highway',    -120,    0,   24,     500, True,  80),  # wide
+        ('Waiyaki Way',      -160,   40,   22,     200, False, 80),  # western
     ]
 
-    for i, (cx, cy, w, l, is_ns) in enumerate(arterials):
-        rot = (math.pi/2, 0, math.pi/2) if is_ns else (math.pi/2, 0, 0)
-        # Road surface
-        bpy.ops.mesh.primitive_plane_add(size=1, location=(cx, cy, 0.02))
-        obj = bpy.context.active_object
-        obj.name = f'Road_{i}'
-        obj.scale = (w, l, 1) if not is_ns else (l, w, 1)
-        obj.rotation_euler = Euler((math.pi/2, 0, 0))
-        bpy.ops.object.transform_apply(scale=True, rotation=True)
-        obj.data.materials.append(M['tarmac'])
-        link_to(obj, cols['Roads'])
-
-        # Centre line
-        lw, ll = (0.3, l) if not is_ns else (l, 0.3)
-        bpy.ops.mesh.primitive_plane_add(size=1, location=(cx, cy, 0.04))
-        line = bpy.context.active_object
-        line.name = f'CentreLine_{i}'
-        line.scale = (lw, ll, 1)
-        line.rotation_euler = Euler((math.pi/2, 0, 0))
-        bpy.ops.object.transform_apply(scale=True, rotation=True)
-        line.data.materials.append(M['road_line_y'])
-        link_to(line, cols['Roads'])
-
-        # Edge lines
-        for side in [-1, 1]:
-            bpy.ops.mesh.primitive_plane_add(size=1, location=(
-                cx + (w/2 - 0.4) * side if not is_ns else cx,
-                cy if not is_ns else cy + (w/2 - 0.4) * side,
-                0.04))
-            edge = bpy.context.active_object
-            edge.name = f'EdgeLine_{i}_{side}'
-            edge.scale = (0.25, l, 1) if not is_ns else (l, 0.25, 1)
-            edge.rotation_euler = Euler((math.pi/2, 0, 0))
-            bpy.ops.object.transform_apply(scale=True, rotation=True)
-            edge.data.materials.append(M['road_line_w'])
-            link_to(edge, cols['Roads'])
-
-        # Kerb strips
-        for side in [-1, 1]:
-            bpy.ops.mesh.primitive_cube_add(size=1, location=(
-                cx + (w/2 + 0.4) * side if not is_ns else cx,
-                cy if not is_ns else cy + (w/2 + 0.4) * side,
-                0.06))
-            kerb = bpy.context.active_object
-            kerb.name = f'Kerb_{i}_{side}'
-            kerb.scale = (0.4, l, 0.12) if not is_ns else (l, 0.4, 0.12)
-            bpy.ops.object.transform_apply(scale=True)
-            kerb.data.materials.append(M['kerb'])
-            link_to(kerb, cols['Roads'])
-
-    # Zebra crossings at key intersections
-    crossings = [
-        (0, 11, True), (0, -11, True), (11, 0, False), (-11, 0, False),
-        (50, 11, True), (50, -11, True),
-        (-50, 11, True), (-50, -11, True),
-    ]
-    for i, (cx, cy, ns) in enumerate(crossings):
-        for stripe in range(-4, 5):
-            bpy.ops.mesh.primitive_plane_add(size=1, location=(
-                cx + stripe * 1.2 if not ns else cx,
-                cy if not ns else cy + stripe * 1.2,
-                0.05))
-            z = bpy.context.active_object
-            z.name = f'Zebra_{i}_{stripe}'
-            z.scale = (0.9, 14, 1) if not ns else (14, 0.9, 1)
-            z.rotation_euler = Euler((math.pi/2, 0, 0))
-            bpy.ops.object.transform_apply(scale=True, rotation=True)
-            z.data.materials.append(M['road_line_w'])
-            link_to(z, cols['Roads'])
-
-    # Pavement / sidewalks along Kenyatta Ave
-    for side in [-1, 1]:
-        bpy.ops.mesh.primitive_cube_add(size=1, location=(0, side * 14, 0.07))
-        sw = bpy.context.active_object
-        sw.name = f'Sidewalk_Kenyatta_{side}'
-        sw.scale = (380, 5, 0.14)
-        bpy.ops.object.transform_apply(scale=True)
-        sw.data.materials.append(M['sidewalk'])
-        link_to(sw, cols['Roads'])
+    network = cols['Roads'].scene.roads
+    for name, cx, cy, w, l, is_ns, speed in arterials:
+        # Laid flat: E-W roads run along x, N-S roads along y
+        dx, dy = (0, l / 2) if is_ns else (l / 2, 0)
+        network.add_road(name, (cx - dx, cy - dy), (cx + dx, cy + dy), w, speed)
 
     # Roundabout at Moi/Kenyatta intersection
     build_roundabout((0, 0, 0.03), 14, cols, M)
@@ -357,20 +1210,19 @@ def build_roads(cols, M):
     # Globe Roundabout (Haile Selassie / Uhuru Highway)
     build_roundabout((-120, -70, 0.03), 20, cols, M)
 
+    # Zebra crossings [road crossed, at its junction with]
+    zebras = [
+        ('Moi Avenue', 'Kenyatta Avenue'), ('Kenyatta Avenue', 'Moi Avenue'),
+        ('Tom Mboya Street', 'Kenyatta Avenue'), ('Kimathi Street', 'Kenyatta Avenue'),
+    ]
+    build_road_mesh(network, zebras, ['Kenyatta Avenue'], cols, M)
+
 def build_roundabout(centre, radius, cols, M):
     cx, cy, cz = centre
-    segments = 48
-    # Road ring
-    bpy.ops.mesh.primitive_torus_add(
-        major_radius=radius, minor_radius=5,
-        major_segments=segments, minor_segments=12,
-        location=(cx, cy, cz + 0.05))
-    torus = bpy.context.active_object
-    torus.name = f'Roundabout_{cx}_{cy}'
-    torus.rotation_euler = Euler((math.pi/2, 0, 0))
-    bpy.ops.object.transform_apply(rotation=True)
-    torus.data.materials.append(M['tarmac'])
-    link_to(torus, cols['Roads'])
+    cols['Roads'].scene.roads.add_roundabout(f'Roundabout_{cx}_{cy}', centre, radius)
+    # Road ring (flat annulus, 10 m carriageway)
+    add_ring(f'Roundabout_{cx}_{cy}', (cx, cy, cz + 0.05), radius - RING_LANE,
+             radius + RING_LANE, M['tarmac'], cols['Roads'], segments=RING_SEGMENTS)
 
     # Centre island (green)
     add_cylinder(f'RoundaboutIsland_{cx}', (cx, cy, 0.15), radius - 4, 0.3,
@@ -382,7 +1234,7 @@ def build_roundabout(centre, radius, cols, M):
 
 # ── Buildings: Nairobi CBD ─────────────────────────────────────────────────
 
-def build_cbd_buildings(cols, M):
+def build_cbd_buildings(cols, M, rng):
     """
     Modelled on actual Nairobi CBD building positions (schematic).
     Coordinates: x = East-West, y = North-South
@@ -431,8 +1283,10 @@ def build_cbd_buildings(cols, M):
         ('I&M_Bank_Twrs',    -100, 60,  22, 22, 18, 'glass_bronze', 'glass_bronze'),
     ]
 
+    col = cols['Buildings']
     for (name, bx, by, bw, bd, floors, fmat, gmat) in buildings:
         h = floors * 3.5
+        first = len(col.primitives)
         # Main body
         add_box(name, (bx, by, h/2), (bw, bd, h), M[fmat], cols['Buildings'])
 
@@ -447,11 +1301,11 @@ def build_cbd_buildings(cols, M):
 
         # Rooftop equipment (AC units etc.)
         if floors > 8:
-            for ri in range(random.randint(2, 5)):
-                rx = bx + random.uniform(-bw/2 + 1, bw/2 - 1)
-                ry = by + random.uniform(-bd/2 + 1, bd/2 - 1)
-                rh = random.uniform(0.8, 2.5)
-                rw = random.uniform(1.5, 4.0)
+            for ri in range(rng.randint(2, 5)):
+                rx = bx + rng.uniform(-bw/2 + 1, bw/2 - 1)
+                ry = by + rng.uniform(-bd/2 + 1, bd/2 - 1)
+                rh = rng.uniform(0.8, 2.5)
+                rw = rng.uniform(1.5, 4.0)
                 add_box(f'{name}_Roof_Eq_{ri}', (rx, ry, h + 0.4 + rh/2),
                         (rw, rw * 0.7, rh), M['metal_dark'], cols['Buildings'])
 
@@ -459,14 +1313,24 @@ def build_cbd_buildings(cols, M):
         add_box(f'{name}_GF', (bx, by, 1.75), (bw + 0.1, bd + 0.1, 3.5),
                 M['concrete_dark'], cols['Buildings'])
 
+        # LODs: drop plant and shopfronts, then a single block
+        mid = PartList().box((bw, bd, h), M[fmat], offset=(0, 0, h/2))
+        if floors > 5:
+            mid.box((bw - 0.2, 0.15, h - 1), M[gmat], offset=(0, bd/2 + 0.05, h/2))
+        mid.box((bw + 0.3, bd + 0.3, 0.4), M['roof_flat'], offset=(0, 0, h + 0.2))
+        far = PartList().box((bw, bd, h + 0.4), M[fmat], offset=(0, 0, h/2 + 0.2))
+        add_lod(name, (bx, by, 0), col.primitives[first:], [(120, mid), (300, far)], col)
+
 # ── Iconic Landmarks ─────────────────────────────────────────────────────────
 
-def build_kicc(cols, M):
+def build_kicc(cols, M, rng):
     """
     Kenyatta International Convention Centre
     Distinctive cylinder + cone roof + office wing
     """
     cx, cy = 5, 10
+    col = cols['Landmarks']
+    first = len(col.primitives)
 
     # Circular tower
     add_cylinder('KICC_Tower', (cx, cy, 62.5), 13, 125, M['kicc_green'], cols['Landmarks'])
@@ -495,12 +1359,26 @@ def build_kicc(cols, M):
         add_box(f'Flag_{fx}', (fx + 1.5, fy, 19), (3, 0.05, 2), M['sign_stop'],
                 cols['Landmarks'])
 
-def build_times_tower(cols, M):
+    # LODs: one base drum, no flags or helipad; then tower and wing blocks
+    mid = (PartList()
+           .cylinder(13, 125, M['kicc_green'], verts=8, offset=(0, 0, 62.5))
+           .cylinder(18, 4, M['kicc_col'], verts=8, offset=(0, 0, 2))
+           .box((6, 6, 4), M['concrete_dark'], offset=(0, 0, 124))
+           .box((40, 35, 24), M['kicc_col'], offset=(35, 0, 12))
+           .box((40, 0.2, 22), M['glass_blue'], offset=(35, 17.6, 12)))
+    far = (PartList()
+           .box((23, 23, 128), M['kicc_green'], offset=(0, 0, 64))
+           .box((40, 35, 24), M['kicc_col'], offset=(35, 0, 12)))
+    add_lod('KICC', (cx, cy, 0), col.primitives[first:], [(150, mid), (400, far)], col)
+
+def build_times_tower(cols, M, rng):
     """
     Times Tower — tallest building in East Africa at time of build
     Distinctive stepped setback design
     """
     cx, cy = -5, -55
+    col = cols['Landmarks']
+    first = len(col.primitives)
     # Setback floors
     setbacks = [
         (26, 26, 60),   # base
@@ -522,9 +1400,19 @@ def build_times_tower(cols, M):
     add_cylinder('TimesTower_Spire', (cx, cy, 168), 0.4, 12, M['metal_silver'],
                  cols['Landmarks'])
 
-def build_parliament(cols, M):
+    # LODs: framed setbacks only, then a single block
+    mid = PartList()
+    for w, d, h in setbacks:
+        mid.box((w + 0.4, d + 0.4, h), M['times_frame'], offset=(0, 0, h/2))
+    far = PartList().box((20, 20, 165), M['times_frame'], offset=(0, 0, 82.5))
+    add_lod('TimesTower', (cx, cy, 0), col.primitives[first:],
+            [(150, mid), (400, far)], col)
+
+def build_parliament(cols, M, rng):
     """Parliament Buildings - colonnaded facade style"""
     cx, cy = -90, 50
+    col = cols['Landmarks']
+    first = len(col.primitives)
     # Main block
     add_box('Parliament_Main', (cx, cy, 8), (60, 45, 16), M['facade_cream'],
             cols['Landmarks'])
@@ -538,27 +1426,36 @@ def build_parliament(cols, M):
     # Dome
     add_cylinder('Parliament_Dome', (cx, cy, 22), 8, 6, M['concrete'], cols['Landmarks'])
 
+    # LODs: colonnade as one slab, then the main block alone
+    mid = (PartList()
+           .box((60, 45, 16), M['facade_cream'], offset=(0, 0, 8))
+           .box((41.2, 1.2, 18), M['kicc_col'], offset=(0, 23, 9))
+           .box((50, 0.8, 4), M['facade_cream'], offset=(0, 22, 18.5))
+           .cylinder(8, 6, M['concrete'], verts=8, offset=(0, 0, 22)))
+    far = PartList().box((60, 45, 16), M['facade_cream'], offset=(0, 0, 8))
+    add_lod('Parliament', (cx, cy, 0), col.primitives[first:],
+            [(100, mid), (250, far)], col)
+
 # ── Traffic Lights ────────────────────────────────────────────────────────────
 
 def build_traffic_light(pos, phase, cols, M):
     """phase: 0=red, 1=amber, 2=green (which light is on)"""
     x, y, z = pos
-    pole = add_cylinder(f'TL_Pole_{x}_{y}', (x, y, 2.5), 0.08, 5, M['tl_pole'],
+
+    def build(b):
+        b.cylinder(0.08, 5, M['tl_pole'], offset=(0, 0, 2.5))
+        # Housing
+        b.box((0.35, 0.35, 1.2), M['metal_dark'], offset=(0, 0, 5.5))
+        # Lights
+        for i, mat_on in enumerate([M['tl_red'], M['tl_yellow'], M['tl_green']]):
+            b.cylinder(0.12, 0.06, mat_on if i == phase else M['tl_off'], verts=16,
+                       rot=(math.pi/2, 0, 0), offset=(0, 0.18, 5.9 - i * 0.4))
+
+    cols['Traffic'].scene.roads.add_signal(f'TL_{x}_{y}', pos, phase)
+    return add_instance(f'TL_{x}_{y}', f'traffic_light_{phase}', build, (x, y, z),
                         cols['Traffic'])
-    # Housing
-    add_box(f'TL_Box_{x}_{y}', (x, y, 5.5), (0.35, 0.35, 1.2), M['metal_dark'],
-            cols['Traffic'])
-    # Lights
-    for i, (mat_on, mat_off) in enumerate([
-            (M['tl_red'], M['tl_off']),
-            (M['tl_yellow'], M['tl_off']),
-            (M['tl_green'], M['tl_off'])]):
-        lz = 5.9 - i * 0.4
-        mat = mat_on if i == phase else mat_off
-        add_cylinder(f'TL_Light_{x}_{y}_{i}', (x, y + 0.18, lz), 0.12, 0.06,
-                     mat, cols['Traffic'], rot=(math.pi/2, 0, 0), verts=16)
-
-def build_all_traffic_lights(cols, M):
+
+def build_all_traffic_lights(cols, M, rng):
     intersections = [
         (10, 12, 2), (-10, 12, 0), (10, -12, 2), (-10, -12, 0),
         (60, 12, 2), (-60, 12, 0), (10, 88, 2), (-10, 88, 0),
@@ -569,7 +1466,7 @@ def build_all_traffic_lights(cols, M):
 
 # ── Road Signs ────────────────────────────────────────────────────────────────
 
-def build_road_signs(cols, M):
+def build_road_signs(cols, M, rng):
     signs = [
         # (x, y, type)  type: 'stop','speed50','keep_left','yield','no_overtake'
         (15, 15, 'stop'),
@@ -581,6 +1478,7 @@ def build_road_signs(cols, M):
         (55, 85, 'speed50'),
     ]
     for i, (x, y, stype) in enumerate(signs):
+        cols['Traffic'].scene.roads.add_sign(f'Sign_{i}', (x, y), stype)
         # Pole
         add_cylinder(f'Sign_Pole_{i}', (x, y, 1.3), 0.04, 2.6, M['metal_silver'],
                      cols['Traffic'])
@@ -599,70 +1497,96 @@ def build_road_signs(cols, M):
 
 # ── Vegetation ────────────────────────────────────────────────────────────────
 
-def build_tree(name, x, y, tree_type, cols, M, scale=1.0):
+def build_tree(name, x, y, tree_type, cols, M, rng, scale=1.0):
     """
     tree_type: 'jacaranda', 'acacia', 'palm', 'generic'
+    Trunk heights snap to whole metres so trees share a handful of prototype
+    meshes; `scale` is applied per instance.
     """
-    trunk_h = random.uniform(4, 8) * scale
-    # Trunk
-    add_cylinder(f'{name}_Trunk', (x, y, trunk_h/2), 0.25 * scale, trunk_h,
-                 M['trunk'], cols['Vegetation'], verts=8)
-
-    if tree_type == 'jacaranda':
-        # Wide spreading crown
-        add_cylinder(f'{name}_Crown', (x, y, trunk_h + 2.5 * scale),
-                     3.5 * scale, 3.0 * scale, M['leaf_jacaranda'],
-                     cols['Vegetation'], verts=12)
-    elif tree_type == 'acacia':
-        # Flat-topped
-        add_cylinder(f'{name}_Crown', (x, y, trunk_h + 1.5 * scale),
-                     4.5 * scale, 1.5 * scale, M['leaf_acacia'],
-                     cols['Vegetation'], verts=10)
-    elif tree_type == 'palm':
-        # Tall thin trunk, small crown
-        add_cylinder(f'{name}_Trunk2', (x, y, trunk_h), 0.15 * scale, trunk_h * 0.5,
-                     M['trunk'], cols['Vegetation'], verts=8)
-        add_cylinder(f'{name}_Crown', (x, y, trunk_h * 1.5 + 2),
-                     2.5 * scale, 2.0 * scale, M['leaf_generic'],
-                     cols['Vegetation'], verts=10)
-    else:
-        # Generic round tree
-        bpy.ops.mesh.primitive_ico_sphere_add(radius=2.5 * scale,
-                                               location=(x, y, trunk_h + 2 * scale),
-                                               subdivisions=2)
-        cr = bpy.context.active_object
-        cr.name = f'{name}_Crown'
-        cr.data.materials.append(M['leaf_generic'])
-        link_to(cr, cols['Vegetation'])
-
-def build_vegetation(cols, M):
+    trunk_h = round(rng.uniform(4, 8))
+
+    def build(b):
+        # Trunk
+        b.cylinder(0.25, trunk_h, M['trunk'], verts=8, offset=(0, 0, trunk_h/2))
+
+        if tree_type == 'jacaranda':
+            # Wide spreading crown
+            b.cylinder(3.5, 3.0, M['leaf_jacaranda'], verts=12,
+                       offset=(0, 0, trunk_h + 2.5))
+        elif tree_type == 'acacia':
+            # Flat-topped
+            b.cylinder(4.5, 1.5, M['leaf_acacia'], verts=10,
+                       offset=(0, 0, trunk_h + 1.5))
+        elif tree_type == 'palm':
+            # Tall thin trunk, small crown
+            b.cylinder(0.15, trunk_h * 0.5, M['trunk'], verts=8,
+                       offset=(0, 0, trunk_h))
+            b.cylinder(2.5, 2.0, M['leaf_generic'], verts=10,
+                       offset=(0, 0, trunk_h * 1.5 + 2))
+        else:
+            # Generic round tree
+            b.icosphere(2.5, M['leaf_generic'], subdivisions=2, offset=(0, 0, trunk_h + 2))
+
+    # Crown as (material, radius, depth, centre height) for the coarse levels
+    leaf, radius, depth, crown_z = {
+        'jacaranda': (M['leaf_jacaranda'], 3.5, 3.0, trunk_h + 2.5),
+        'acacia':    (M['leaf_acacia'],    4.5, 1.5, trunk_h + 1.5),
+        'palm':      (M['leaf_generic'],   2.5, 2.0, trunk_h * 1.5 + 2),
+    }.get(tree_type, (M['leaf_generic'], 2.5, 5.0, trunk_h + 2))
+    top = crown_z - depth / 2
+
+    def build_low(b):
+        b.cylinder(0.25, top, M['trunk'], verts=4, offset=(0, 0, top/2))
+        if tree_type == 'generic':
+            b.icosphere(2.5, leaf, subdivisions=1, offset=(0, 0, crown_z))
+        else:
+            b.cylinder(radius, depth, leaf, verts=6, offset=(0, 0, crown_z))
+
+    def build_far(b):
+        b.box((0.5, 0.5, top), M['trunk'], offset=(0, 0, top/2))
+        b.box((radius * 1.6, radius * 1.6, depth), leaf, offset=(0, 0, crown_z))
+
+    return add_instance(name, f'tree_{tree_type}_{trunk_h}', build, (x, y, 0),
+                        cols['Vegetation'], scale=scale,
+                        lods=[(40, build_low), (120, build_far)])
+
+def build_vegetation(cols, M, rng):
+    scene = cols['Vegetation'].scene
+    kenyatta = scene.row('vegetation', -180, 190, 18)
+    uniway = scene.row('vegetation', -180, 190, 16)
+    # Park trees keep off the layout and off the street-tree trunks
+    trunks = [(x, y) for x in kenyatta for y in (-18, 18)]
+    trunks += [(x, y) for x in uniway for y in (64, 96)]
+    footprints = layout_footprints().extended(
+        [(x - 0.5, y - 0.5, x + 0.5, y + 0.5) for x, y in trunks])
+
     # Uhuru Park trees (west side)
     tree_types = ['jacaranda', 'acacia', 'generic', 'palm']
-    for i in range(60):
-        x = random.uniform(-180, -100)
-        y = random.uniform(-20, 80)
-        tt = random.choice(tree_types)
-        sc = random.uniform(0.7, 1.5)
-        build_tree(f'UhuruPark_Tree_{i}', x, y, tt, cols, M, scale=sc)
-
-    # Jeevanjee Gardens
-    for i in range(20):
-        x = random.uniform(-70, -40)
-        y = random.uniform(60, 90)
-        sc = random.uniform(0.8, 1.3)
-        build_tree(f'Jeevanjee_Tree_{i}', x, y, 'jacaranda', cols, M, scale=sc)
+    spots = scatter(rng, (-180, -20, -100, 80), scene.scaled('vegetation', 60), 4.0,
+                    footprints, clearance=2.0)
+    for i, (x, y) in enumerate(spots.tolist()):
+        tt = rng.choice(tree_types)
+        sc = rng.uniform(0.7, 1.5)
+        build_tree(f'UhuruPark_Tree_{i}', x, y, tt, cols, M, rng, scale=sc)
+
+    # Jeevanjee Gardens (north of University Way)
+    spots = scatter(rng, (-90, 92, -60, 122), scene.scaled('vegetation', 20), 4.0,
+                    footprints, clearance=2.0)
+    for i, (x, y) in enumerate(spots.tolist()):
+        sc = rng.uniform(0.8, 1.3)
+        build_tree(f'Jeevanjee_Tree_{i}', x, y, 'jacaranda', cols, M, rng, scale=sc)
 
     # Street trees along Kenyatta Ave
-    for i, tx in enumerate(range(-180, 190, 18)):
+    for i, tx in enumerate(kenyatta):
         for side in [-1, 1]:
             build_tree(f'KenyattaTree_{i}_{side}', tx, side * 18, 'jacaranda',
-                       cols, M, scale=0.9)
+                       cols, M, rng, scale=0.9)
 
     # University Way trees
-    for i, tx in enumerate(range(-180, 190, 16)):
+    for i, tx in enumerate(uniway):
         for side in [-1, 1]:
             build_tree(f'UniWay_Tree_{i}_{side}', tx, 80 + side * 16, 'generic',
-                       cols, M, scale=0.85)
+                       cols, M, rng, scale=0.85)
 
     # Grass patches — Uhuru Park
     add_box('UhuruPark_Grass', (-145, 30, 0.05), (80, 110, 0.1), M['grass'],
@@ -674,15 +1598,9 @@ def build_vegetation(cols, M):
 
 # ── Nairobi River ─────────────────────────────────────────────────────────────
 
-def build_river(cols, M):
+def build_river(cols, M, rng):
     # Nairobi River runs roughly E-W south of CBD
-    bpy.ops.mesh.primitive_cube_add(size=1, location=(0, -110, -0.2))
-    r = bpy.context.active_object
-    r.name = 'Nairobi_River'
-    r.scale = (400, 14, 0.4)
-    bpy.ops.object.transform_apply(scale=True)
-    r.data.materials.append(M['river'])
-    link_to(r, cols['Water'])
+    add_box('Nairobi_River', (0, -110, -0.2), (400, 14, 0.4), M['river'], cols['Water'])
 
     # Riverbanks
     for side in [-1, 1]:
@@ -692,27 +1610,27 @@ def build_river(cols, M):
 # ── Street Furniture ──────────────────────────────────────────────────────────
 
 def build_streetlamp(x, y, cols, M):
-    name = f'Lamp_{x:.0f}_{y:.0f}'
-    add_cylinder(f'{name}_Pole', (x, y, 5), 0.06, 10, M['lamppost'],
-                 cols['Street_Furniture'], verts=8)
-    # Arm
-    add_box(f'{name}_Arm', (x, y + 1.5, 10), (0.06, 3, 0.06), M['lamppost'],
-            cols['Street_Furniture'])
-    # Lamp head
-    add_box(f'{name}_Head', (x, y + 3, 9.7), (0.5, 0.8, 0.3), M['lamppost'],
-            cols['Street_Furniture'])
-    # Glow
-    add_box(f'{name}_Glow', (x, y + 3, 9.5), (0.4, 0.7, 0.15), M['lamp_glow'],
-            cols['Street_Furniture'])
-
-def build_street_furniture(cols, M):
+    def build(b):
+        b.cylinder(0.06, 10, M['lamppost'], verts=8, offset=(0, 0, 5))
+        # Arm
+        b.box((0.06, 3, 0.06), M['lamppost'], offset=(0, 1.5, 10))
+        # Lamp head
+        b.box((0.5, 0.8, 0.3), M['lamppost'], offset=(0, 3, 9.7))
+        # Glow
+        b.box((0.4, 0.7, 0.15), M['lamp_glow'], offset=(0, 3, 9.5))
+
+    return add_instance(f'Lamp_{x:.0f}_{y:.0f}', 'streetlamp', build, (x, y, 0),
+                        cols['Street_Furniture'])
+
+def build_street_furniture(cols, M, rng):
+    scene = cols['Street_Furniture'].scene
     # Lampposts along Kenyatta Ave
-    for lx in range(-160, 170, 22):
+    for lx in scene.row('furniture', -160, 170, 22):
         for side in [-1, 1]:
             build_streetlamp(lx, side * 16, cols, M)
 
     # Lampposts along Moi Ave
-    for ly in range(-140, 150, 22):
+    for ly in scene.row('furniture', -140, 150, 22):
         build_streetlamp(-16, ly, cols, M)
         build_streetlamp(16, ly, cols, M)
 
@@ -721,7 +1639,7 @@ def build_street_furniture(cols, M):
         (30, -16), (-30, -16), (80, -16), (-80, -16),
         (30, 16),  (-30, 16),
     ]
-    for sx, sy in shelter_positions:
+    for sx, sy in scene.thin('furniture', shelter_positions):
         # Roof
         add_box(f'Shelter_{sx}_{sy}_Roof', (sx, sy, 2.6), (6, 2, 0.15),
                 M['metal_dark'], cols['Street_Furniture'])
@@ -736,7 +1654,7 @@ def build_street_furniture(cols, M):
 
     # Benches
     bench_positions = [(10, 17), (-10, 17), (40, 17), (-40, 17)]
-    for bx, by in bench_positions:
+    for bx, by in scene.thin('furniture', bench_positions):
         add_box(f'Bench_{bx}_{by}', (bx, by, 0.45), (2.5, 0.4, 0.06),
                 M['bench'], cols['Street_Furniture'])
         for leg_x in [-0.9, 0.9]:
@@ -747,52 +1665,46 @@ def build_street_furniture(cols, M):
 
 def build_matatu(name, x, y, rot_z, cols, M):
     """14-seater matatu (Toyota HiAce style)"""
-    rot = (0, 0, rot_z)
-    add_box(f'{name}_Body', (x, y, 1.1), (2.0, 5.0, 2.2), M['matatu_body'],
-            cols['Vehicles'], rot=rot)
-    # Colour stripe
-    add_box(f'{name}_Stripe', (x, y, 1.1), (2.05, 5.0, 0.4), M['matatu_stripe'],
-            cols['Vehicles'], rot=rot)
-    # Windows
-    add_box(f'{name}_WinF', (x, y + 2.4, 1.3), (1.8, 0.1, 0.9), M['glass_blue'],
-            cols['Vehicles'], rot=rot)
-    add_box(f'{name}_WinR', (x, y - 2.4, 1.3), (1.8, 0.1, 0.9), M['glass_blue'],
-            cols['Vehicles'], rot=rot)
-    # Wheels
-    for wx, wy in [(-1.1, 1.5), (1.1, 1.5), (-1.1, -1.5), (1.1, -1.5)]:
-        add_cylinder(f'{name}_Wheel_{wx}_{wy}',
-                     (x + wx, y + wy, 0.35), 0.35, 0.25,
-                     M['metal_dark'], cols['Vehicles'],
-                     rot=(0, math.pi/2, rot_z), verts=14)
-
-def build_vehicles(cols, M):
+    def build(b):
+        b.box((2.0, 5.0, 2.2), M['matatu_body'], offset=(0, 0, 1.1))
+        # Colour stripe
+        b.box((2.05, 5.0, 0.4), M['matatu_stripe'], offset=(0, 0, 1.1))
+        # Windows
+        b.box((1.8, 0.1, 0.9), M['glass_blue'], offset=(0, 2.4, 1.3))
+        b.box((1.8, 0.1, 0.9), M['glass_blue'], offset=(0, -2.4, 1.3))
+        # Wheels
+        for wx, wy in [(-1.1, 1.5), (1.1, 1.5), (-1.1, -1.5), (1.1, -1.5)]:
+            b.cylinder(0.35, 0.25, M['metal_dark'], verts=14,
+                       rot=(0, math.pi/2, 0), offset=(wx, wy, 0.35))
+
+    return add_instance(name, 'matatu', build, (x, y, 0), cols['Vehicles'], rot_z=rot_z)
+
+def build_vehicles(cols, M, rng):
     matatu_positions = [
         (22, 5, 0), (-22, -5, math.pi), (52, 8, 0),
         (52, -8, math.pi), (-52, 5, 0), (0, 55, math.pi/2),
         (0, -55, math.pi/2), (8, -30, math.pi/2),
     ]
-    for i, (x, y, r) in enumerate(matatu_positions):
+    scene = cols['Vehicles'].scene
+    for i, (x, y, r) in enumerate(scene.thin('vehicles', matatu_positions)):
         build_matatu(f'Matatu_{i}', x, y, r, cols, M)
 
-    # Parked generic cars
-    car_mat = make_material('M_Car_Generic', (0.2, 0.3, 0.7), roughness=0.3, metallic=0.05)
+    # Parked generic cars (one shared paint material, colour per car)
     car_positions = [
         (30, -18), (-30, -18), (70, -18), (-70, -18),
         (30, 18), (-30, 18),
         (55, 25), (55, 30), (55, 35),
     ]
-    for i, (cx, cy) in enumerate(car_positions):
-        col_r = random.uniform(0.1, 0.9)
-        col_g = random.uniform(0.1, 0.9)
-        col_b = random.uniform(0.1, 0.9)
-        car_col = make_material(f'M_Car_{i}', (col_r, col_g, col_b),
-                                roughness=0.35, metallic=0.05)
-        add_box(f'Car_{i}_Body', (cx, cy, 0.7), (1.8, 4.0, 1.4), car_col, cols['Vehicles'])
-        add_box(f'Car_{i}_Roof', (cx, cy - 0.2, 1.55), (1.6, 2.2, 0.65), car_col, cols['Vehicles'])
+    for i, (cx, cy) in enumerate(scene.thin('vehicles', car_positions)):
+        paint = (rng.uniform(0.1, 0.9), rng.uniform(0.1, 0.9), rng.uniform(0.1, 0.9))
+        car = PartList()
+        car.box((1.8, 4.0, 1.4), M['car_paint'], offset=(0, 0, 0.7), color=paint)
+        car.box((1.6, 2.2, 0.65), M['car_paint'], offset=(0, -0.2, 1.55), color=paint)
+        cols['Vehicles'].add(f'Car_{i}', (cx, cy, 0), car)
 
 # ── Jua Kali / Market Stalls ──────────────────────────────────────────────────
 
-def build_market_stalls(cols, M):
+def build_market_stalls(cols, M, rng):
     stall_positions = [
         # Jeevanjee Market area
         (-60, 70), (-55, 70), (-50, 70), (-45, 70),
@@ -801,26 +1713,633 @@ def build_market_stalls(cols, M):
         # River Road area
         (30, 75), (35, 75), (40, 75),
     ]
-    for i, (sx, sy) in enumerate(stall_positions):
-        # Frame
-        for px, py in [(-1.2, -1.2), (1.2, -1.2), (-1.2, 1.2), (1.2, 1.2)]:
-            add_cylinder(f'Stall_{i}_Post_{px}_{py}', (sx + px, sy + py, 1.2),
-                         0.04, 2.4, M['metal_dark'], cols['Street_Furniture'], verts=6)
-        # Canopy
+    canopy_colours = [(0.80, 0.30, 0.10), (0.1, 0.4, 0.7), (0.2, 0.6, 0.1)]
+
+    scene = cols['Street_Furniture'].scene
+    for i, (sx, sy) in enumerate(scene.thin('furniture', stall_positions)):
         col_idx = i % 3
-        canopy_mats = [M['stall_fabric'],
-                       make_material(f'StallFab_{i}', (0.1, 0.4, 0.7), roughness=0.97),
-                       make_material(f'StallFab2_{i}', (0.2, 0.6, 0.1), roughness=0.97)]
-        add_box(f'Stall_{i}_Canopy', (sx, sy, 2.5), (2.8, 2.8, 0.12),
-                canopy_mats[col_idx], cols['Street_Furniture'])
-        # Table
-        add_box(f'Stall_{i}_Table', (sx, sy, 0.85), (2.0, 1.5, 0.06),
-                M['bench'], cols['Street_Furniture'])
+
+        def build(b):
+            # Frame
+            for px, py in [(-1.2, -1.2), (1.2, -1.2), (-1.2, 1.2), (1.2, 1.2)]:
+                b.cylinder(0.04, 2.4, M['metal_dark'], verts=6, offset=(px, py, 1.2))
+            # Canopy
+            b.box((2.8, 2.8, 0.12), M['stall_fabric'], offset=(0, 0, 2.5),
+                  color=canopy_colours[col_idx])
+            # Table
+            b.box((2.0, 1.5, 0.06), M['bench'], offset=(0, 0, 0.85))
+
+        add_instance(f'Stall_{i}', f'market_stall_{col_idx}', build, (sx, sy, 0),
+                     cols['Street_Furniture'])
+
+# ── City Description ─────────────────────────────────────────────────────────
+
+#  Every stage draws from its own random.Random, seeded from the master seed
+#  and the stage's function name alone. A stage's output therefore does not
+#  depend on which other stages ran, or in what order: any subset can be
+#  rebuilt on its own, or the stages spread over worker processes, and the
+#  merged scene is identical to a serial build.
+#
+#  That also makes each stage's description a content hash of its inputs
+#  (layout tables, materials, seed, generator code): build_nairobi(
+#  incremental=True) re-realises only the stages whose hash changed.
+
+GENERATOR_VERSION = 1  # bump when the Blender backend changes what it makes
+
+BUILD_STAGES = [
+    ('Ground',                   build_ground),
+    ('Road network',             build_roads),
+    ('CBD buildings',            build_cbd_buildings),
+    ('KICC landmark',            build_kicc),
+    ('Times Tower',              build_times_tower),
+    ('Parliament Buildings',     build_parliament),
+    ('Traffic lights',           build_all_traffic_lights),
+    ('Road signs',               build_road_signs),
+    ('Vegetation',               build_vegetation),
+    ('Street furniture',         build_street_furniture),
+    ('Market stalls',            build_market_stalls),
+    ('Vehicles & matatus',       build_vehicles),
+    ('Nairobi River',            build_river),
+]
+
+def stage_rng(seed, name):
+    """Deterministic generator for one build stage (stable across processes)."""
+    digest = hashlib.sha256(f'{seed}/{name}'.encode()).digest()
+    return random.Random(int.from_bytes(digest[:8], 'big'))
+
+def describe_city(seed=42, log=print, stages=None, workers=1, density=None):
+    """
+    Run the build stages into a fresh CityScene. Needs no Blender.
+
+    stages:  names of the stage functions to run ('build_vegetation', ...),
+             in the order given; default all of BUILD_STAGES
+    workers: > 1 describes each stage in its own process and merges the
+             results in stage order
+    density: multipliers for scattered objects, e.g. {'vegetation': 0.5};
+             keys 'vegetation', 'ground', 'furniture', 'vehicles'
+    """
+    names = stages or [stage.__name__ for _, stage in BUILD_STAGES]
+    labels = {stage.__name__: (label, stage) for label, stage in BUILD_STAGES}
+    log = log or (lambda msg: None)
+
+    if workers > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        scene = CityScene(density)
+        setup_collections(scene)
+        with ProcessPoolExecutor(workers) as pool:
+            parts = pool.map(describe_city, [seed] * len(names), [None] * len(names),
+                             [[name] for name in names], [1] * len(names),
+                             [density] * len(names))
+            for i, (name, part) in enumerate(zip(names, parts), 1):
+                log(f"[{i}/{len(names)}] {labels[name][0]}...")
+                scene.merge(part)
+        return scene
+
+    scene = CityScene(density)
+    cols = setup_collections(scene)
+    M = setup_materials()
+    for i, name in enumerate(names, 1):
+        label, stage = labels[name]
+        log(f"[{i}/{len(names)}] {label}...")
+        stage(cols, M, stage_rng(seed, name))
+    return scene
+
+def describe_stages(seed=42, log=print, report=None, density=None):
+    """
+    Describe each stage into its own CityScene. Returns ({stage name: scene},
+    {stage name: digest}); the digest covers the seed and GENERATOR_VERSION.
+    A BuildReport, if given, gets each stage's timing and statistics.
+    """
+    log = log or (lambda msg: None)
+    report = report or BuildReport(seed)
+    scenes, digests = {}, {}
+    for i, (label, stage) in enumerate(BUILD_STAGES, 1):
+        log(f"[{i}/{len(BUILD_STAGES)}] {label}...")
+        name = stage.__name__
+        scenes[name] = report.measure(name, 'describe', describe_city, seed, None, [name],
+                                      1, density)
+        report.count(name, scenes[name])
+        digests[name] = hashlib.sha256(
+            f'{GENERATOR_VERSION}/{seed}/{name}/{scenes[name].digest()}'.encode()).hexdigest()
+    return scenes, digests
+
+# ── Build Report ─────────────────────────────────────────────────────────────
+#
+#  BuildReport times every stage (description and, inside Blender, realisation),
+#  samples process memory around it and counts what the stage produced:
+#  objects, vertices, triangles and materials, plus per-collection totals with
+#  draw calls as the GLB exporter writes them (one per material per mesh, one
+#  per material per instanced prototype). Budgets cap any of those numbers per
+#  stage, per collection ('*' for every collection) or for the whole city:
+#
+#    {"collections": {"Vegetation": {"triangles": 20000, "draw_calls": 40}},
+#     "stages": {"build_vegetation": {"describe_ms": 20}},
+#     "total": {"triangles": 120000}}
+
+class BudgetError(RuntimeError):
+    """A build exceeded one or more of its budgets."""
+
+def _memory_kib():
+    """Resident set size in KiB (Linux), else peak RSS, else None."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak // 1024 if sys.platform == 'darwin' else peak
+    except ImportError:
+        return None
+
+_part_counts = {}
+
+def part_counts(part):
+    """(vertices, triangles) of one Part's geometry."""
+    sig = (part.kind, part.args)
+    if sig not in _part_counts:
+        verts, faces, _ = part.geometry()
+        _part_counts[sig] = (len(verts), sum(len(f) - 2 for f in faces))
+    return _part_counts[sig]
+
+def scene_stats(scene):
+    """{collection: {objects, vertices, triangles, draw_calls, materials}}."""
+    stats = {}
+    for name, col in scene.collections.items():
+        verts = tris = calls = 0
+        keys = set()
+        for prim in col.primitives:
+            for part in prim.parts:
+                v, t = part_counts(part)
+                verts, tris = verts + v, tris + t
+            mats = {part.material.key for part in prim.parts}
+            calls += len(mats)
+            keys |= mats
+        for key in {inst.key for inst in col.instances}:
+            mats = {part.material.key for part in scene.prototypes[key]}
+            calls += len(mats)
+            keys |= mats
+        for inst in col.instances:
+            for part in scene.prototypes[inst.key]:
+                v, t = part_counts(part)
+                verts, tris = verts + v, tris + t
+        stats[name] = {'objects': len(col.primitives) + len(col.instances),
+                       'vertices': verts, 'triangles': tris,
+                       'draw_calls': calls, 'materials': len(keys)}
+    return stats
+
+class BuildReport:
+    """Per-stage timings and statistics of one build, as JSON."""
+
+    def __init__(self, seed=42):
+        self.seed = seed
+        self.stages = {}
+        self.collections = {}
+        self.violations = []
+        self._start = time.perf_counter()
+
+    def measure(self, name, phase, fn, *args):
+        """Run fn(*args) as `phase` ('describe', 'realise') of stage `name`."""
+        record = self.stages.setdefault(name, {})
+        mem, t0 = _memory_kib(), time.perf_counter()
+        result = fn(*args)
+        record[f'{phase}_ms'] = round((time.perf_counter() - t0) * 1000, 3)
+        if mem is not None:
+            record['memory_kib'] = record.get('memory_kib', 0) + _memory_kib() - mem
+        return result
+
+    def count(self, name, scene):
+        """Add a stage's scene to the stage and collection statistics."""
+        record = self.stages.setdefault(name, {})
+        keys = set()
+        for col_name, col_stats in scene_stats(scene).items():
+            totals = self.collections.setdefault(col_name, dict.fromkeys(col_stats, 0))
+            for key, value in col_stats.items():
+                totals[key] += value
+                if key != 'materials':
+                    record[key] = record.get(key, 0) + value
+        for col in scene.collections.values():
+            for prim in col.primitives:
+                keys |= {part.material.key for part in prim.parts}
+            for key in {inst.key for inst in col.instances}:
+                keys |= {part.material.key for part in scene.prototypes[key]}
+        record['materials'] = len(keys)
+
+    def totals(self):
+        out = {}
+        for col_stats in self.collections.values():
+            for key, value in col_stats.items():
+                if key != 'materials':
+                    out[key] = out.get(key, 0) + value
+        return out
+
+    def check(self, budgets):
+        """Record and return every number above its cap in `budgets`."""
+        def over(scope, actual, limits):
+            for key, cap in (limits or {}).items():
+                if actual.get(key, 0) > cap:
+                    self.violations.append(f"{scope}: {key} {actual[key]} > {cap}")
+
+        cols = budgets.get('collections', {})
+        for name, stats in self.collections.items():
+            over(f"collection {name}", stats, cols.get('*'))
+            over(f"collection {name}", stats, cols.get(name))
+        for name, limits in budgets.get('stages', {}).items():
+            over(f"stage {name}", self.stages.get(name, {}), limits)
+        over("total", self.totals(), budgets.get('total'))
+        return self.violations
+
+    def to_dict(self):
+        return {
+            'version': 1, 'seed': self.seed, 'generator': GENERATOR_VERSION,
+            'total_ms': round((time.perf_counter() - self._start) * 1000, 3),
+            'stages': self.stages, 'collections': self.collections,
+            'totals': self.totals(), 'violations': self.violations,
+        }
+
+    def write(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+def apply_budgets(report, budgets, report_path=None):
+    """
+    Write the report (if `report_path`) and raise BudgetError when `budgets`
+    (a dict, or a path to a JSON file) is exceeded.
+    """
+    if isinstance(budgets, str):
+        with open(budgets) as f:
+            budgets = json.load(f)
+    violations = report.check(budgets) if budgets else []
+    if report_path:
+        report.write(report_path)
+        print(f"  Build report: {report_path}")
+    if violations:
+        raise BudgetError("over budget:\n  " + "\n  ".join(violations))
+
+# ── Blender Backend ──────────────────────────────────────────────────────────
+#
+#  Realises a CityScene in the open .blend: one mesh per primitive written
+#  through MeshBuilder, one shared mesh per prop prototype placed as linked
+#  duplicates, and one bpy material per distinct MaterialDef. Instances of a
+#  prototype are parented to a Props_<key> empty, which is what the glTF
+#  exporter needs to write them out with EXT_mesh_gpu_instancing.
+#
+#  Every object records the build stage that made it (`nairobi_stage`) and
+#  every material its shader key (`nairobi_key`); the scene keeps the stage
+#  digests of the last build, so an incremental rebuild can swap out just the
+#  stages that changed.
+
+BUILD_STATE = 'nairobi_build'   # scene property: JSON of the last build
+STAGE_TAG = 'nairobi_stage'
+MATERIAL_TAG = 'nairobi_key'
+
+def clear_scene():
+    """Remove all objects, collections and their mesh data."""
+    for obj in list(bpy.data.objects):
+        bpy.data.objects.remove(obj, do_unlink=True)
+    for col in list(bpy.data.collections):
+        bpy.data.collections.remove(col)
+    for mesh in list(bpy.data.meshes):
+        if mesh.users == 0:
+            bpy.data.meshes.remove(mesh)
+
+def new_collection(name):
+    col = bpy.data.collections.new(name)
+    bpy.context.scene.collection.children.link(col)
+    return col
+
+def mesh_object(name, builder, collection, loc=(0, 0, 0)):
+    """Create an object for the builder's geometry with its origin at `loc`."""
+    obj = bpy.data.objects.new(name, builder.to_mesh(name))
+    obj.location = loc
+    collection.objects.link(obj)
+    return obj
+
+def _new_principled(name):
+    mat = bpy.data.materials.new(name=name)
+    mat.use_nodes = True
+    nodes = mat.node_tree.nodes
+    nodes.clear()
+
+    output = nodes.new('ShaderNodeOutputMaterial')
+    output.location = (400, 0)
+
+    bsdf = nodes.new('ShaderNodeBsdfPrincipled')
+    bsdf.location = (0, 0)
+    mat.node_tree.links.new(bsdf.outputs['BSDF'], output.inputs['Surface'])
+    return mat, bsdf
+
+def _set_socket(bsdf, names, value):
+    """Set the first input in `names` this Blender version has (3.x vs 4.x)."""
+    for socket in names:
+        if socket in bsdf.inputs:
+            bsdf.inputs[socket].default_value = value
+            return
+
+def realise_material(mdef, cache):
+    """bpy material for `mdef`, shared by every MaterialDef with its key."""
+    mat = cache.get(mdef.key)
+    if mat is not None:
+        return mat
+
+    mat, bsdf = _new_principled(mdef.name)
+    if mdef.palette:
+        attr = mat.node_tree.nodes.new('ShaderNodeVertexColor')
+        attr.location = (-300, 0)
+        attr.layer_name = PALETTE_ATTRIBUTE
+        mat.node_tree.links.new(attr.outputs['Color'], bsdf.inputs['Base Color'])
+    else:
+        bsdf.inputs['Base Color'].default_value = (*mdef.color, 1.0)
+    bsdf.inputs['Roughness'].default_value = mdef.roughness
+    bsdf.inputs['Metallic'].default_value = mdef.metallic
+    _set_socket(bsdf, ('Specular IOR Level', 'Specular'), mdef.specular)
+    if mdef.alpha < 1.0:
+        bsdf.inputs['Alpha'].default_value = mdef.alpha
+        mat.blend_method = 'BLEND'
+
+    if mdef.emission:
+        _set_socket(bsdf, ('Emission Color', 'Emission'), (*mdef.emission, 1.0))
+        bsdf.inputs['Emission Strength'].default_value = 3.0
+
+    mat[MATERIAL_TAG] = repr(mdef.key)
+    cache[mdef.key] = mat
+    return mat
+
+def existing_materials(mdefs):
+    """Cache for realise_material() pre-filled with this .blend's materials."""
+    tagged = {mat.get(MATERIAL_TAG): mat for mat in bpy.data.materials}
+    return {key: tagged[repr(key)] for key in mdefs if repr(key) in tagged}
+
+def parts_builder(parts, materials):
+    builder = MeshBuilder()
+    for part in parts:
+        builder.add(part.geometry(), realise_material(part.material, materials),
+                    part.rot, part.offset, part.color)
+    return builder
+
+def realise_scene(scene, stage=None, materials=None):
+    """
+    Create collections, materials, meshes and instances; returns collections.
+    Existing collections of the same name are reused, and new objects are
+    tagged with `stage`. `materials` is a realise_material() cache.
+    """
+    materials = {} if materials is None else materials
+    proto_meshes, cols, made = {}, {}, []
+    for name, col in scene.collections.items():
+        bcol = cols[name] = bpy.data.collections.get(name) or new_collection(name)
+        for prim in col.primitives:
+            made.append(mesh_object(prim.name, parts_builder(prim.parts, materials),
+                                    bcol, prim.loc))
+
+        roots = {}
+        for inst in col.instances:
+            mesh = proto_meshes.get(inst.key)
+            if mesh is None:
+                mesh = proto_meshes[inst.key] = parts_builder(
+                    scene.prototypes[inst.key], materials).to_mesh(f'Proto_{inst.key}')
+            root = roots.get(inst.key)
+            if root is None:
+                root = roots[inst.key] = bpy.data.objects.new(f'Props_{inst.key}', None)
+                bcol.objects.link(root)
+                made.append(root)
+            obj = bpy.data.objects.new(inst.name, mesh)
+            obj.location = inst.loc
+            obj.rotation_euler = (0, 0, inst.rot_z)
+            obj.scale = (inst.scale, inst.scale, inst.scale)
+            obj.parent = root
+            bcol.objects.link(obj)
+            made.append(obj)
+    if stage:
+        for obj in made:
+            obj[STAGE_TAG] = stage
+    return cols
+
+def rebuild_stages(scenes, digests, previous, report=None):
+    """
+    Replace the objects of every stage whose digest differs from `previous`
+    (stage name -> digest of the last build) and leave the rest untouched.
+    Returns {stage name: 'reused' | 'rebuilt' | 'removed'}.
+    """
+    report = report or BuildReport()
+    outcomes = {name: 'reused' if previous.get(name) == digest else 'rebuilt'
+                for name, digest in digests.items()}
+    outcomes.update({name: 'removed' for name in previous if name not in digests})
+    stale = {name for name, state in outcomes.items() if state != 'reused'}
+
+    for obj in list(bpy.data.objects):
+        if obj.get(STAGE_TAG) in stale:
+            bpy.data.objects.remove(obj, do_unlink=True)
+    for mesh in list(bpy.data.meshes):
+        if mesh.users == 0:
+            bpy.data.meshes.remove(mesh)
+
+    materials = existing_materials(
+        {key for name in stale if name in scenes for key in scenes[name].materials()})
+    for name, scene in scenes.items():
+        if name in stale:
+            report.measure(name, 'realise', realise_scene, scene, name, materials)
+    for mat in list(bpy.data.materials):
+        if mat.users == 0 and MATERIAL_TAG in mat:
+            bpy.data.materials.remove(mat)
+    return outcomes
+
+def export_glb(filepath):
+    """Export the scene as binary glTF, with prop instances on the GPU."""
+    options = dict(filepath=filepath, export_format='GLB')
+    props = bpy.ops.export_scene.gltf.get_rna_type().properties
+    if 'export_gpu_instances' in props:  # Blender 3.6+
+        options['export_gpu_instances'] = True
+    if 'export_attributes' in props:     # keeps `_element_id` on batched meshes
+        options['export_attributes'] = True
+    bpy.ops.export_scene.gltf(**options)
+
+# ── Static Batching (Blender) ───────────────────────────────────────────────
+#
+#  Optional post-build pass: every static mesh object in a collection is merged
+#  with the others that share its material, leaving one mesh per material per
+#  collection. Prop instances (parented to their Props_ empty) are left alone
+#  so they stay GPU-instanced. Each merged object keeps an integer point
+#  attribute `_element_id`, and a sidecar maps ids back to the original object
+#  names, vertex/face ranges and bounds so single elements can still be picked.
+
+def _world_parts(obj):
+    """
+    Split `obj`'s mesh into world-space (material, (verts, faces, uvs), colors)
+    parts; `colors` holds the palette colour per face corner, or None.
+    """
+    mesh = obj.data
+    rows = [tuple(r) for r in obj.matrix_world]
+    co = [0.0] * (3 * len(mesh.vertices))
+    mesh.vertices.foreach_get('co', co)
+    world = [tuple(r[0] * co[k] + r[1] * co[k + 1] + r[2] * co[k + 2] + r[3]
+                   for r in rows[:3]) for k in range(0, len(co), 3)]
+
+    n_loops, n_polys = len(mesh.loops), len(mesh.polygons)
+    loop_verts = [0] * n_loops
+    mesh.loops.foreach_get('vertex_index', loop_verts)
+    uv = [0.0] * (2 * n_loops)
+    if mesh.uv_layers.active:
+        mesh.uv_layers.active.data.foreach_get('uv', uv)
+    palette = mesh.color_attributes.get(PALETTE_ATTRIBUTE)
+    rgba = None
+    if palette is not None and palette.domain == 'CORNER':
+        rgba = [0.0] * (4 * n_loops)
+        palette.data.foreach_get('color', rgba)
+    starts, totals, slots = [0] * n_polys, [0] * n_polys, [0] * n_polys
+    mesh.polygons.foreach_get('loop_start', starts)
+    mesh.polygons.foreach_get('loop_total', totals)
+    mesh.polygons.foreach_get('material_index', slots)
+
+    parts = {}
+    for start, total, slot in zip(starts, totals, slots):
+        verts, faces, uvs, colors, remap = parts.setdefault(slot, ([], [], [], [], {}))
+        face = []
+        for l in range(start, start + total):
+            vi = loop_verts[l]
+            if vi not in remap:
+                remap[vi] = len(verts)
+                verts.append(world[vi])
+            face.append(remap[vi])
+            uvs.append((uv[2 * l], uv[2 * l + 1]))
+            if rgba is not None:
+                colors.append(tuple(rgba[4 * l:4 * l + 3]))
+        faces.append(tuple(face))
+    return [(mesh.materials[slot], (verts, faces, uvs), colors or None)
+            for slot, (verts, faces, uvs, colors, _) in sorted(parts.items())]
+
+def batch_static_geometry(cols, sidecar_path=None):
+    """
+    Merge static geometry per (collection, material). Returns the element
+    mapping and, if `sidecar_path` is given, also writes it there as JSON.
+    """
+    bpy.context.view_layer.update()  # matrix_world of fresh objects
+    mapping = {'version': 1, 'batches': {}}
+    before = after = 0
+
+    for col_name, col in cols.items():
+        static = [o for o in col.objects
+                  if o.type == 'MESH' and o.parent is None and o.data.users == 1]
+        if not static:
+            continue
+        groups = {}
+        for obj in static:
+            for mat, geom, colors in _world_parts(obj):
+                groups.setdefault(mat, []).append((obj.name, geom, colors))
+
+        for mat, elements in groups.items():
+            name = f'{col_name}_{mat.name}'
+            builder, ids, records = MeshBuilder(), [], []
+            for element_id, (elem_name, geom, colors) in enumerate(elements):
+                v0, f0 = len(builder.verts), len(builder.faces)
+                builder.add(geom, mat, color=colors)
+                verts = geom[0]
+                ids.extend([element_id] * len(verts))
+                records.append({
+                    'name': elem_name,
+                    'verts': [v0, len(verts)],
+                    'faces': [f0, len(builder.faces) - f0],
+                    'bbox': [[round(min(v[k] for v in verts), 3) for k in range(3)],
+                             [round(max(v[k] for v in verts), 3) for k in range(3)]],
+                })
+            obj = mesh_object(name, builder, col)
+            attr = obj.data.attributes.new('_element_id', 'INT', 'POINT')
+            attr.data.foreach_set('value', ids)
+            mapping['batches'][name] = {'collection': col_name, 'material': mat.name,
+                                        'elements': records}
+            after += 1
+
+        before += len(static)
+        for obj in static:
+            mesh = obj.data
+            bpy.data.objects.remove(obj, do_unlink=True)
+            bpy.data.meshes.remove(mesh)
+
+    print(f"  Static batching: {before} objects -> {after} batched meshes")
+    if sidecar_path:
+        with open(sidecar_path, 'w') as f:
+            json.dump(mapping, f, indent=1)
+        print(f"  Element map written to {sidecar_path}")
+    return mapping
+
+BENCHMARK_COUNTS = (100, 400, 1000)
+
+def benchmark_mesh_backends(counts=BENCHMARK_COUNTS):
+    """
+    Time the data-API backend against the bpy.ops path it replaced.
+    Builds `n` boxes and `n` cylinders each way for every n in `counts`;
+    the operator path slows down per object as the scene fills up.
+    """
+    col = new_collection('Benchmark')
+    mat = realise_material(make_material('M_Benchmark', (0.5, 0.5, 0.5)), {})
+    results = []
+
+    def move(obj):
+        # the operators add to the active collection, whichever that is
+        for other in obj.users_collection:
+            other.objects.unlink(obj)
+        col.objects.link(obj)
+
+    def purge():
+        for obj in list(col.objects):
+            mesh = obj.data
+            bpy.data.objects.remove(obj, do_unlink=True)
+            bpy.data.meshes.remove(mesh)
+
+    for n in counts:
+        t0 = time.perf_counter()
+        for i in range(n):
+            bpy.ops.mesh.primitive_cube_add(size=1, location=(i * 3, 0, 0))
+            obj = bpy.context.active_object
+            obj.scale = (2, 1, 3)
+            bpy.ops.object.transform_apply(scale=True, rotation=True)
+            obj.data.materials.append(mat)
+            move(obj)
+            bpy.ops.mesh.primitive_cylinder_add(vertices=12, radius=0.5,
+                                                depth=2, location=(i * 3, 5, 0))
+            obj = bpy.context.active_object
+            bpy.ops.object.transform_apply(rotation=True)
+            obj.data.materials.append(mat)
+            move(obj)
+        t_ops = time.perf_counter() - t0
+        purge()
+
+        t0 = time.perf_counter()
+        for i in range(n):
+            mesh_object(f'Bench_Box_{i}', MeshBuilder().add(box_geometry((2, 1, 3)), mat),
+                        col, (i * 3, 0, 0))
+            mesh_object(f'Bench_Cyl_{i}', MeshBuilder().add(cylinder_geometry(0.5, 2), mat),
+                        col, (i * 3, 5, 0))
+        t_data = time.perf_counter() - t0
+        purge()
+
+        results.append((n, t_ops, t_data))
+        print(f"  {2 * n:>5} objects   bpy.ops {t_ops:7.2f}s   "
+              f"data API {t_data:7.2f}s   x{t_ops / max(t_data, 1e-9):.1f}")
+
+    bpy.data.collections.remove(col)
+    return results
 
 # ── Sky & Lighting ─────────────────────────────────────────────────────────────
 
-def setup_lighting():
-    """Realistic Nairobi daytime sky — equatorial sun, clear day"""
+# Named lighting set-ups for setup_lighting(); 'day' is the original clear
+# equatorial noon. Angles in degrees (tilt of the sun lamp from vertical, sky
+# sun elevation), energies in Blender units. At night the "sun" is moonlight.
+LIGHTING_PROFILES = {
+    'day':   {'sun_energy': 4.5, 'sun_color': (1.0, 0.97, 0.88), 'tilt': 25,
+              'elevation': 62, 'sky_strength': 1.2,
+              'fill_energy': 800, 'fill_color': (0.7, 0.85, 1.0)},
+    'dusk':  {'sun_energy': 2.0, 'sun_color': (1.0, 0.62, 0.36), 'tilt': 82,
+              'elevation': 6, 'sky_strength': 0.6,
+              'fill_energy': 400, 'fill_color': (0.85, 0.7, 0.9)},
+    'night': {'sun_energy': 0.08, 'sun_color': (0.6, 0.7, 1.0), 'tilt': 40,
+              'elevation': -8, 'sky_strength': 0.05,
+              'fill_energy': 150, 'fill_color': (1.0, 0.78, 0.5)},
+}
+
+def setup_lighting(profile='day'):
+    """Nairobi sky and sun for one of LIGHTING_PROFILES (default clear day)"""
+    light = LIGHTING_PROFILES[profile]
     scene = bpy.context.scene
 
     # Remove existing lights
@@ -829,12 +2348,12 @@ def setup_lighting():
             bpy.data.objects.remove(obj)
 
     # Sun (Nairobi sits 1° south of equator — near-vertical sun)
-    bpy.ops.object.light_add(type='SUN', location=(0, 0, 100))
-    sun = bpy.context.active_object
-    sun.name = 'Nairobi_Sun'
-    sun.rotation_euler = Euler((math.radians(25), 0, math.radians(30)))
-    sun.data.energy = 4.5
-    sun.data.color = (1.0, 0.97, 0.88)
+    sun = bpy.data.objects.new('Nairobi_Sun', bpy.data.lights.new('Nairobi_Sun', 'SUN'))
+    scene.collection.objects.link(sun)
+    sun.location = (0, 0, 100)
+    sun.rotation_euler = (math.radians(light['tilt']), 0, math.radians(30))
+    sun.data.energy = light['sun_energy']
+    sun.data.color = light['sun_color']
     if hasattr(sun.data, 'angle'):
         sun.data.angle = math.radians(0.5)  # Sharp sun disc
 
@@ -850,11 +2369,11 @@ def setup_lighting():
 
     bg = wn.new('ShaderNodeBackground')
     bg.inputs['Color'].default_value = (0.53, 0.81, 0.98, 1.0)  # Nairobi clear sky blue
-    bg.inputs['Strength'].default_value = 1.2
+    bg.inputs['Strength'].default_value = light['sky_strength']
 
     sky_tex = wn.new('ShaderNodeTexSky')
     sky_tex.sky_type = 'NISHITA'
-    sky_tex.sun_elevation = math.radians(62)  # Near-zenith equatorial sun
+    sky_tex.sun_elevation = math.radians(light['elevation'])
     sky_tex.sun_rotation = math.radians(30)
     sky_tex.air_density = 1.0
     sky_tex.dust_density = 0.5  # Some haze typical of Nairobi
@@ -862,28 +2381,50 @@ def setup_lighting():
     tex_coord = wn.new('ShaderNodeTexCoord')
     output = wn.new('ShaderNodeOutputWorld')
 
-    wl.new(tex_coord.outputs['Generated'], sky_tex.inputs['Vector'])
+    if sky_tex.inputs.get('Vector') is not None:  # Blender 4 drops it from Nishita skies
+        wl.new(tex_coord.outputs['Generated'], sky_tex.inputs['Vector'])
     wl.new(sky_tex.outputs['Color'], bg.inputs['Color'])
     wl.new(bg.outputs['Background'], output.inputs['Surface'])
 
     # Ambient fill (soft)
-    bpy.ops.object.light_add(type='AREA', location=(0, 0, 80))
-    fill = bpy.context.active_object
-    fill.name = 'AmbientFill'
-    fill.data.energy = 800
+    fill = bpy.data.objects.new('AmbientFill', bpy.data.lights.new('AmbientFill', 'AREA'))
+    scene.collection.objects.link(fill)
+    fill.location = (0, 0, 80)
+    fill.data.energy = light['fill_energy']
     fill.data.size = 200
-    fill.data.color = (0.7, 0.85, 1.0)
-
-    # Render settings
+    fill.data.color = light['fill_color']
+
+# ── Render Settings ───────────────────────────────────────────────────────────
+
+# Cycles quality levels for setup_render(). All render the same 4K frame;
+# percentage scales it down for quick looks. nairobi_render.py renders stills
+# with these, splitting 'final' frames across several Blender processes.
+RENDER_PROFILES = {
+    'draft':   {'samples': 16,  'percentage': 25,  'threshold': 0.1,  'bounces': 3},
+    'preview': {'samples': 64,  'percentage': 50,  'threshold': 0.05, 'bounces': 6},
+    'final':   {'samples': 256, 'percentage': 100, 'threshold': 0.01, 'bounces': 12},
+}
+RENDER_RESOLUTION = (3840, 2160)
+
+def render_size(profile):
+    """Pixel size (width, height) of a frame rendered with `profile`."""
+    pct = RENDER_PROFILES[profile]['percentage']
+    return tuple(side * pct // 100 for side in RENDER_RESOLUTION)
+
+def setup_render(profile='final'):
+    """Cycles settings for one of RENDER_PROFILES"""
+    quality = RENDER_PROFILES[profile]
+    scene = bpy.context.scene
     scene.render.engine = 'CYCLES'
     if hasattr(scene, 'cycles'):
-        scene.cycles.samples = 256
+        scene.cycles.samples = quality['samples']
         scene.cycles.use_denoising = True
         scene.cycles.use_adaptive_sampling = True
-        scene.cycles.adaptive_threshold = 0.01
+        scene.cycles.adaptive_threshold = quality['threshold']
+        scene.cycles.max_bounces = quality['bounces']
 
-    scene.render.resolution_x = 3840
-    scene.render.resolution_y = 2160
+    scene.render.resolution_x, scene.render.resolution_y = RENDER_RESOLUTION
+    scene.render.resolution_percentage = quality['percentage']
     scene.render.film_transparent = False
 
 # ── Camera Rigs ───────────────────────────────────────────────────────────────
@@ -897,10 +2438,10 @@ def setup_cameras():
         ('Cam_Aerial',       (0, 0, 300), (0, 0, 0), 28),
     ]
     for name, loc, rot_deg, lens in cameras:
-        bpy.ops.object.camera_add(location=loc)
-        cam = bpy.context.active_object
-        cam.name = name
-        cam.rotation_euler = Euler((math.radians(r) for r in rot_deg))
+        cam = bpy.data.objects.new(name, bpy.data.cameras.new(name))
+        bpy.context.scene.collection.objects.link(cam)
+        cam.location = loc
+        cam.rotation_euler = tuple(math.radians(r) for r in rot_deg)
         cam.data.lens = lens
         cam.data.clip_end = 2000
 
@@ -915,7 +2456,9 @@ def setup_scene():
     scene.unit_settings.scale_length = 1.0
     scene.unit_settings.length_unit = 'METERS'
 
-    # Viewport shading
+    # Viewport shading; a background build (blender -b) has no screen to set
+    if bpy.app.background or bpy.context.screen is None:
+        return
     for area in bpy.context.screen.areas:
         if area.type == 'VIEW_3D':
             for space in area.spaces:
@@ -927,64 +2470,78 @@ def setup_scene():
 
 # ── Main Build ────────────────────────────────────────────────────────────────
 
-def build_nairobi():
+def build_nairobi(batch_static=False, batch_sidecar=None, seed=42, incremental=False,
+                  report_path=None, budgets=None, density=None, lighting='day',
+                  export_path=None, blend_path=None, render='final'):
+    """
+    batch_static:  merge static geometry per material in each collection
+    batch_sidecar: JSON path for the batched element map (optional)
+    incremental:   keep the objects of stages whose inputs are unchanged since
+                   the last build in this .blend; only the rest are rebuilt
+                   (ignored with batch_static, whose merged meshes span stages)
+    report_path:   write the per-stage BuildReport there as JSON
+    budgets:       dict or JSON path of caps; BudgetError when exceeded
+    density:       multipliers for scattered objects (see describe_city)
+    lighting:      key of LIGHTING_PROFILES
+    render:        key of RENDER_PROFILES
+    export_path:   export the finished scene there as GLB
+    blend_path:    save the finished .blend there
+    Returns the BuildReport.
+    """
     print("=" * 60)
     print("  NTSA Nairobi City Model — Building...")
     print("=" * 60)
-
-    clear_scene()
-    cols = setup_collections()
-    M = setup_materials()
-
-    print("[1/12] Ground...")
-    build_ground(cols, M)
-
-    print("[2/12] Road network...")
-    build_roads(cols, M)
-
-    print("[3/12] CBD buildings...")
-    build_cbd_buildings(cols, M)
-
-    print("[4/12] KICC landmark...")
-    build_kicc(cols, M)
-
-    print("[5/12] Times Tower...")
-    build_times_tower(cols, M)
-
-    print("[6/12] Parliament Buildings...")
-    build_parliament(cols, M)
-
-    print("[7/12] Traffic lights...")
-    build_all_traffic_lights(cols, M)
-
-    print("[8/12] Road signs...")
-    build_road_signs(cols, M)
-
-    print("[9/12] Vegetation...")
-    build_vegetation(cols, M)
-
-    print("[10/12] Street furniture & stalls...")
-    build_street_furniture(cols, M)
-    build_market_stalls(cols, M)
-
-    print("[11/12] Vehicles & matatus...")
-    build_vehicles(cols, M)
-
-    print("[11b/12] Nairobi River...")
-    build_river(cols, M)
-
-    print("[12/12] Lighting, cameras, scene...")
-    setup_lighting()
-    setup_cameras()
-    setup_scene()
-
-    # Merge & clean
-    bpy.ops.outliner.orphans_purge(do_local_ids=True, do_linked_ids=False)
+    t_start = time.perf_counter()
+
+    report = BuildReport(seed)
+    scenes, digests = describe_stages(seed, report=report, density=density)
+    state = json.loads(bpy.context.scene.get(BUILD_STATE, '{}'))
+
+    if incremental and not batch_static and state.get('stages'):
+        print("[Blender] Updating changed stages...")
+        outcomes = rebuild_stages(scenes, digests, state['stages'], report)
+        if state.get('lighting', 'day') != lighting:
+            setup_lighting(lighting)
+        setup_render(render)
+    else:
+        print("[Blender] Meshes, materials & instances...")
+        clear_scene()
+        materials, cols = {}, {}
+        for name, scene in scenes.items():
+            cols.update(report.measure(name, 'realise', realise_scene, scene, name, materials))
+        outcomes = {name: 'built' for name in scenes}
+
+        if batch_static:
+            print("[Blender] Static batching...")
+            batch_static_geometry(cols, batch_sidecar)
+
+        print("[Blender] Lighting, cameras, scene...")
+        setup_lighting(lighting)
+        setup_render(render)
+        setup_cameras()
+        setup_scene()
+
+        # Merge & clean
+        bpy.ops.outliner.orphans_purge(do_local_ids=True, do_linked_ids=False)
+
+    # Batched objects no longer map onto stages, so they can't be reused
+    bpy.context.scene[BUILD_STATE] = json.dumps(
+        {'version': GENERATOR_VERSION, 'seed': seed, 'lighting': lighting,
+         'stages': {} if batch_static else digests})
+
+    labels = {stage.__name__: label for label, stage in BUILD_STAGES}
+    for name, outcome in outcomes.items():
+        record = report.stages.setdefault(name, {})
+        record['outcome'] = outcome
+        print(f"  {outcome:<8} {labels.get(name, name):<22} "
+              f"{record.get('describe_ms', 0) + record.get('realise_ms', 0):8.1f} ms "
+              f"{record.get('triangles', 0):>8} tris")
 
     print("=" * 60)
     print("  Nairobi Model COMPLETE!")
     print(f"  Objects created: {len(bpy.data.objects)}")
     print(f"  Materials: {len(bpy.data.materials)}")
+    print(f"  Build time: {time.perf_counter() - t_start:.1f}s")
     print("")
     print("  NEXT STEPS:")
     print("  • File > Export > glTF 2.0 (.glb) for web simulator")
@@ -992,6 +2549,83 @@ def build_nairobi():
     print("  • Camera views: Cam_CBD_Overview, Cam_KICC_Hero,")
     print("                  Cam_StreetLevel, Cam_Aerial")
     print("=" * 60)
+    if export_path:
+        os.makedirs(os.path.dirname(os.path.abspath(export_path)), exist_ok=True)
+        export_glb(os.path.abspath(export_path))
+        print(f"  Exported {export_path}")
+    if blend_path:
+        bpy.ops.wm.save_as_mainfile(filepath=os.path.abspath(blend_path))
+        print(f"  Saved {blend_path}")
+    apply_budgets(report, budgets, report_path)
+    return report
+
+def describe_nairobi(seed=42, report_path=None, budgets=None, density=None):
+    """Scene description only, for plain CPython runs."""
+    t_start = time.perf_counter()
+    scene = describe_city(seed, density=density)
+    elapsed = (time.perf_counter() - t_start) * 1000
+    for key, value in scene.summary().items():
+        print(f"  {key:<12} {value}")
+    problems = scene.check()
+    for problem in problems:
+        print(f"  ! {problem}")
+    print(f"  Described in {elapsed:.1f} ms, {len(problems)} problem(s)")
+
+    if report_path or budgets:
+        report = BuildReport(seed)
+        describe_stages(seed, None, report, density)
+        apply_budgets(report, budgets, report_path)
+    return scene
+
+def parse_args(argv=None):
+    """
+    Options after `--` (blender -b -P nairobi_city_model.py -- --seed 7) or
+    on the plain Python command line. Running from Blender's text editor
+    passes none, so every option has a default.
+    """
+    import argparse
+    if argv is None:
+        argv = sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else (
+            [] if bpy is not None else sys.argv[1:])
+    parser = argparse.ArgumentParser(prog='nairobi_city_model.py')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--report', metavar='JSON', help='write the build report here')
+    parser.add_argument('--budgets', metavar='JSON', help='fail if these caps are exceeded')
+    parser.add_argument('--incremental', action='store_true')
+    parser.add_argument('--batch-static', action='store_true')
+    parser.add_argument('--density', metavar='KEY=X', action='append', default=[],
+                        help='scale scattered objects, e.g. vegetation=0.5 (repeatable)')
+    parser.add_argument('--lighting', choices=sorted(LIGHTING_PROFILES), default='day')
+    parser.add_argument('--render', choices=sorted(RENDER_PROFILES), default='final',
+                        help='Cycles quality saved with the scene (default final)')
+    parser.add_argument('--export', metavar='GLB', help='export the built scene here')
+    parser.add_argument('--save', metavar='BLEND', help='save the built .blend here')
+    parser.add_argument('--benchmark', metavar='N', type=int, nargs='*',
+                        help='instead of building, time bpy.ops against the data API '
+                             'for N boxes + N cylinders each (default '
+                             f"{' '.join(map(str, BENCHMARK_COUNTS))}); needs Blender")
+    args = parser.parse_args(argv)
+    try:
+        args.density = {key: float(value) for key, value in
+                        (item.split('=', 1) for item in args.density)}
+    except ValueError:
+        parser.error('--density takes KEY=NUMBER, e.g. vegetation=0.5')
+    return args
 
 # ── RUN ───────────────────────────────────────────────────────────────────────
-build_nairobi()
+if __name__ == "__main__":
+    args = parse_args()
+    if args.benchmark is not None:
+        if bpy is None:
+            sys.exit('--benchmark times Blender mesh creation; run it inside Blender')
+        print("Mesh backends (n boxes + n cylinders each way):")
+        benchmark_mesh_backends(tuple(args.benchmark) or BENCHMARK_COUNTS)
+    elif bpy is not None:
+        # batch_static=True for the mobile web build
+        build_nairobi(batch_static=args.batch_static, seed=args.seed,
+                      incremental=args.incremental, report_path=args.report,
+                      budgets=args.budgets, density=args.density,
+                      lighting=args.lighting, export_path=args.export,
+                      blend_path=args.save, render=args.render)
+    else:
+        describe_nairobi(args.seed, args.report, args.budgets, args.density)
@@ -0,0 +1,350 @@
+"""
+================================================================================
+  NAIROBI CITY MODEL — Collision Proxies
+  NTSA B1 Driving Simulator — kerbs, buildings, poles and cars for physics
+================================================================================
+  Derives simple collision shapes from the scene description instead of the
+  render meshes: an AABB per box-like part (an OBB when its object is turned),
+  a vertical capsule per pole-thin upright cylinder (lamp and sign posts,
+  trunks, columns) and a vertical cylinder per wider one (roundabout islands,
+  the KICC drums), whose bounding box would reach into the traffic around
+  it. Flat parts (road paint, planes) and parts wholly above MAX_REACH (roofs,
+  canopies, foliage) or below ground get none, nor does anything contained in
+  another box of the same object. The proxies are packed into a bounding-
+  volume hierarchy, so a physics query visits a few dozen nodes whatever the
+  triangle count of the city.
+
+  collision.bin is little-endian 32-bit words, read with one Float32Array
+  and one Uint32Array over the same buffer:
+
+    header  8 words   'NCOL', version, nodeCount, proxyCount,
+                      nodeOffset, proxyOffset (bytes), NODE_STRIDE, PROXY_STRIDE
+    nodes   8 words   f32 min[3], max[3]; u32 a, count
+                      count > 0: leaf holding proxies a .. a + count - 1
+                      count = 0: inner node, children i + 1 and a
+    proxies 10 words  u32 kind, object; f32 p[3], q[3], s, 0
+                      AABB     (0): p = min, q = max
+                      OBB      (1): p = centre, q = half extents, s = yaw
+                      CAPSULE  (2): p, q = segment ends, s = radius
+                      CYLINDER (3): p, q = base and top centres, s = radius
+
+  Coordinates are glTF Y-up metres, as in nairobi.glb; yaw is the rotation
+  about +Y. collision.json carries the counts, object names (indexed by
+  `object`) and each object's collection, for gameplay.
+
+  USAGE:
+    python3 nairobi_collision.py                # -> lesson-01-town-simulation/collision.*
+    python3 nairobi_collision.py --benchmark    # query time vs. brute force
+
+  Requires: Python 3.8+, NumPy
+================================================================================
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import struct
+import time
+
+import numpy as np
+
+import nairobi_city_model as city
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUTPUT = os.path.join(HERE, 'lesson-01-town-simulation', 'collision.bin')
+
+SOLID_COLLECTIONS = ('Roads', 'Buildings', 'Landmarks', 'Vegetation', 'Traffic',
+                     'Vehicles', 'Street_Furniture')
+MAX_REACH = 4.5    # metres; nothing a vehicle can touch starts higher
+MIN_HEIGHT = 0.05  # thinner than this is paint, not a kerb
+POLE_RADIUS = 1.0  # upright cylinders up to this thick become capsules
+LEAF_SIZE = 4
+
+AABB, OBB, CAPSULE, CYLINDER = 0, 1, 2, 3
+NODE_STRIDE, PROXY_STRIDE = 8, 10
+
+# ── Proxies ──────────────────────────────────────────────────────────────────
+#
+#  Built in Blender space (Z up) and converted to glTF when packed. A proxy is
+#  (kind, object index, p, q, s) plus its world AABB for the hierarchy.
+
+def _part_proxy(part, loc, rot_z, scale):
+    (x0, y0, z0), (x1, y1, z1) = city.local_bounds([part])
+    lx, ly, lz = loc
+    bottom, top = lz + scale * z0, lz + scale * z1
+    if part.kind == 'plane' or top - bottom < MIN_HEIGHT or bottom > MAX_REACH \
+            or top < MIN_HEIGHT:
+        return None
+    c, s = math.cos(rot_z), math.sin(rot_z)
+    cx, cy = (x0 + x1) / 2 * scale, (y0 + y1) / 2 * scale
+    centre = (lx + c * cx - s * cy, ly + s * cx + c * cy, (bottom + top) / 2)
+    half = ((x1 - x0) / 2 * scale, (y1 - y0) / 2 * scale, (top - bottom) / 2)
+
+    if part.kind == 'cylinder' and not any(part.rot):
+        radius = part.args[0] * scale
+        box = ((centre[0] - radius, centre[1] - radius, bottom),
+               (centre[0] + radius, centre[1] + radius, top))
+        if radius <= POLE_RADIUS and top - bottom >= 2 * radius:
+            # Segment inset by the radius, so the rounded ends stay inside
+            return (CAPSULE, (centre[0], centre[1], bottom + radius),
+                    (centre[0], centre[1], top - radius), radius, box)
+        return (CYLINDER, (centre[0], centre[1], bottom), (centre[0], centre[1], top),
+                radius, box)
+    if rot_z % (2 * math.pi) == 0:
+        lo = tuple(centre[k] - half[k] for k in range(3))
+        hi = tuple(centre[k] + half[k] for k in range(3))
+        return (AABB, lo, hi, 0.0, (lo, hi))
+    ex = abs(c) * half[0] + abs(s) * half[1]
+    ey = abs(s) * half[0] + abs(c) * half[1]
+    return (OBB, centre, half, rot_z,
+            ((centre[0] - ex, centre[1] - ey, bottom), (centre[0] + ex, centre[1] + ey, top)))
+
+def _inside(a, b):
+    return all(b[0][k] <= a[0][k] and a[1][k] <= b[1][k] for k in range(3))
+
+def proxies(scene):
+    """
+    ([(kind, object, p, q, s, (lo, hi))], [(object name, collection)]).
+    A building's LOD chain is one object; so is each other primitive and
+    prop instance.
+    """
+    found, objects = [], []
+
+    def add(name, collection, placed):
+        shapes = [p for p in (_part_proxy(*args) for args in placed) if p]
+        # Glass panes, signage etc. inside a bigger box of the object add
+        # nothing (of two equal boxes the first is kept)
+        shapes = [p for i, p in enumerate(shapes) if p[0] != AABB or not any(
+            q[0] == AABB and j != i and _inside(p[4], q[4]) and (p[4] != q[4] or j < i)
+            for j, q in enumerate(shapes))]
+        if shapes:
+            objects.append((name, collection))
+            found.extend((kind, len(objects) - 1, p, q, s, box) for kind, p, q, s, box in shapes)
+
+    for name in SOLID_COLLECTIONS:
+        col = scene.collections[name]
+        chained = {id(prim) for chain in col.lods for prim in chain.members}
+        for chain in col.lods:
+            add(chain.name, name, [(part, prim.loc, 0.0, 1.0)
+                                   for prim in chain.members for part in prim.parts])
+        for prim in col.primitives:
+            if id(prim) not in chained:
+                add(prim.name, name, [(part, prim.loc, 0.0, 1.0) for part in prim.parts])
+        for inst in col.instances:
+            add(inst.name, name, [(part, inst.loc, inst.rot_z, inst.scale)
+                                  for part in scene.prototypes[inst.key]])
+    return found, objects
+
+# ── Hierarchy ────────────────────────────────────────────────────────────────
+#
+#  Top-down surface-area-heuristic build: each node's proxies are split where
+#  the summed box areas of the two sides, weighted by their proxy counts, are
+#  smallest, trying every split of the proxies sorted by centre along each
+#  axis. Nodes are laid out depth first, so the left child directly follows
+#  its parent and only the right child needs an index.
+
+def _area(lo, hi):
+    d = np.maximum(hi - lo, 0)
+    return 2 * (d[..., 0] * d[..., 1] + d[..., 1] * d[..., 2] + d[..., 2] * d[..., 0])
+
+def build_bvh(lo, hi, leaf_size=LEAF_SIZE):
+    """
+    Hierarchy over boxes (lo, hi: (n, 3) arrays). Returns (nodes, order):
+    nodes as [lo, hi, a, count] in depth-first order, and the box indices in
+    leaf order.
+    """
+    centre = (lo + hi) / 2
+    nodes, order = [], []
+
+    def build(items):
+        node = [lo[items].min(0), hi[items].max(0), 0, 0]
+        nodes.append(node)
+        if len(items) <= leaf_size:
+            node[2], node[3] = len(order), len(items)
+            order.extend(items.tolist())
+            return
+        best = (math.inf, None)
+        for axis in range(3):
+            ranked = items[np.argsort(centre[items, axis], kind='stable')]
+            left_lo = np.minimum.accumulate(lo[ranked], 0)[:-1]
+            left_hi = np.maximum.accumulate(hi[ranked], 0)[:-1]
+            right_lo = np.minimum.accumulate(lo[ranked][::-1], 0)[::-1][1:]
+            right_hi = np.maximum.accumulate(hi[ranked][::-1], 0)[::-1][1:]
+            sizes = np.arange(1, len(items))
+            cost = _area(left_lo, left_hi) * sizes + _area(right_lo, right_hi) * sizes[::-1]
+            split = int(np.argmin(cost))
+            if cost[split] < best[0]:
+                best = (cost[split], ranked, split + 1)
+        _, ranked, split = best
+        build(ranked[:split])
+        node[2] = len(nodes)  # right child
+        build(ranked[split:])
+
+    build(np.arange(len(lo)))
+    return nodes, order
+
+# ── Packing ──────────────────────────────────────────────────────────────────
+
+def _yup(v):
+    return (v[0], v[2], -v[1])
+
+def pack(found, nodes, order):
+    """collision.bin bytes for proxies `found` in leaf `order`."""
+    header = 8 * 4
+    node_offset = header
+    proxy_offset = node_offset + len(nodes) * NODE_STRIDE * 4
+    out = bytearray(struct.pack('<4s7I', b'NCOL', 1, len(nodes), len(order),
+                                node_offset, proxy_offset, NODE_STRIDE, PROXY_STRIDE))
+    for lo, hi, a, count in nodes:
+        # A millimetre of slack so float32 rounding never shrinks a node
+        (x0, y0, z0), (x1, y1, z1) = lo - 1e-3, hi + 1e-3
+        out += struct.pack('<6f2I', x0, z0, -y1, x1, z1, -y0, a, count)
+    for i in order:
+        kind, obj, p, q, s, _ = found[i]
+        if kind == AABB:
+            p, q = (p[0], p[2], -q[1]), (q[0], q[2], -p[1])
+        elif kind == OBB:
+            p, q = _yup(p), (q[0], q[2], q[1])
+        else:
+            p, q = _yup(p), _yup(q)
+        out += struct.pack('<2I8f', kind, obj, *p, *q, s, 0.0)
+    return bytes(out)
+
+def collision_data(scene):
+    """(collision.bin bytes, collision.json dict) for `scene`."""
+    found, objects = proxies(scene)
+    lo = np.array([box[0] for *_, box in found], float)
+    hi = np.array([box[1] for *_, box in found], float)
+    nodes, order = build_bvh(lo, hi)
+    data = pack(found, nodes, order)
+    collections = sorted({col for _, col in objects})
+    meta = {
+        'version': 1, 'bytes': len(data), 'nodes': len(nodes), 'proxies': len(order),
+        'kinds': ['aabb', 'obb', 'capsule', 'cylinder'], 'collections': collections,
+        'objects': [name for name, _ in objects],
+        'objectCollection': [collections.index(col) for _, col in objects],
+    }
+    return data, meta
+
+# ── Queries ──────────────────────────────────────────────────────────────────
+
+class CollisionBVH:
+    """
+    Queries over collision.bin — the reference for the JS client, which reads
+    the same words through typed arrays.
+    """
+
+    def __init__(self, data):
+        _, _, node_count, proxy_count, node_offset, proxy_offset, ns, ps = \
+            struct.unpack_from('<4s7I', data)
+        self.f = np.frombuffer(data, '<f4')
+        self.u = np.frombuffer(data, '<u4')
+        self.node0, self.proxy0 = node_offset // 4, proxy_offset // 4
+        self.ns, self.ps = ns, ps
+        self.node_count, self.proxy_count = node_count, proxy_count
+        # Plain lists: per-element numpy access is slower than the traversal
+        self.nodes = [(self.f[i:i + 6].tolist(), int(self.u[i + 6]), int(self.u[i + 7]))
+                      for i in range(self.node0, self.node0 + node_count * ns, ns)]
+        self.shapes = [(int(self.u[i]), int(self.u[i + 1]), self.f[i + 2:i + 10].tolist())
+                       for i in range(self.proxy0, self.proxy0 + proxy_count * ps, ps)]
+
+    def overlap(self, lo, hi):
+        """Proxy indices whose leaf boxes overlap the AABB lo..hi (broad phase)."""
+        hits, stack, nodes = [], [0], self.nodes
+        while stack:
+            i = stack.pop()
+            box, a, count = nodes[i]
+            if (box[0] > hi[0] or box[3] < lo[0] or box[1] > hi[1] or box[4] < lo[1]
+                    or box[2] > hi[2] or box[5] < lo[2]):
+                continue
+            if count:
+                hits.extend(range(a, a + count))
+            else:
+                stack += (a, i + 1)
+        return hits
+
+    def sphere(self, centre, radius):
+        """(proxy, object) pairs a sphere touches (broad plus narrow phase)."""
+        lo = [c - radius for c in centre]
+        hi = [c + radius for c in centre]
+        return [(i, self.shapes[i][1]) for i in self.overlap(lo, hi)
+                if sphere_distance(self.shapes[i], centre) <= radius]
+
+def sphere_distance(shape, point):
+    """Distance from `point` to a proxy (0 inside)."""
+    kind, _, v = shape
+    x, y, z = point
+    if kind == AABB:
+        d = [max(v[k] - point[k], 0, point[k] - v[3 + k]) for k in range(3)]
+        return math.sqrt(d[0] ** 2 + d[1] ** 2 + d[2] ** 2)
+    if kind == OBB:
+        # Into the box frame: undo the yaw about +Y
+        c, s = math.cos(v[6]), math.sin(v[6])
+        dx, dz = x - v[0], z - v[2]
+        lx, lz = c * dx - s * dz, s * dx + c * dz
+        d = [max(abs(lx) - v[3], 0), max(abs(y - v[1]) - v[4], 0), max(abs(lz) - v[5], 0)]
+        return math.sqrt(d[0] ** 2 + d[1] ** 2 + d[2] ** 2)
+    if kind == CYLINDER:  # upright: p and q share x and z
+        radial = max(math.hypot(x - v[0], z - v[2]) - v[6], 0)
+        return math.hypot(radial, max(v[1] - y, 0, y - v[4]))
+    ax, ay, az, bx, by, bz, r = v[:7]
+    ex, ey, ez = bx - ax, by - ay, bz - az
+    length = ex * ex + ey * ey + ez * ez
+    t = 0.0 if length == 0 else min(1.0, max(0.0, ((x - ax) * ex + (y - ay) * ey +
+                                                   (z - az) * ez) / length))
+    return max(0.0, math.dist(point, (ax + t * ex, ay + t * ey, az + t * ez)) - r)
+
+def benchmark(data, queries=50_000):
+    """Time sphere queries at car height; check them against testing every proxy."""
+    bvh = CollisionBVH(data)
+    rng = random.Random(0)
+    points = [((rng.uniform(-220, 220), rng.uniform(0.3, 1.5), rng.uniform(-220, 220)),
+               rng.uniform(0.5, 2.5)) for _ in range(queries)]
+    t0 = time.perf_counter()
+    found = [bvh.sphere(c, r) for c, r in points]
+    dt = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    brute = [[(i, shape[1]) for i, shape in enumerate(bvh.shapes)
+              if sphere_distance(shape, c) <= r] for c, r in points[:2000]]
+    dt_brute = (time.perf_counter() - t0) / 2000 * queries
+    wrong = sum(sorted(a) != b for a, b in zip(found, brute))
+    print(f"  sphere query   {dt / queries * 1e6:7.2f} µs  (all proxies: "
+          f"{dt_brute / queries * 1e6:7.2f} µs), {sum(map(bool, found))} of {queries} hit")
+    print(f"  mismatches vs brute force: {wrong}/2000")
+
+# ── CLI ──────────────────────────────────────────────────────────────────────
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Export Nairobi collision proxies and BVH.')
+    parser.add_argument('-o', '--output', default=DEFAULT_OUTPUT,
+                        help='collision.bin path; collision.json is written beside it')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--benchmark', action='store_true')
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    data, meta = collision_data(city.describe_city(args.seed, log=None))
+    elapsed = time.perf_counter() - t0
+    if args.benchmark:
+        print(f"  build          {elapsed * 1000:7.1f} ms  ({meta['proxies']} proxies, "
+              f"{meta['nodes']} nodes)")
+        benchmark(data)
+        return
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'wb') as f:
+        f.write(data)
+    with open(os.path.splitext(args.output)[0] + '.json', 'w') as f:
+        json.dump(meta, f, separators=(',', ':'))
+    kinds = [0, 0, 0, 0]
+    for i in range(meta['proxies']):
+        kinds[struct.unpack_from('<I', data, meta['bytes'] - (meta['proxies'] - i)
+                                 * PROXY_STRIDE * 4)[0]] += 1
+    print(f"Wrote {args.output}: {meta['proxies']} proxies ({kinds[0]} AABB, {kinds[1]} OBB, "
+          f"{kinds[2]} capsules, {kinds[3]} cylinders) for {len(meta['objects'])} objects, {meta['nodes']} nodes, "
+          f"{meta['bytes'] / 1024:.1f} KiB in {elapsed * 1000:.0f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,639 @@
+"""
+================================================================================
+  NAIROBI CITY MODEL — Headless GLB Exporter
+  NTSA B1 Driving Simulator — no Blender required
+================================================================================
+  Writes a binary glTF (.glb) straight from the scene description built by
+  nairobi_city_model.describe_city(). Vertex and index buffers are assembled
+  with NumPy, materials use the same PBR parameters as the Blender backend,
+  and repeated props are written once per prototype with
+  EXT_mesh_gpu_instancing.
+
+  USAGE:
+    python3 nairobi_glb.py                         # -> lesson-01-town-simulation/nairobi.glb
+    python3 nairobi_glb.py -o city.glb --seed 7
+    python3 nairobi_glb.py --batch                 # one mesh per collection
+    python3 nairobi_glb.py --no-instancing         # plain nodes per instance
+    python3 nairobi_glb.py --benchmark             # export time & size report
+    python3 nairobi_glb.py --tiles out/tiles       # tile grid + tiles.json
+    python3 nairobi_glb.py --lod nodes             # LOD levels as plain nodes
+
+  Requires: Python 3.8+, NumPy
+================================================================================
+"""
+
+import argparse
+import json
+import math
+import os
+import struct
+import time
+
+import numpy as np
+
+import nairobi_city_model as city
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUTPUT = os.path.join(HERE, 'lesson-01-town-simulation', 'nairobi.glb')
+
+ARRAY_BUFFER = 34962
+ELEMENT_ARRAY_BUFFER = 34963
+FLOAT = 5126
+UNSIGNED_SHORT = 5123
+UNSIGNED_INT = 5125
+
+EMISSION_STRENGTH = 3.0  # matches 'Emission Strength' in the Blender backend
+LOD_FOV = math.radians(50)  # vertical field of view behind MSFT_screencoverage
+
+# ── Buffers ──────────────────────────────────────────────────────────────────
+
+def to_y_up(xyz):
+    """Blender Z-up (x, y, z) -> glTF Y-up (x, z, -y), for an (N, 3) array."""
+    return np.stack([xyz[:, 0], xyz[:, 2], -xyz[:, 1]], axis=1)
+
+def mesh_arrays(builder):
+    """
+    Flatten a MeshBuilder into glTF-ready arrays. Every face corner becomes its
+    own vertex (UVs and flat normals are per corner); faces are fan-triangulated.
+    Returns (positions, normals, uvs, colors or None, triangles, tri_materials).
+    """
+    sizes = np.fromiter((len(f) for f in builder.faces), dtype=np.int64,
+                        count=len(builder.faces))
+    corners = np.fromiter((k for f in builder.faces for k in f), dtype=np.int64,
+                          count=int(sizes.sum()))
+    starts = np.cumsum(sizes) - sizes
+    face_of_corner = np.repeat(np.arange(len(sizes)), sizes)
+
+    pos = np.asarray(builder.verts, dtype=np.float64)[corners]
+
+    # Newell normal per face, shared by its corners
+    local = np.arange(len(corners)) - starts[face_of_corner]
+    nxt = starts[face_of_corner] + (local + 1) % sizes[face_of_corner]
+    face_normals = np.add.reduceat(np.cross(pos, pos[nxt]), starts, axis=0)
+    length = np.linalg.norm(face_normals, axis=1, keepdims=True)
+    face_normals /= np.where(length > 0, length, 1)
+    normals = face_normals[face_of_corner]
+
+    uvs = np.asarray(builder.uvs, dtype=np.float32).reshape(-1, 2)
+    uvs[:, 1] = 1.0 - uvs[:, 1]  # glTF UV origin is top-left
+    colors = None
+    if builder.colors is not None:
+        colors = np.asarray(builder.colors, dtype=np.float32).reshape(-1, 3)
+
+    ntri = sizes - 2
+    tri_face = np.repeat(np.arange(len(sizes)), ntri)
+    k = np.arange(int(ntri.sum())) - np.repeat(np.cumsum(ntri) - ntri, ntri) + 1
+    first = starts[tri_face]
+    triangles = np.stack([first, first + k, first + k + 1], axis=1)
+    tri_materials = np.asarray(builder.face_materials, dtype=np.int64)[tri_face]
+
+    return (to_y_up(pos).astype(np.float32), to_y_up(normals).astype(np.float32),
+            uvs, colors, triangles, tri_materials)
+
+class GlbWriter:
+    """Accumulates one binary buffer plus the glTF JSON that indexes into it."""
+
+    def __init__(self):
+        self.bin = bytearray()
+        self.gltf = {
+            'asset': {'version': '2.0', 'generator': 'nairobi_glb.py'},
+            'scene': 0, 'scenes': [{'name': 'Nairobi', 'nodes': []}],
+            'nodes': [], 'meshes': [], 'materials': [],
+            'accessors': [], 'bufferViews': [], 'buffers': [],
+        }
+        self.extensions = set()
+        self.required = set()
+        self._materials = {}
+        self._sampler = None
+
+    def accessor(self, array, gl_type, target=None, bounds=False):
+        """Append `array` as its own bufferView and return the accessor index."""
+        array = np.ascontiguousarray(array)
+        while len(self.bin) % 4:
+            self.bin.append(0)
+        view = {'buffer': 0, 'byteOffset': len(self.bin), 'byteLength': array.nbytes}
+        if target:
+            view['target'] = target
+        self.bin += array.tobytes()
+        self.gltf['bufferViews'].append(view)
+
+        component = {np.dtype(np.float32): FLOAT, np.dtype(np.uint16): UNSIGNED_SHORT,
+                     np.dtype(np.uint32): UNSIGNED_INT}[array.dtype]
+        acc = {'bufferView': len(self.gltf['bufferViews']) - 1,
+               'componentType': component, 'count': len(array), 'type': gl_type}
+        if bounds:
+            acc['min'] = array.min(axis=0).tolist()
+            acc['max'] = array.max(axis=0).tolist()
+        self.gltf['accessors'].append(acc)
+        return len(self.gltf['accessors']) - 1
+
+    def texture(self, png, name=None):
+        """Embed PNG bytes as an image and return its texture index."""
+        gltf = self.gltf
+        while len(self.bin) % 4:
+            self.bin.append(0)
+        gltf['bufferViews'].append({'buffer': 0, 'byteOffset': len(self.bin),
+                                    'byteLength': len(png)})
+        self.bin += png
+        gltf.setdefault('images', []).append({'name': name, 'mimeType': 'image/png',
+                                              'bufferView': len(gltf['bufferViews']) - 1})
+        if self._sampler is None:
+            gltf.setdefault('samplers', []).append({'magFilter': 9729, 'minFilter': 9729,
+                                                    'wrapS': 33071, 'wrapT': 33071})
+            self._sampler = len(gltf['samplers']) - 1
+        gltf.setdefault('textures', []).append({'source': len(gltf['images']) - 1,
+                                                'sampler': self._sampler})
+        return len(gltf['textures']) - 1
+
+    def material(self, mdef, lightmap=None):
+        """
+        glTF material index for `mdef`, shared by every def with its key.
+        With a `lightmap` texture (see nairobi_bake.py) the material reads it
+        through TEXCOORD_1: AO as the occlusionTexture, direct sun as G.
+        """
+        key = (mdef.key, lightmap)
+        if key in self._materials:
+            return self._materials[key]
+        pbr = {'baseColorFactor': [*mdef.color, mdef.alpha],
+               'metallicFactor': mdef.metallic, 'roughnessFactor': mdef.roughness}
+        mat = {'name': mdef.name, 'pbrMetallicRoughness': pbr}
+        if mdef.alpha < 1.0:
+            mat['alphaMode'] = 'BLEND'
+        if mdef.emission:
+            mat['emissiveFactor'] = list(mdef.emission)
+            mat['extensions'] = {'KHR_materials_emissive_strength':
+                                 {'emissiveStrength': EMISSION_STRENGTH}}
+            self.extensions.add('KHR_materials_emissive_strength')
+        if lightmap is not None:
+            mat['name'] = f'{mdef.name}_Baked'
+            mat['occlusionTexture'] = {'index': lightmap, 'texCoord': 1}
+            mat['extras'] = {'lightmap': {'texture': lightmap, 'texCoord': 1,
+                                          'ao': 'r', 'sun': 'g', 'shadow': 'b'}}
+        self.gltf['materials'].append(mat)
+        index = self._materials[key] = len(self.gltf['materials']) - 1
+        return index
+
+    def mesh(self, name, builder, lightmap=None):
+        """
+        Write a MeshBuilder as one glTF mesh, one primitive per material.
+        `lightmap` is (texture, UVs per face corner) for TEXCOORD_1.
+        """
+        pos, nrm, uvs, colors, tris, tri_mats = mesh_arrays(builder)
+        attributes = {
+            'POSITION': self.accessor(pos, 'VEC3', ARRAY_BUFFER, bounds=True),
+            'NORMAL': self.accessor(nrm, 'VEC3', ARRAY_BUFFER),
+            'TEXCOORD_0': self.accessor(uvs, 'VEC2', ARRAY_BUFFER),
+        }
+        texture = None
+        if lightmap is not None:
+            texture, uv1 = lightmap
+            uv1 = np.array(uv1, dtype=np.float32).reshape(-1, 2)
+            if len(uv1) != len(pos):
+                raise ValueError(f"{name}: {len(uv1)} lightmap UVs for {len(pos)} corners")
+            uv1[:, 1] = 1.0 - uv1[:, 1]
+            attributes['TEXCOORD_1'] = self.accessor(uv1, 'VEC2', ARRAY_BUFFER)
+        if colors is not None:
+            attributes['COLOR_0'] = self.accessor(colors, 'VEC3', ARRAY_BUFFER)
+        index_type = np.uint16 if len(pos) < 65536 else np.uint32
+
+        primitives = []
+        for slot, mdef in enumerate(builder.materials):
+            indices = tris[tri_mats == slot].astype(index_type).ravel()
+            if len(indices):
+                primitives.append({
+                    'attributes': attributes,
+                    'indices': self.accessor(indices, 'SCALAR', ELEMENT_ARRAY_BUFFER),
+                    'material': self.material(mdef, texture),
+                })
+        self.gltf['meshes'].append({'name': name, 'primitives': primitives})
+        return len(self.gltf['meshes']) - 1
+
+    def node(self, parent=None, detached=False, **fields):
+        """Add a node under `parent`, the scene root, or (`detached`) neither."""
+        self.gltf['nodes'].append({k: v for k, v in fields.items() if v is not None})
+        index = len(self.gltf['nodes']) - 1
+        if detached:
+            pass
+        elif parent is None:
+            self.gltf['scenes'][0]['nodes'].append(index)
+        else:
+            self.gltf['nodes'][parent].setdefault('children', []).append(index)
+        return index
+
+    def draw_calls(self):
+        """
+        Primitives a standard glTF viewer draws per frame: an instanced mesh
+        counts once and an MSFT_lod chain by its level 0 (the coarser levels
+        are detached). extras.lodDistances groups count every level, as only
+        a client that reads the extras shows just one of them.
+        """
+        nodes, meshes = self.gltf['nodes'], self.gltf['meshes']
+        stack, calls = list(self.gltf['scenes'][0]['nodes']), 0
+        while stack:
+            node = nodes[stack.pop()]
+            if 'mesh' in node:
+                calls += len(meshes[node['mesh']]['primitives'])
+            stack += node.get('children', [])
+        return calls
+
+    def to_bytes(self):
+        gltf = dict(self.gltf)
+        gltf['buffers'] = [{'byteLength': len(self.bin)}]
+        if self.extensions:
+            gltf['extensionsUsed'] = sorted(self.extensions)
+        if self.required:
+            gltf['extensionsRequired'] = sorted(self.required)
+        gltf = {k: v for k, v in gltf.items() if v != []}
+
+        text = json.dumps(gltf, separators=(',', ':')).encode('utf-8')
+        text += b' ' * (-len(text) % 4)
+        binary = bytes(self.bin) + b'\0' * (-len(self.bin) % 4)
+        total = 12 + 8 + len(text) + 8 + len(binary)
+        return b''.join([
+            struct.pack('<4sII', b'glTF', 2, total),
+            struct.pack('<I4s', len(text), b'JSON'), text,
+            struct.pack('<I4s', len(binary), b'BIN\0'), binary,
+        ])
+
+# ── Scene Export ─────────────────────────────────────────────────────────────
+
+def parts_builder(parts, loc=(0, 0, 0), builder=None):
+    """Accumulate Parts into a MeshBuilder, shifted by `loc`."""
+    builder = builder or city.MeshBuilder()
+    lx, ly, lz = loc
+    for part in parts:
+        ox, oy, oz = part.offset
+        builder.add(part.geometry(), part.material, part.rot,
+                    (ox + lx, oy + ly, oz + lz), part.color)
+    return builder
+
+def instance_trs(instances):
+    """Y-up TRANSLATION / ROTATION / SCALE arrays for a list of Instances."""
+    loc = np.array([inst.loc for inst in instances], dtype=np.float64).reshape(-1, 3)
+    half = np.array([inst.rot_z for inst in instances], dtype=np.float64) / 2
+    rot = np.zeros((len(instances), 4), dtype=np.float32)
+    rot[:, 1], rot[:, 3] = np.sin(half), np.cos(half)  # about glTF +Y (Blender +Z)
+    scale = np.repeat(np.array([[inst.scale] for inst in instances], np.float32), 3, axis=1)
+    return to_y_up(loc).astype(np.float32), rot, scale
+
+def screen_coverage(radius, distance):
+    """Fraction of the screen height taken by a sphere of `radius` at `distance`."""
+    return min(1.0, radius / (distance * math.tan(LOD_FOV / 2)))
+
+def write_lods(writer, parent, name, distances, radius, level_node, mode, **trs):
+    """
+    Write an LOD chain under `parent`. `level_node(i, parent, **fields)`
+    writes level i (0 = full detail) and returns its node; level i is meant
+    to be shown from distances[i] metres on.
+
+    'msft':  level 0 sits in the hierarchy carrying MSFT_lod, whose ids point
+             at detached nodes for the coarser levels; switch points are given
+             as MSFT_screencoverage for a sphere of `radius`
+    'nodes': an LOD_<name> node holding every level, with the switch distances
+             in extras.lodDistances (one THREE.LOD per group on the client)
+    """
+    if mode == 'nodes':
+        group = writer.node(parent, name=f'LOD_{name}', extras={'lodDistances': distances},
+                            **trs)
+        for i in range(len(distances)):
+            level_node(i, group)
+        return group
+
+    top = level_node(0, parent, **trs)
+    ids = [level_node(i, None, detached=True, **trs) for i in range(1, len(distances))]
+    node = writer.gltf['nodes'][top]
+    node.setdefault('extensions', {})['MSFT_lod'] = {'ids': ids}
+    node['extras'] = {'MSFT_screencoverage':
+                      [screen_coverage(radius, d) for d in distances[1:]] + [0.0]}
+    writer.extensions.add('MSFT_lod')
+    return top
+
+def write_scene(scene, writer=None, instancing=True, batch=False, lod='msft',
+                lightmaps=None):
+    """
+    Add every collection of `scene` to a GlbWriter and return it.
+
+    instancing: one node per prototype carrying EXT_mesh_gpu_instancing
+                transforms; False writes one plain node per instance instead
+    batch:      merge each collection's primitives into a single mesh (one
+                per lightmap atlas when baked)
+    lod:        'msft' or 'nodes' to write LOD chains (see write_lods),
+                None for full detail only
+    lightmaps:  {primitive name: (texture, UVs per face corner)} from
+                nairobi_bake.py; primitives not listed stay dynamically lit
+    """
+    writer = writer or GlbWriter()
+    lightmaps = lightmaps or {}
+    meshes = {}
+
+    def merged_mesh(name, prims, origin=(0, 0, 0)):
+        """One mesh of `prims` relative to `origin`, baked if they share an atlas."""
+        builder = city.MeshBuilder()
+        for prim in prims:
+            parts_builder(prim.parts, tuple(p - o for p, o in zip(prim.loc, origin)), builder)
+        baked = [lightmaps.get(prim.name) for prim in prims]
+        lightmap = None
+        if baked[0] and all(b and b[0] == baked[0][0] for b in baked):
+            lightmap = (baked[0][0], np.concatenate([uvs for _, uvs in baked]))
+        return writer.mesh(name, builder, lightmap)
+
+    def proto_mesh(key, level=0):
+        if (key, level) not in meshes:
+            parts = scene.prototype_lods[key][level - 1][1] if level else scene.prototypes[key]
+            name = f'Proto_{key}_LOD{level}' if level else f'Proto_{key}'
+            meshes[key, level] = writer.mesh(name, parts_builder(parts))
+        return meshes[key, level]
+
+    def radius(bounds):
+        (x0, y0, z0), (x1, y1, z1) = bounds
+        return math.dist((x0, y0, z0), (x1, y1, z1)) / 2
+
+    for name, col in scene.collections.items():
+        if not col.primitives and not col.instances:
+            continue
+        root = writer.node(name=name)
+        chains = col.lods if lod else []
+        chained = {id(prim) for chain in chains for prim in chain.members}
+        primitives = [prim for prim in col.primitives if id(prim) not in chained]
+
+        if batch and primitives:
+            atlases = {}
+            for prim in primitives:
+                atlases.setdefault(lightmaps.get(prim.name, (None,))[0], []).append(prim)
+            for i, prims in enumerate(atlases.values()):
+                static = f'{name}_Static_{i}' if i else f'{name}_Static'
+                writer.node(root, name=static, mesh=merged_mesh(static, prims))
+        else:
+            for prim in primitives:
+                x, y, z = prim.loc
+                writer.node(root, name=prim.name, translation=[x, z, -y],
+                            mesh=writer.mesh(prim.name, parts_builder(prim.parts),
+                                             lightmaps.get(prim.name)))
+
+        for chain in chains:
+            cx, cy, cz = chain.loc
+
+            def level_node(i, parent, chain=chain, cx=cx, cy=cy, cz=cz, **fields):
+                if i:
+                    level = f'{chain.name}_LOD{i}'
+                    return writer.node(parent, name=level, **fields,
+                                       mesh=writer.mesh(level, parts_builder(chain.levels[i - 1][1])))
+                if batch:
+                    return writer.node(parent, name=chain.name, **fields,
+                                       mesh=merged_mesh(chain.name, chain.members, chain.loc))
+                group = writer.node(parent, name=chain.name, **fields)
+                for prim in chain.members:
+                    x, y, z = prim.loc[0] - cx, prim.loc[1] - cy, prim.loc[2] - cz
+                    writer.node(group, name=prim.name, translation=[x, z, -y],
+                                mesh=writer.mesh(prim.name, parts_builder(prim.parts),
+                                                 lightmaps.get(prim.name)))
+                return group
+
+            bounds = [scene.bounds(prim) for prim in chain.members]
+            extent = (tuple(min(b[0][k] for b in bounds) for k in range(3)),
+                      tuple(max(b[1][k] for b in bounds) for k in range(3)))
+            write_lods(writer, root, chain.name, [0] + [d for d, _ in chain.levels],
+                       radius(extent), level_node, lod, translation=[cx, cz, -cy])
+
+        groups = {}
+        for inst in col.instances:
+            groups.setdefault(inst.key, []).append(inst)
+        for key, instances in groups.items():
+            levels = scene.prototype_lods.get(key, []) if lod else []
+            distances = [0] + [d for d, _ in levels]
+            translation, rotation, scale = instance_trs(instances)
+            if instancing:
+                ext = {'EXT_mesh_gpu_instancing': {'attributes': {
+                    'TRANSLATION': writer.accessor(translation, 'VEC3'),
+                    'ROTATION': writer.accessor(rotation, 'VEC4'),
+                    'SCALE': writer.accessor(scale, 'VEC3'),
+                }}}
+                writer.extensions.add('EXT_mesh_gpu_instancing')
+                writer.required.add('EXT_mesh_gpu_instancing')
+                if not levels:
+                    writer.node(root, name=f'Props_{key}', mesh=proto_mesh(key),
+                                extensions=ext)
+                    continue
+                if lod == 'nodes':
+                    # One instanced node per level sharing the transforms; the
+                    # client picks a level per instance from extras.lodDistances.
+                    group = writer.node(root, name=f'LOD_Props_{key}',
+                                        extras={'lodDistances': distances, 'perInstance': True})
+                    for i in range(len(distances)):
+                        writer.node(group, name=f'Props_{key}_LOD{i}' if i else f'Props_{key}',
+                                    mesh=proto_mesh(key, i), extensions=ext)
+                    continue
+
+                def level_node(i, parent, key=key, ext=ext, **fields):
+                    # each level gets its own extensions dict: MSFT_lod goes on level 0 only
+                    return writer.node(parent, name=f'Props_{key}_LOD{i}' if i else f'Props_{key}',
+                                       mesh=proto_mesh(key, i), extensions=dict(ext), **fields)
+
+                # Coverage is judged on the largest instance, so no tree coarsens too early
+                write_lods(writer, root, f'Props_{key}', distances,
+                           radius(city.local_bounds(scene.prototypes[key]))
+                           * max(inst.scale for inst in instances), level_node, lod)
+            else:
+                group = writer.node(root, name=f'Props_{key}')
+                proto_radius = radius(city.local_bounds(scene.prototypes[key]))
+                for inst, t, r, s in zip(instances, translation, rotation, scale):
+                    trs = {'translation': t.tolist(), 'rotation': r.tolist(),
+                           'scale': s.tolist()}
+                    if not levels:
+                        writer.node(group, name=inst.name, mesh=proto_mesh(key), **trs)
+                        continue
+
+                    def level_node(i, parent, inst=inst, key=key, **fields):
+                        return writer.node(parent, name=f'{inst.name}_LOD{i}' if i else inst.name,
+                                           mesh=proto_mesh(key, i), **fields)
+
+                    write_lods(writer, group, inst.name, distances,
+                               proto_radius * inst.scale, level_node, lod, **trs)
+    return writer
+
+def export_city(path=None, seed=42, instancing=True, batch=False, scene=None, lod='msft',
+                density=None):
+    """Describe the city (unless `scene` is given) and return the GLB bytes."""
+    scene = scene or city.describe_city(seed, log=lambda msg: None, density=density)
+    data = write_scene(scene, instancing=instancing, batch=batch, lod=lod).to_bytes()
+    if path:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+    return data
+
+def benchmark(seed=42, repeats=3):
+    """Time description and export for each output mode; report size."""
+    t0 = time.perf_counter()
+    scene = city.describe_city(seed, log=lambda msg: None)
+    print(f"  describe_city      {(time.perf_counter() - t0) * 1000:8.1f} ms")
+
+    for label, options in [('instanced', {}), ('instanced+batch', {'batch': True}),
+                           ('flat nodes', {'instancing': False}),
+                           ('no LODs', {'lod': None})]:
+        times = []
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            writer = write_scene(scene, **options)
+            data = writer.to_bytes()
+            times.append(time.perf_counter() - t0)
+        print(f"  {label:<18} {min(times) * 1000:8.1f} ms   {len(data) / 1024:8.1f} KiB   "
+              f"{len(writer.gltf['nodes']):5} nodes   {writer.draw_calls():5} draw calls")
+
+    levels = lod_triangles(scene)
+    print("  LOD triangles      " + "   ".join(f"L{i} {n:,}" for i, n in enumerate(levels)))
+
+def triangles(parts):
+    return sum(len(face) - 2 for part in parts for face in part.geometry()[1])
+
+def lod_triangles(scene):
+    """Triangles of every LOD-carrying asset with all of them at level 0, 1, 2..."""
+    counts = {}
+
+    def tally(full, levels, copies=1):
+        for i, parts in enumerate([full] + [parts for _, parts in levels]):
+            counts[i] = counts.get(i, 0) + copies * triangles(parts)
+
+    for col in scene.collections.values():
+        for chain in col.lods:
+            tally([part for prim in chain.members for part in prim.parts], chain.levels)
+        for key, levels in scene.prototype_lods.items():
+            copies = sum(inst.key == key for inst in col.instances)
+            if copies:
+                tally(scene.prototypes[key], levels, copies)
+    return [counts[i] for i in sorted(counts)]
+
+# ── Tiling ───────────────────────────────────────────────────────────────────
+
+def tile_scene(scene, tile_size=100.0):
+    """
+    Partition `scene` into a square grid of tiles on the ground plane.
+
+    Each object goes to the tile holding the centre of its footprint; the
+    members of an LOD chain move together, by the footprint of the whole
+    chain. Objects wider than a tile (ground, arterial roads, the river) go
+    to a base scene the client keeps loaded. Returns (base, {(ix, iy): CityScene}, origin),
+    where tile (ix, iy) covers origin + (ix, iy) * tile_size onwards.
+    """
+    placed = []
+    for name, col in scene.collections.items():
+        chained = {id(prim) for chain in col.lods for prim in chain.members}
+        for obj in col.primitives + col.instances:
+            if id(obj) not in chained:
+                placed.append((name, [obj], None, scene.bounds(obj)))
+        for chain in col.lods:
+            bounds = [scene.bounds(prim) for prim in chain.members]
+            placed.append((name, chain.members, chain,
+                           (tuple(min(b[0][k] for b in bounds) for k in range(3)),
+                            tuple(max(b[1][k] for b in bounds) for k in range(3)))))
+    origin = (min(b[0][0] for *_, b in placed), min(b[0][1] for *_, b in placed))
+
+    def empty():
+        sub = city.CityScene()
+        sub.prototypes = scene.prototypes
+        sub.prototype_lods = scene.prototype_lods
+        return sub
+
+    base, tiles = empty(), {}
+    for name, objs, chain, (lo, hi) in placed:
+        if max(hi[0] - lo[0], hi[1] - lo[1]) > tile_size:
+            target = base
+        else:
+            ix = int(((lo[0] + hi[0]) / 2 - origin[0]) // tile_size)
+            iy = int(((lo[1] + hi[1]) / 2 - origin[1]) // tile_size)
+            target = tiles.get((ix, iy)) or tiles.setdefault((ix, iy), empty())
+        col = target.collection(name)
+        for obj in objs:
+            (col.instances if isinstance(obj, city.Instance) else col.primitives).append(obj)
+        if chain:
+            col.lods.append(chain)
+    return base, tiles, origin
+
+def scene_bounds(scene):
+    """Y-up AABB [min, max] of everything in `scene`, as in the GLB itself."""
+    boxes = [scene.bounds(obj) for col in scene.collections.values()
+             for obj in col.primitives + col.instances]
+    x0, y0, z0 = (min(b[0][k] for b in boxes) for k in range(3))
+    x1, y1, z1 = (max(b[1][k] for b in boxes) for k in range(3))
+    return [[round(v, 3) for v in (x0, z0, -y1)], [round(v, 3) for v in (x1, z1, -y0)]]
+
+def export_tiles(out_dir, tile_size=100.0, seed=42, scene=None, **options):
+    """
+    Write one GLB per tile plus base.glb and a tiles.json streaming index.
+
+    The index lists, per tile, its grid cell, file, byte size, Y-up bounding
+    box and the ids of its (up to eight) neighbouring tiles, so a client can
+    load the tile under the camera and prefetch the ring around it.
+    `options` are passed to write_scene().
+    """
+    scene = scene or city.describe_city(seed, log=lambda msg: None)
+    base, tiles, origin = tile_scene(scene, tile_size)
+    os.makedirs(out_dir, exist_ok=True)
+
+    def write(sub, filename):
+        data = write_scene(sub, **options).to_bytes()
+        with open(os.path.join(out_dir, filename), 'wb') as f:
+            f.write(data)
+        return {'file': filename, 'bytes': len(data), 'bounds': scene_bounds(sub)}
+
+    index = {
+        'version': 1, 'seed': seed, 'tileSize': tile_size,
+        'origin': [origin[0], -origin[1]],  # Y-up (x, z) of the grid corner
+        'base': write(base, 'base.glb'),
+        'tiles': {},
+    }
+    for ix, iy in sorted(tiles):
+        entry = {'cell': [ix, iy], **write(tiles[ix, iy], f'tile_{ix}_{iy}.glb')}
+        entry['neighbours'] = [f'{ix + dx}_{iy + dy}'
+                               for dy in (-1, 0, 1) for dx in (-1, 0, 1)
+                               if (dx or dy) and (ix + dx, iy + dy) in tiles]
+        index['tiles'][f'{ix}_{iy}'] = entry
+
+    with open(os.path.join(out_dir, 'tiles.json'), 'w') as f:
+        json.dump(index, f, indent=1)
+    return index
+
+# ── CLI ──────────────────────────────────────────────────────────────────────
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Export the Nairobi city model as GLB.')
+    parser.add_argument('-o', '--output', default=DEFAULT_OUTPUT)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--batch', action='store_true',
+                        help='merge static primitives per collection')
+    parser.add_argument('--no-instancing', action='store_true',
+                        help='write one node per prop instead of EXT_mesh_gpu_instancing')
+    parser.add_argument('--benchmark', action='store_true',
+                        help='report export time and size instead of writing a file')
+    parser.add_argument('--lod', choices=('msft', 'nodes', 'none'), default='msft',
+                        help='LOD chains as MSFT_lod, as per-level nodes, or not at all')
+    parser.add_argument('--tiles', metavar='DIR',
+                        help='write a tile grid and tiles.json index into DIR')
+    parser.add_argument('--tile-size', type=float, default=100.0,
+                        help='tile edge length in metres (default 100)')
+    args = parser.parse_args(argv)
+    lod = None if args.lod == 'none' else args.lod
+
+    if args.benchmark:
+        benchmark(args.seed)
+        return
+
+    if args.tiles:
+        t0 = time.perf_counter()
+        index = export_tiles(args.tiles, args.tile_size, args.seed,
+                             instancing=not args.no_instancing, batch=args.batch, lod=lod)
+        sizes = [t['bytes'] for t in index['tiles'].values()]
+        print(f"Wrote {len(sizes)} tiles + base to {args.tiles} "
+              f"(base {index['base']['bytes'] / 1024:.1f} KiB, "
+              f"largest tile {max(sizes) / 1024:.1f} KiB) "
+              f"in {(time.perf_counter() - t0) * 1000:.0f} ms")
+        return
+
+    t0 = time.perf_counter()
+    data = export_city(args.output, args.seed, instancing=not args.no_instancing,
+                       batch=args.batch, lod=lod)
+    print(f"Wrote {args.output} ({len(data) / 1024:.1f} KiB) "
+          f"in {(time.perf_counter() - t0) * 1000:.0f} ms")
+
+if __name__ == "__main__":
+    main()
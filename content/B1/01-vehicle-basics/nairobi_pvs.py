@@ -0,0 +1,322 @@
+"""
+================================================================================
+  NAIROBI CITY MODEL — Potentially Visible Sets
+  NTSA B1 Driving Simulator — street-level occlusion culling data
+================================================================================
+  From a car on the road most of the CBD is hidden behind the first row of
+  facades. This precomputes, for every cell of the road graph's grid index
+  (the same cells nairobi_roads.py exports, so the client's one cell lookup
+  serves both), which buildings and prop clusters can be seen from the
+  carriageway in that cell, and writes the answer as one bitset per cell.
+
+  Occluders are the opaque, unrotated, ground-standing boxes of the Buildings
+  and Landmarks collections (cylinders by their inscribed square), taken
+  straight from the scene description. Visibility is sampled: eye points on
+  the road at EYE_HEIGHTS look at points spread over each unit's faces and
+  roof, and a unit is visible if any ray reaches it. Each cell's set is then
+  widened by its neighbours' (--dilate) to cover what falls between samples.
+
+  Units are whole LOD chains (buildings, landmarks) and clusters of props per
+  collection and CLUSTER-metre square. Ground, roads and water are never
+  culled. A unit lists its glTF node names and, for GPU-instanced props, the
+  instance indices within each Props_<key> node.
+
+  pvs.json:
+    units     [{name, kind, bounds (Y-up), nodes, instances {key: [index]}}]
+    grid      origin / cell / cols / rows of the road index
+    rowBytes  bytes per bitset; bit u of a row is byte u >> 3, bit u & 7
+    rows      base64 of the distinct bitsets, back to back
+    cellRows  per grid cell, its row in `rows`, or -1 (no road: draw all)
+
+  USAGE:
+    python3 nairobi_pvs.py                      # -> lesson-01-town-simulation/pvs.json
+    python3 nairobi_pvs.py --workers 8          # spread cells over processes
+    python3 nairobi_pvs.py --query 5 -30        # visible units at glTF (x, z)
+
+  Requires: Python 3.8+, NumPy
+================================================================================
+"""
+
+import argparse
+import base64
+import json
+import math
+import os
+import time
+
+import numpy as np
+
+import nairobi_city_model as city
+import nairobi_roads as roads
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUTPUT = os.path.join(HERE, 'lesson-01-town-simulation', 'pvs.json')
+
+OCCLUDER_COLLECTIONS = ('Buildings', 'Landmarks')
+ALWAYS_VISIBLE = ('Ground', 'Roads', 'Water', 'Sky')
+EYE_HEIGHTS = (1.2, 2.5)   # car driver, matatu / Cam_StreetLevel
+CLUSTER = 40.0             # prop cluster size, metres
+SAMPLE_SPACING = 6.0       # target samples along each face, metres
+
+# ── Occluders & Units ────────────────────────────────────────────────────────
+
+def occluders(scene, min_height=3.0):
+    """(lo, hi) arrays of the opaque ground-standing boxes that hide what is
+    behind them."""
+    boxes = []
+    for name in OCCLUDER_COLLECTIONS:
+        for prim in scene.collections[name].primitives:
+            for part in prim.parts:
+                if any(part.rot) or part.kind not in ('box', 'cylinder') \
+                        or part.material.alpha < 1:
+                    continue
+                (x0, y0, z0), (x1, y1, z1) = city.placed_bounds(
+                    city.local_bounds([part]), prim.loc)
+                if part.kind == 'cylinder':
+                    radius, _, verts = part.args
+                    half = radius * math.cos(math.pi / verts) / math.sqrt(2)
+                    cx, cy = (x0 + x1) / 2, (y0 + y1) / 2
+                    x0, x1, y0, y1 = cx - half, cx + half, cy - half, cy + half
+                if z0 <= 1e-6 and z1 - z0 >= min_height and min(x1 - x0, y1 - y0) > 0.5:
+                    boxes.append(((x0, y0, z0), (x1, y1, z1)))
+    lo, hi = np.array(boxes).transpose(1, 0, 2)
+    # A hair inside, so grazing rays stay visible; bases stay on the ground
+    return lo + (0.05, 0.05, 0), hi - 0.05
+
+def units(scene):
+    """
+    Cullable units: [{'name', 'kind', 'collection', 'lo', 'hi', 'nodes',
+    'instances'}], LOD chains first, then prop clusters, in a stable order.
+    """
+    found, clusters = [], {}
+
+    def grow(unit, bounds):
+        unit['lo'] = [min(a, b) for a, b in zip(unit['lo'], bounds[0])]
+        unit['hi'] = [max(a, b) for a, b in zip(unit['hi'], bounds[1])]
+
+    for name, col in scene.collections.items():
+        if name in ALWAYS_VISIBLE:
+            continue
+        chained = {id(prim) for chain in col.lods for prim in chain.members}
+        for chain in col.lods:
+            unit = {'name': chain.name, 'kind': 'building', 'collection': name,
+                    'lo': [math.inf] * 3, 'hi': [-math.inf] * 3,
+                    'nodes': [chain.name], 'instances': {}}
+            for prim in chain.members:
+                grow(unit, scene.bounds(prim))
+            found.append(unit)
+
+        def cluster(obj):
+            (x0, y0, _), (x1, y1, _) = bounds = scene.bounds(obj)
+            cell = (math.floor((x0 + x1) / 2 / CLUSTER), math.floor((y0 + y1) / 2 / CLUSTER))
+            unit = clusters.get((name, cell))
+            if unit is None:
+                unit = clusters[name, cell] = {
+                    'name': f'{name}_{cell[0]}_{cell[1]}', 'kind': 'props',
+                    'collection': name, 'lo': [math.inf] * 3, 'hi': [-math.inf] * 3,
+                    'nodes': [], 'instances': {}}
+            grow(unit, bounds)
+            return unit
+
+        for prim in col.primitives:
+            if id(prim) not in chained:
+                cluster(prim)['nodes'].append(prim.name)
+        index = {}
+        for inst in col.instances:
+            i = index[inst.key] = index.get(inst.key, -1) + 1  # order in Props_<key>
+            cluster(inst)['instances'].setdefault(inst.key, []).append(i)
+    return found + [clusters[key] for key in sorted(clusters)]
+
+def unit_samples(unit_list, spacing=SAMPLE_SPACING):
+    """Points just outside every unit's faces and roof, and their unit ids."""
+    points, owner = [], []
+    for u, unit in enumerate(unit_list):
+        (x0, y0, z0), (x1, y1, z1) = unit['lo'], unit['hi']
+        x0, y0, x1, y1, z1 = x0 - 0.1, y0 - 0.1, x1 + 0.1, y1 + 0.1, z1 + 0.1
+        xs = np.linspace(x0, x1, max(2, math.ceil((x1 - x0) / spacing) + 1))
+        ys = np.linspace(y0, y1, max(2, math.ceil((y1 - y0) / spacing) + 1))
+        ring = [(x, y) for x in xs for y in (y0, y1)] + [(x, y) for y in ys[1:-1]
+                                                         for x in (x0, x1)]
+        for z in sorted({min(z0 + 0.3, z1), (z0 + z1) / 2, z1}):
+            points += [(x, y, z) for x, y in ring]
+        points.append(((x0 + x1) / 2, (y0 + y1) / 2, z1))
+        owner += [u] * (len(points) - len(owner))
+    return np.array(points), np.array(owner)
+
+# ── Visibility ───────────────────────────────────────────────────────────────
+#
+#  Per eye, the occluders are swept nearest-first (by their far corner) into a
+#  horizon: for each AZIMUTH_BINS slice of the view, the steepest slope up to
+#  a roof seen so far, counting only slices the occluder covers completely
+#  and its roof at the far corner. A sample beyond an occluder and below the
+#  horizon is then certainly behind a box: the ray to it crosses the footprint
+#  below the roof and, starting and ending above ground, above its base.
+
+AZIMUTH_BINS = 1440  # quarter-degree slices
+
+def visible(eyes, samples, owner, count, lo, hi):
+    """Boolean per unit: can any eye see any of its samples past the boxes?"""
+    seen = np.zeros(count, bool)
+    width = 2 * math.pi / AZIMUTH_BINS
+    corners = np.stack([np.stack([lo[:, 0], lo[:, 1]], 1), np.stack([hi[:, 0], lo[:, 1]], 1),
+                        np.stack([hi[:, 0], hi[:, 1]], 1), np.stack([lo[:, 0], hi[:, 1]], 1)], 1)
+    for eye in eyes:
+        todo = np.flatnonzero(~seen[owner])
+        if not len(todo):
+            break
+        # Occluders as seen from the eye: azimuth span, far distance, roof slope
+        rel = corners - eye[:2]
+        centre = np.arctan2(rel[:, :, 1].mean(1), rel[:, :, 0].mean(1))
+        turn = (np.arctan2(rel[:, :, 1], rel[:, :, 0]) - centre[:, None] + math.pi) \
+            % (2 * math.pi) - math.pi
+        first = np.ceil((centre + turn.min(1) + math.pi) / width).astype(int)
+        last = np.floor((centre + turn.max(1) + math.pi) / width).astype(int) - 1
+        far = np.hypot(rel[:, :, 0], rel[:, :, 1]).max(1)
+        roof = (hi[:, 2] - eye[2]) / far
+        order = np.argsort(far)
+
+        rel = samples[todo] - eye
+        dist = np.hypot(rel[:, 0], rel[:, 1])
+        slope = (np.maximum(samples[todo, 2], 0) - eye[2]) / dist
+        slot = ((np.arctan2(rel[:, 1], rel[:, 0]) + math.pi) // width).astype(int) \
+            % AZIMUTH_BINS
+        behind = np.searchsorted(far[order], dist)  # occluders wholly nearer
+
+        horizon = np.full(AZIMUTH_BINS, -np.inf)
+        hidden = np.zeros(len(todo), bool)
+        for k, j in enumerate(order, 1):
+            if last[j] >= first[j]:
+                span = np.arange(first[j], last[j] + 1) % AZIMUTH_BINS
+                horizon[span] = np.maximum(horizon[span], roof[j])
+            group = np.flatnonzero(behind == k) if k < len(order) else \
+                np.flatnonzero(behind >= k)
+            hidden[group] = slope[group] < horizon[slot[group]]
+        seen[owner[todo[~hidden]]] = True
+    return seen
+
+def cell_eyes(lookup, index, cell, lo, hi, per_side=3):
+    """Eye points on the carriageway inside one grid cell (Blender x, y, z)."""
+    r, c = divmod(cell, index['cols'])
+    size = index['cell']
+    eyes = []
+    for i in range(per_side):
+        for j in range(per_side):
+            x = index['origin'][0] + (c + (i + 0.5) / per_side) * size
+            z = index['origin'][1] + (r + (j + 0.5) / per_side) * size
+            if lookup.locate(x, z) is None:
+                continue
+            for height in EYE_HEIGHTS:
+                eye = np.array([x, -z, height])
+                if not ((lo <= eye) & (eye <= hi)).all(axis=1).any():
+                    eyes.append(eye)
+    return eyes
+
+def _cell_sets(seed, cell_size, cells, density=None):
+    """Visible-unit arrays for `cells`, from a fresh description (for workers)."""
+    scene = city.describe_city(seed, log=None, density=density)
+    graph = roads.road_graph(scene, cell_size)
+    unit_list = units(scene)
+    samples, owner = unit_samples(unit_list)
+    lo, hi = occluders(scene)
+    lookup = roads.RoadIndex(graph)
+    return [visible(cell_eyes(lookup, graph['index'], cell, lo, hi), samples, owner,
+                    len(unit_list), lo, hi) for cell in cells]
+
+def compute_pvs(seed=42, cell_size=20.0, dilate=1, workers=1, density=None):
+    """The pvs.json dict for the city described by `seed`."""
+    scene = city.describe_city(seed, log=None, density=density)
+    graph = roads.road_graph(scene, cell_size)
+    index = graph['index']
+    unit_list = units(scene)
+    cols, rows = index['cols'], index['rows']
+    road_cells = [c for c in range(cols * rows)
+                  if index['edgeStart'][c + 1] > index['edgeStart'][c]]
+
+    if workers > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        chunks = [road_cells[i::workers] for i in range(workers)]
+        with ProcessPoolExecutor(workers) as pool:
+            parts = pool.map(_cell_sets, [seed] * workers, [cell_size] * workers, chunks,
+                             [density] * workers)
+            sets = {cell: seen for chunk, part in zip(chunks, parts)
+                    for cell, seen in zip(chunk, part)}
+    else:
+        sets = dict(zip(road_cells, _cell_sets(seed, cell_size, road_cells, density)))
+
+    # Widen each road cell's set by its road neighbours'
+    final = {}
+    for cell, seen in sets.items():
+        r, c = divmod(cell, cols)
+        merged = seen.copy()
+        for dr in range(-dilate, dilate + 1):
+            for dc in range(-dilate, dilate + 1):
+                if 0 <= r + dr < rows and 0 <= c + dc < cols:
+                    other = sets.get((r + dr) * cols + c + dc)
+                    if other is not None:
+                        merged |= other
+        final[cell] = np.packbits(merged, bitorder='little').tobytes()
+
+    distinct = sorted(set(final.values()))
+    row_of = {bits: i for i, bits in enumerate(distinct)}
+    return {
+        'version': 1, 'seed': seed, 'eyeHeights': list(EYE_HEIGHTS),
+        'units': [{'name': u['name'], 'kind': u['kind'], 'collection': u['collection'],
+                   'bounds': [[round(v, 3) + 0.0 for v in (u['lo'][0], u['lo'][2], -u['hi'][1])],
+                              [round(v, 3) + 0.0 for v in (u['hi'][0], u['hi'][2], -u['lo'][1])]],
+                   'nodes': u['nodes'], 'instances': u['instances']} for u in unit_list],
+        'grid': {key: index[key] for key in ('origin', 'cell', 'cols', 'rows')},
+        'rowBytes': (len(unit_list) + 7) // 8,
+        'rows': base64.b64encode(b''.join(distinct)).decode('ascii'),
+        'cellRows': [row_of[final[c]] if c in final else -1 for c in range(cols * rows)],
+    }
+
+def visible_units(pvs, x, z):
+    """Names of the units drawn at glTF (x, z), or None where everything is."""
+    grid = pvs['grid']
+    c = min(max(int((x - grid['origin'][0]) // grid['cell']), 0), grid['cols'] - 1)
+    r = min(max(int((z - grid['origin'][1]) // grid['cell']), 0), grid['rows'] - 1)
+    row = pvs['cellRows'][r * grid['cols'] + c]
+    if row < 0:
+        return None
+    size = pvs['rowBytes']
+    bits = base64.b64decode(pvs['rows'])[row * size:(row + 1) * size]
+    return [u['name'] for i, u in enumerate(pvs['units']) if bits[i >> 3] >> (i & 7) & 1]
+
+# ── CLI ──────────────────────────────────────────────────────────────────────
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Precompute Nairobi street-level PVS.')
+    parser.add_argument('-o', '--output', default=DEFAULT_OUTPUT)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--cell', type=float, default=20.0,
+                        help='grid cell size in metres; match nairobi_roads.py (default 20)')
+    parser.add_argument('--dilate', type=int, default=1,
+                        help='widen each set by this many neighbouring cells (default 1)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--query', type=float, nargs=2, metavar=('X', 'Z'),
+                        help='print the units visible at a glTF (x, z)')
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    pvs = compute_pvs(args.seed, args.cell, args.dilate, args.workers)
+    elapsed = time.perf_counter() - t0
+    if args.query:
+        names = visible_units(pvs, *args.query)
+        print('no road here: draw everything' if names is None else
+              f"{len(names)}/{len(pvs['units'])} units: {', '.join(names)}")
+        return
+
+    rows = [r for r in pvs['cellRows'] if r >= 0]
+    size = pvs['rowBytes']
+    bits = base64.b64decode(pvs['rows'])
+    shown = [sum(bin(b).count('1') for b in bits[r * size:(r + 1) * size]) for r in rows]
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(pvs, f, separators=(',', ':'))
+    print(f"Wrote {args.output}: {len(pvs['units'])} units, {len(rows)} road cells, "
+          f"{len(bits) // size} distinct sets, {len(bits)} bytes of bits; "
+          f"{sum(shown) / len(shown) / len(pvs['units']):.0%} of units drawn on average "
+          f"({elapsed:.1f} s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+"""
+================================================================================
+  NAIROBI CITY MODEL — Still Renderer
+  NTSA B1 Driving Simulator — lesson and marketing stills from any camera
+================================================================================
+  Renders a camera of a built city .blend with one of the RENDER_PROFILES in
+  nairobi_city_model.py (draft, preview, final). A draft or preview frame is
+  one Blender process using every core. A final frame is cut into horizontal
+  bands, each rendered as a cropped border region by its own `blender -b`
+  process (several at once, sharing the cores), and the bands are stitched
+  back into one PNG here.
+
+  Bands overlap by OVERLAP pixels and only their inner rows are kept, so the
+  denoiser never sees a band edge inside the finished image.
+
+  USAGE:
+    python3 nairobi_render.py --profile preview                  # builds a .blend first
+    python3 nairobi_render.py --blend renders/nairobi_dusk.blend --camera Cam_KICC_Hero
+    python3 nairobi_render.py --profile final -j 8 --bands 16    # 4K over 8 processes
+    python3 nairobi_render.py --camera all                       # every Cam_* camera
+
+  Requires: Python 3.8+, NumPy, Blender 3.3+ (on PATH, $BLENDER or --blender)
+================================================================================
+"""
+
+import argparse
+import os
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)  # Blender runs this file without its directory on the path
+
+import nairobi_city_model as city
+
+try:
+    import bpy
+except ImportError:
+    bpy = None
+
+OVERLAP = 16  # rows rendered past each band edge and then discarded
+CAMERAS = ['Cam_CBD_Overview', 'Cam_KICC_Hero', 'Cam_StreetLevel', 'Cam_Aerial']
+
+# ── Bands ────────────────────────────────────────────────────────────────────
+#
+#  Blender turns a border into pixels as int(border * size). Edges are handed
+#  over a quarter pixel inside their row so float32 rounding can't move them.
+
+def bands(height, count):
+    """Split `height` rows (counted from the top) into `count` bands:
+    [(keep_top, keep_bottom, render_top, render_bottom)]."""
+    edges = [round(i * height / count) for i in range(count + 1)]
+    return [(y0, y1, max(0, y0 - OVERLAP), min(height, y1 + OVERLAP))
+            for y0, y1 in zip(edges, edges[1:]) if y1 > y0]
+
+def border(top, bottom, height):
+    """Blender's (min_y, max_y) for rows top..bottom; its y runs bottom-up."""
+    def edge(px):
+        return 0.0 if px <= 0 else 1.0 if px >= height else (px + 0.25) / height
+    return edge(height - bottom), edge(height - top)
+
+# ── Stitching ────────────────────────────────────────────────────────────────
+
+def read_tga(path):
+    """Uncompressed 24/32-bit TGA (Blender's TARGA_RAW) as an (h, w, 3) uint8 array."""
+    import numpy as np
+
+    with open(path, 'rb') as f:
+        data = f.read()
+    id_len, cmap, kind = data[0], data[1], data[2]
+    width, height, bpp, desc = struct.unpack_from('<HHBB', data, 12)
+    if cmap or kind != 2 or bpp not in (24, 32):
+        raise ValueError(f"{path}: not an uncompressed true-colour TGA")
+    start = 18 + id_len
+    pixels = np.frombuffer(data, np.uint8, width * height * bpp // 8, start)
+    pixels = pixels.reshape(height, width, bpp // 8)[:, :, 2::-1]  # BGR(A) -> RGB
+    return pixels if desc & 0x20 else pixels[::-1]                 # bottom-up rows
+
+def write_png(path, pixels):
+    """(h, w, 3) uint8 array as an 8-bit RGB PNG."""
+    import numpy as np
+
+    height, width = pixels.shape[:2]
+    rows = np.zeros((height, width * 3 + 1), np.uint8)  # filter byte 0 per row
+    rows[:, 1:] = pixels.reshape(height, -1)
+
+    def chunk(tag, body):
+        return (struct.pack('>I', len(body)) + tag + body +
+                struct.pack('>I', zlib.crc32(tag + body) & 0xffffffff))
+
+    with open(path, 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\n')
+        f.write(chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)))
+        f.write(chunk(b'IDAT', zlib.compress(rows.tobytes(), 6)))
+        f.write(chunk(b'IEND', b''))
+
+def stitch(parts, size, path):
+    """Paste the kept rows of each band render [(band, tga path)] into one PNG."""
+    import numpy as np
+
+    width, height = size
+    canvas = np.zeros((height, width, 3), np.uint8)
+    for (keep0, keep1, top, bottom), part in parts:
+        pixels = read_tga(part)
+        if pixels.shape[:2] != (bottom - top, width):
+            raise RuntimeError(f"{part}: {pixels.shape[1]}x{pixels.shape[0]}, "
+                               f"expected {width}x{bottom - top}")
+        canvas[keep0:keep1] = pixels[keep0 - top:keep1 - top]
+    write_png(path, canvas)
+
+# ── Orchestration ────────────────────────────────────────────────────────────
+
+def worker_command(blender, blend, camera, profile, output, band=None, threads=0):
+    """`blender -b` command that renders one camera (or one band of it)."""
+    cmd = [blender, '-b', blend, '--python-exit-code', '1', '-t', str(threads),
+           '-P', os.path.abspath(__file__), '--', '--worker', '--profile', profile,
+           '--output', output]
+    if camera:
+        cmd += ['--camera', camera]
+    if band:
+        height = city.render_size(profile)[1]
+        cmd += ['--border', *(f'{v:.9f}' for v in border(band[2], band[3], height))]
+    return cmd
+
+def build_blend(blender, path, lighting, seed=42):
+    """Build the city into `path` so there is something to render; RuntimeError
+    with the end of Blender's output if the build fails."""
+    done = subprocess.run([blender, '-b', '--factory-startup', '--python-exit-code', '1',
+                           '-P', os.path.join(HERE, 'nairobi_city_model.py'), '--',
+                           '--seed', str(seed), '--lighting', lighting, '--save', path],
+                          stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                          stdin=subprocess.DEVNULL, text=True, errors='replace')
+    if done.returncode != 0 or not os.path.exists(path):
+        tail = '\n'.join(done.stdout.splitlines()[-20:])
+        raise RuntimeError(f"building the city failed (exit {done.returncode}):\n{tail}")
+
+def render_still(blender, blend, camera, profile, output, jobs=1, count=1, log=print):
+    """
+    Render `camera` of `blend` to the PNG `output`. With count > 1 the frame is
+    split into that many bands, rendered `jobs` at a time. Returns seconds.
+    """
+    t0 = time.perf_counter()
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    if count <= 1:
+        subprocess.run(worker_command(blender, blend, camera, profile, output),
+                       check=True, stdout=subprocess.DEVNULL)
+        return time.perf_counter() - t0
+
+    size = city.render_size(profile)
+    threads = max(1, (os.cpu_count() or 1) // jobs)
+    with tempfile.TemporaryDirectory(prefix='nairobi_bands_') as tmp:
+        parts = [(band, os.path.join(tmp, f'band_{i:03d}.tga'))
+                 for i, band in enumerate(bands(size[1], count))]
+
+        def render_band(part):
+            band, path = part
+            t = time.perf_counter()
+            subprocess.run(worker_command(blender, blend, camera, profile, path, band,
+                                          threads), check=True, stdout=subprocess.DEVNULL)
+            return time.perf_counter() - t
+
+        with ThreadPoolExecutor(jobs) as pool:
+            times = list(pool.map(render_band, parts))
+        log(f"    {len(parts)} bands on {jobs} process(es) x {threads} thread(s): "
+            f"slowest {max(times):.1f} s, sum {sum(times):.1f} s")
+        stitch(parts, size, output)
+    return time.perf_counter() - t0
+
+# ── Blender Worker ───────────────────────────────────────────────────────────
+
+def render_in_blender(args):
+    """Inside `blender -b`: apply the profile and write one (border) render."""
+    scene = bpy.context.scene
+    city.setup_render(args.profile)
+    if args.camera:
+        scene.camera = bpy.data.objects[args.camera]
+    render = scene.render
+    if args.border:
+        render.use_border = True
+        render.use_crop_to_border = True
+        render.border_min_x, render.border_max_x = 0.0, 1.0
+        render.border_min_y, render.border_max_y = args.border
+        render.image_settings.file_format = 'TARGA_RAW'
+    else:
+        render.use_border = False
+        render.image_settings.file_format = 'PNG'
+    render.image_settings.color_mode = 'RGB'
+    render.use_file_extension = False
+    render.filepath = args.output
+    bpy.ops.render.render(write_still=True)
+
+# ── CLI ──────────────────────────────────────────────────────────────────────
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else sys.argv[1:]
+    parser = argparse.ArgumentParser(description='Render stills of the Nairobi city model.')
+    parser.add_argument('--blend', help='built city .blend (default: build one first)')
+    parser.add_argument('--camera', action='append',
+                        help="camera name, repeatable, or 'all' (default: scene camera)")
+    parser.add_argument('--profile', choices=sorted(city.RENDER_PROFILES), default='preview')
+    parser.add_argument('--lighting', choices=sorted(city.LIGHTING_PROFILES), default='day',
+                        help='lighting when building the .blend (default day)')
+    parser.add_argument('-o', '--output', default=os.path.join(HERE, 'renders',
+                                                                 '{camera}_{profile}.png'))
+    parser.add_argument('-j', '--jobs', type=int, default=min(os.cpu_count() or 1, 8),
+                        help='Blender processes at once for banded renders')
+    parser.add_argument('--bands', type=int, default=None,
+                        help='bands per frame (default: 2 per job for final, else 1)')
+    parser.add_argument('--blender', default=os.environ.get('BLENDER', 'blender'))
+    # Used by the processes started above
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--border', type=float, nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        args.camera = args.camera and args.camera[0]
+        render_in_blender(args)
+        return
+
+    if shutil.which(args.blender) is None:
+        parser.error(f"Blender not found at {args.blender!r}; set --blender or $BLENDER")
+    count = args.bands or (2 * args.jobs if args.profile == 'final' else 1)
+    cameras = CAMERAS if args.camera == ['all'] else args.camera or [None]
+
+    with tempfile.TemporaryDirectory(prefix='nairobi_blend_') as tmp:
+        blend = args.blend
+        if blend is None:
+            blend = os.path.join(tmp, 'nairobi.blend')
+            print(f"Building the city ({args.lighting})...")
+            try:
+                build_blend(args.blender, blend, args.lighting)
+            except RuntimeError as exc:
+                sys.exit(str(exc))
+        width, height = city.render_size(args.profile)
+        for camera in cameras:
+            output = args.output.format(camera=camera or 'camera', profile=args.profile)
+            seconds = render_still(args.blender, os.path.abspath(blend), camera,
+                                   args.profile, output, args.jobs, count)
+            print(f"  {camera or 'scene camera':<18} {args.profile:<8} {width}x{height} "
+                  f"{seconds:7.1f} s  -> {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""
+================================================================================
+  NAIROBI CITY MODEL — Road Graph Exporter
+  NTSA B1 Driving Simulator — lanes, junctions and lookups for the simulator
+================================================================================
+  Writes the road network recorded by nairobi_city_model.describe_city() as
+  JSON: junction / roundabout nodes with their traffic lights, edges with
+  width, lanes, speed limit and signs, and a prebuilt uniform-grid index so
+  "which lane am I in" and "nearest junction" are a cell lookup plus a check
+  of the handful of candidates stored for that cell.
+
+  Coordinates are glTF ground-plane (x, z) in metres, matching nairobi.glb
+  (Blender y becomes -z). Traffic keeps left: on an edge travelled from
+  `from` to `to`, the forward lanes are on the left of the centre line.
+
+  USAGE:
+    python3 nairobi_roads.py                    # -> lesson-01-town-simulation/roads.json
+    python3 nairobi_roads.py --cell 10          # finer index grid
+    python3 nairobi_roads.py --query 5 -30      # lane / nearest junction at (x, z)
+    python3 nairobi_roads.py --benchmark        # lookups per second
+
+  Requires: Python 3.8+
+================================================================================
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import time
+
+import nairobi_city_model as city
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUTPUT = os.path.join(HERE, 'lesson-01-town-simulation', 'roads.json')
+
+# ── Graph ────────────────────────────────────────────────────────────────────
+
+def to_xz(pos):
+    """Blender ground (x, y) -> glTF ground (x, z)."""
+    return [round(pos[0], 3), round(-pos[1], 3) + 0.0]
+
+def road_graph(scene, cell=20.0):
+    """The scene's road network as a JSON-ready dict, with its grid index."""
+    nodes, edges = scene.roads.graph()
+    graph = {
+        'version': 1, 'drive': 'left', 'laneWidth': city.LANE_WIDTH,
+        'nodes': [{
+            'id': n.id, 'kind': n.kind, 'name': n.name, 'pos': to_xz(n.pos),
+            'radius': n.radius, 'roads': n.roads,
+            'signals': [{'name': name, 'phase': phase} for name, phase in n.signals],
+        } for n in nodes],
+        'edges': [{
+            'id': e.id, 'road': e.road.name, 'from': e.a.id, 'to': e.b.id,
+            'length': round(e.length, 3), 'width': e.road.width,
+            'lanes': [city.lanes_per_direction(e.road.width)] * 2,
+            'speedKmh': e.road.speed,
+            'signs': [{'name': name, 'kind': kind} for name, kind in e.signs],
+        } for e in edges],
+    }
+    graph['index'] = build_index(graph, cell)
+    return graph
+
+# ── Grid Index ───────────────────────────────────────────────────────────────
+#
+#  The network's bounding square is cut into `cell`-metre cells. Each cell
+#  lists, in compressed-row form ({kind}Start[c] .. {kind}Start[c + 1] into
+#  {kind}Ids), the edges whose carriageway overlaps it and the nodes that can
+#  be nearest to some point inside it. A node can only be nearest within a
+#  cell if it lies no further from the cell centre than the closest node plus
+#  one cell diagonal, so the candidate lists stay short and the answer exact.
+
+def _edge_ends(graph, edge):
+    nodes = graph['nodes']
+    return nodes[edge['from']]['pos'], nodes[edge['to']]['pos']
+
+def build_index(graph, cell=20.0):
+    boxes = []
+    for edge in graph['edges']:
+        (ax, az), (bx, bz) = _edge_ends(graph, edge)
+        half = edge['width'] / 2
+        boxes.append((min(ax, bx) - half, min(az, bz) - half,
+                      max(ax, bx) + half, max(az, bz) + half))
+    x0 = math.floor(min(b[0] for b in boxes) / cell) * cell
+    z0 = math.floor(min(b[1] for b in boxes) / cell) * cell
+    cols = int(math.ceil((max(b[2] for b in boxes) - x0) / cell))
+    rows = int(math.ceil((max(b[3] for b in boxes) - z0) / cell))
+
+    edge_cells = [[] for _ in range(cols * rows)]
+    for edge, (bx0, bz0, bx1, bz1) in zip(graph['edges'], boxes):
+        for r in range(int((bz0 - z0) // cell), min(rows, int((bz1 - z0) // cell) + 1)):
+            for c in range(int((bx0 - x0) // cell), min(cols, int((bx1 - x0) // cell) + 1)):
+                edge_cells[r * cols + c].append(edge['id'])
+
+    node_cells = []
+    for r in range(rows):
+        for c in range(cols):
+            centre = (x0 + (c + 0.5) * cell, z0 + (r + 0.5) * cell)
+            dist = [(math.dist(centre, n['pos']), n['id']) for n in graph['nodes']]
+            limit = min(dist)[0] + cell * math.sqrt(2)
+            node_cells.append(sorted(i for d, i in dist if d <= limit))
+
+    def packed(cells):
+        starts, ids = [0], []
+        for items in cells:
+            ids += items
+            starts.append(len(ids))
+        return starts, ids
+
+    edge_start, edge_ids = packed(edge_cells)
+    node_start, node_ids = packed(node_cells)
+    return {'origin': [x0, z0], 'cell': cell, 'cols': cols, 'rows': rows,
+            'edgeStart': edge_start, 'edgeIds': edge_ids,
+            'nodeStart': node_start, 'nodeIds': node_ids}
+
+class RoadIndex:
+    """
+    Lookups over an exported road graph — the reference for the JS client,
+    which does the same arithmetic on the same arrays.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.index = graph['index']
+
+    def _cell(self, x, z):
+        idx = self.index
+        c = min(max(int((x - idx['origin'][0]) // idx['cell']), 0), idx['cols'] - 1)
+        r = min(max(int((z - idx['origin'][1]) // idx['cell']), 0), idx['rows'] - 1)
+        return r * idx['cols'] + c
+
+    def locate(self, x, z):
+        """
+        Lane under (x, z): {'edge', 'direction', 'lane', 'along'} or None off
+        road. 'forward' runs from the edge's `from` node to its `to` node;
+        lane 0 is the one next to the centre line.
+        """
+        idx, cell = self.index, self._cell(x, z)
+        best = None
+        for eid in idx['edgeIds'][idx['edgeStart'][cell]:idx['edgeStart'][cell + 1]]:
+            edge = self.graph['edges'][eid]
+            (ax, az), (bx, bz) = _edge_ends(self.graph, edge)
+            dx, dz = bx - ax, bz - az
+            length = math.hypot(dx, dz)
+            along = ((x - ax) * dx + (z - az) * dz) / length
+            # Left of travel in a Y-up frame is up x direction = (dz, -dx)
+            offset = ((x - ax) * dz - (z - az) * dx) / length
+            if not (0 <= along <= length and abs(offset) <= edge['width'] / 2):
+                continue
+            if best is None or abs(offset) < best[0]:
+                forward = offset >= 0
+                lanes = edge['lanes'][0 if forward else 1]
+                lane = min(lanes - 1, int(abs(offset) / (edge['width'] / 2 / lanes)))
+                best = (abs(offset), {'edge': eid, 'direction': 'forward' if forward
+                                      else 'backward', 'lane': lane,
+                                      'along': round(along, 3)})
+        return best and best[1]
+
+    def nearest_node(self, x, z):
+        """Id of the node closest to (x, z) (exact inside the indexed area)."""
+        idx, cell = self.index, self._cell(x, z)
+        nodes = self.graph['nodes']
+        candidates = idx['nodeIds'][idx['nodeStart'][cell]:idx['nodeStart'][cell + 1]]
+        return min(candidates, key=lambda i: math.dist((x, z), nodes[i]['pos']))
+
+def benchmark(graph, queries=100_000):
+    """Time locate() and nearest_node() on random points; check against brute force."""
+    lookup = RoadIndex(graph)
+    rng = random.Random(0)
+    points = [(rng.uniform(-250, 250), rng.uniform(-250, 250)) for _ in range(queries)]
+    for label, fn in [('locate', lookup.locate), ('nearest_node', lookup.nearest_node)]:
+        t0 = time.perf_counter()
+        for x, z in points:
+            fn(x, z)
+        dt = time.perf_counter() - t0
+        print(f"  {label:<13} {dt / queries * 1e6:6.2f} µs/query")
+
+    nodes = graph['nodes']
+    wrong = sum(lookup.nearest_node(x, z) != min(
+        range(len(nodes)), key=lambda i: (math.dist((x, z), nodes[i]['pos']), i))
+        for x, z in points[:2000])
+    print(f"  nearest_node mismatches vs brute force: {wrong}/2000")
+
+# ── CLI ──────────────────────────────────────────────────────────────────────
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Export the Nairobi road graph as JSON.')
+    parser.add_argument('-o', '--output', default=DEFAULT_OUTPUT)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--cell', type=float, default=20.0,
+                        help='index cell size in metres (default 20)')
+    parser.add_argument('--query', type=float, nargs=2, metavar=('X', 'Z'),
+                        help='print lane and nearest junction at a glTF (x, z)')
+    parser.add_argument('--benchmark', action='store_true')
+    args = parser.parse_args(argv)
+
+    graph = road_graph(city.describe_city(args.seed, log=lambda msg: None), args.cell)
+    if args.query:
+        lookup = RoadIndex(graph)
+        node = graph['nodes'][lookup.nearest_node(*args.query)]
+        print(f"lane:    {lookup.locate(*args.query)}")
+        print(f"nearest: node {node['id']} ({node['kind']}, {', '.join(node['roads'])})")
+        return
+    if args.benchmark:
+        benchmark(graph)
+        return
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(graph, f, separators=(',', ':'))
+    print(f"Wrote {args.output}: {len(graph['nodes'])} nodes, {len(graph['edges'])} edges, "
+          f"{graph['index']['cols']}x{graph['index']['rows']} index cells")
+
+if __name__ == "__main__":
+    main()
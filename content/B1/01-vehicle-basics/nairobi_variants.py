@@ -0,0 +1,280 @@
+"""
+================================================================================
+  NAIROBI CITY MODEL — Variant Batch Builder
+  NTSA B1 Driving Simulator — every shipped asset in one command
+================================================================================
+  Builds a list of city variants (seed, density multipliers, lighting profile,
+  output files) side by side: each variant is one headless `blender -b`
+  process running nairobi_city_model.py, and up to --jobs of them (default
+  one per core) run at once. Every build writes its BuildReport and a log;
+  the reports are collected into reports/variants.json and the exit status
+  is non-zero if any variant failed or went over budget.
+
+  With --no-blender each variant's GLB is written by nairobi_glb.py in a
+  worker process instead: same geometry and densities, no Blender lighting,
+  and .blend outputs are skipped.
+
+  A variants file is a JSON list of objects with the keys of DEFAULT_VARIANTS:
+    [{"name": "nairobi_sparse", "seed": 7, "density": {"vegetation": 0.3},
+      "lighting": "dusk", "glb": "build/nairobi_sparse.glb"}]
+  Relative paths are resolved against --out.
+
+  USAGE:
+    python3 nairobi_variants.py                        # all shipped variants
+    python3 nairobi_variants.py -j 4 --only nairobi,nairobi_mobile
+    python3 nairobi_variants.py --variants mine.json   # your own list
+    python3 nairobi_variants.py --dry-run              # print the commands
+    python3 nairobi_variants.py --smoke                # one real headless build, checked
+    python3 nairobi_variants.py --no-blender           # GLBs via nairobi_glb.py
+    BLENDER=/opt/blender/blender python3 nairobi_variants.py
+
+  Requires: Python 3.8+, Blender 3.3+ (on PATH, $BLENDER or --blender)
+================================================================================
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+import nairobi_city_model as city
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SCRIPT = os.path.join(HERE, 'nairobi_city_model.py')
+
+# Everything the lessons ship. `glb` / `blend` are output paths (relative to
+# --out); the other keys are build_nairobi() options.
+DEFAULT_VARIANTS = [
+    {'name': 'nairobi', 'glb': 'lesson-01-town-simulation/nairobi.glb'},
+    {'name': 'nairobi_mobile', 'glb': 'lesson-01-town-simulation/nairobi_mobile.glb',
+     'batch_static': True,
+     'density': {'vegetation': 0.5, 'ground': 0.5, 'furniture': 0.5, 'vehicles': 0.5}},
+    {'name': 'nairobi_dusk', 'lighting': 'dusk', 'blend': 'renders/nairobi_dusk.blend'},
+    {'name': 'nairobi_night', 'lighting': 'night', 'blend': 'renders/nairobi_night.blend'},
+]
+
+# Built by --smoke: one full headless build that writes both kinds of output
+SMOKE_VARIANT = {'name': 'smoke', 'glb': 'smoke.glb', 'blend': 'smoke.blend'}
+
+VARIANT_KEYS = {'name', 'seed', 'density', 'lighting', 'batch_static', 'budgets',
+                'glb', 'blend'}
+
+def load_variants(path=None):
+    """DEFAULT_VARIANTS, or the list in a JSON file; checked for typos."""
+    if path is None:
+        return [dict(v) for v in DEFAULT_VARIANTS]
+    with open(path) as f:
+        variants = json.load(f)
+    names = set()
+    for v in variants:
+        unknown = set(v) - VARIANT_KEYS
+        if 'name' not in v or unknown:
+            raise ValueError(f"variant {v.get('name', '?')}: needs a name; "
+                             f"unknown keys {sorted(unknown)}")
+        if v['name'] in names:
+            raise ValueError(f"variant {v['name']} listed twice")
+        if v.get('lighting', 'day') not in city.LIGHTING_PROFILES:
+            raise ValueError(f"variant {v['name']}: no lighting profile {v['lighting']!r}")
+        names.add(v['name'])
+    return variants
+
+def _outputs(variant, out_dir):
+    return {key: os.path.join(out_dir, variant[key]) for key in ('glb', 'blend')
+            if variant.get(key)}
+
+def blender_command(variant, blender, out_dir, threads=0):
+    """The `blender -b` command line that builds one variant."""
+    outputs = _outputs(variant, out_dir)
+    cmd = [blender, '-b', '--factory-startup', '--python-exit-code', '1',
+           '-t', str(threads), '-P', SCRIPT, '--',
+           '--seed', str(variant.get('seed', 42)),
+           '--lighting', variant.get('lighting', 'day'),
+           '--report', os.path.join(out_dir, 'reports', f"{variant['name']}.json")]
+    for key, value in sorted(variant.get('density', {}).items()):
+        cmd += ['--density', f'{key}={value}']
+    if variant.get('batch_static'):
+        cmd.append('--batch-static')
+    if variant.get('budgets'):
+        cmd += ['--budgets', os.path.join(out_dir, variant['budgets'])]
+    if 'glb' in outputs:
+        cmd += ['--export', outputs['glb']]
+    if 'blend' in outputs:
+        cmd += ['--save', outputs['blend']]
+    return cmd
+
+# ── Workers ──────────────────────────────────────────────────────────────────
+#
+#  Both return the same record: name, status ('ok', 'failed' or 'skipped'),
+#  wall time, outputs and the variant's build report (or the tail of its log).
+
+def run_blender(variant, blender, out_dir, threads=0):
+    """Build one variant in its own Blender process (called from a thread)."""
+    report_path = os.path.join(out_dir, 'reports', f"{variant['name']}.json")
+    log_path = os.path.join(out_dir, 'reports', f"{variant['name']}.log")
+    t0 = time.perf_counter()
+    with open(log_path, 'w') as log:
+        code = subprocess.call(blender_command(variant, blender, out_dir, threads),
+                               stdout=log, stderr=subprocess.STDOUT,
+                               stdin=subprocess.DEVNULL)
+    record = {'name': variant['name'], 'status': 'ok' if code == 0 else 'failed',
+              'seconds': round(time.perf_counter() - t0, 3),
+              'outputs': sorted(_outputs(variant, out_dir).values()), 'log': log_path}
+    if os.path.exists(report_path):
+        with open(report_path) as f:
+            record['report'] = json.load(f)
+    if code != 0:
+        with open(log_path) as f:
+            record['error'] = ''.join(f.readlines()[-20:])
+    return record
+
+def run_python(variant, out_dir):
+    """Write one variant's GLB with nairobi_glb.py (called in a worker process)."""
+    import nairobi_glb
+
+    outputs = _outputs(variant, out_dir)
+    record = {'name': variant['name'], 'outputs': []}
+    if 'glb' not in outputs:
+        return {**record, 'status': 'skipped', 'seconds': 0.0,
+                'error': 'no glb output; .blend files need Blender'}
+    t0 = time.perf_counter()
+    seed, density = variant.get('seed', 42), variant.get('density')
+    report = city.BuildReport(seed)
+    city.describe_stages(seed, None, report, density)
+    try:
+        nairobi_glb.export_city(outputs['glb'], seed, batch=variant.get('batch_static', False),
+                                density=density)
+        city.apply_budgets(report, os.path.join(out_dir, variant['budgets'])
+                           if variant.get('budgets') else None)
+        record['status'] = 'ok'
+    except (OSError, city.BudgetError) as exc:
+        record['status'], record['error'] = 'failed', str(exc)
+    record['seconds'] = round(time.perf_counter() - t0, 3)
+    record['outputs'] = [outputs['glb']]
+    record['report'] = report.to_dict()
+    return record
+
+def smoke_test(blender, log=print):
+    """
+    Build SMOKE_VARIANT with the same `blender -b` command line as a real run,
+    in a temporary directory. Code that only works with Blender's UI open
+    fails here rather than in every variant. Returns 0 if Blender exited
+    cleanly and wrote the GLB, .blend and build report, else 1.
+    """
+    with tempfile.TemporaryDirectory() as out_dir:
+        os.makedirs(os.path.join(out_dir, 'reports'))
+        record = run_blender(SMOKE_VARIANT, blender, out_dir)
+        expected = record['outputs'] + [os.path.join(out_dir, 'reports', 'smoke.json')]
+        missing = [os.path.basename(path) for path in expected
+                   if not os.path.exists(path) or os.path.getsize(path) == 0]
+    if record['status'] == 'ok' and not missing:
+        log(f"  ok       headless build in {record['seconds']:.1f} s wrote "
+            f"{', '.join(os.path.basename(path) for path in expected)}")
+        return 0
+    log(f"  failed   headless build (exit {'ok' if record['status'] == 'ok' else 'non-zero'}"
+        f"{', missing ' + ', '.join(missing) if missing else ''})")
+    if record.get('error'):
+        log("    " + record['error'].strip().replace('\n', '\n    '))
+    return 1
+
+# ── Batch ────────────────────────────────────────────────────────────────────
+
+def build_variants(variants, out_dir=HERE, jobs=None, blender=None, log=print):
+    """
+    Build `variants` with up to `jobs` at a time (default one per core).
+    blender: executable to run; None writes GLBs in-process via nairobi_glb.
+    Returns the summary written to <out_dir>/reports/variants.json.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    for variant in variants:
+        for path in _outputs(variant, out_dir).values():
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+    os.makedirs(os.path.join(out_dir, 'reports'), exist_ok=True)
+
+    t0 = time.perf_counter()
+    if blender:
+        # Each worker thread just waits on its Blender process; share the
+        # cores between them so parallel renders don't oversubscribe.
+        threads = max(1, (os.cpu_count() or 1) // jobs)
+        pool = ThreadPoolExecutor(jobs)
+        futures = [pool.submit(run_blender, v, blender, out_dir, threads) for v in variants]
+    else:
+        pool = ProcessPoolExecutor(jobs)
+        futures = [pool.submit(run_python, v, out_dir) for v in variants]
+
+    records = {}
+    with pool:
+        for future in as_completed(futures):
+            record = future.result()
+            records[record['name']] = record
+            triangles = record.get('report', {}).get('totals', {}).get('triangles', 0)
+            log(f"  {record['status']:<8} {record['name']:<22} {record['seconds']:8.1f} s "
+                f"{triangles:>8} tris")
+            if record['status'] == 'failed':
+                log("    " + record.get('error', '').strip().replace('\n', '\n    '))
+
+    summary = {
+        'version': 1, 'jobs': jobs, 'engine': 'blender' if blender else 'python',
+        'seconds': round(time.perf_counter() - t0, 3),
+        'variants': [records[v['name']] for v in variants],
+    }
+    with open(os.path.join(out_dir, 'reports', 'variants.json'), 'w') as f:
+        json.dump(summary, f, indent=2)
+    return summary
+
+# ── CLI ──────────────────────────────────────────────────────────────────────
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build Nairobi city variants in parallel.')
+    parser.add_argument('--variants', metavar='JSON', help='variant list (default: shipped set)')
+    parser.add_argument('--only', metavar='NAMES', help='comma-separated variant names')
+    parser.add_argument('--out', default=HERE, help='base directory for outputs and reports')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='variants built at once (default: one per core)')
+    parser.add_argument('--blender', default=os.environ.get('BLENDER', 'blender'),
+                        help='Blender executable (default $BLENDER or blender)')
+    parser.add_argument('--no-blender', action='store_true',
+                        help='write GLBs with nairobi_glb.py instead of Blender')
+    parser.add_argument('--dry-run', action='store_true', help='print the Blender commands')
+    parser.add_argument('--smoke', action='store_true',
+                        help='run one real headless build in a temporary directory and '
+                             'check its outputs')
+    args = parser.parse_args(argv)
+
+    variants = load_variants(args.variants)
+    if args.only:
+        wanted = args.only.split(',')
+        missing = set(wanted) - {v['name'] for v in variants}
+        if missing:
+            parser.error(f"unknown variant(s): {', '.join(sorted(missing))}")
+        variants = [v for v in variants if v['name'] in wanted]
+
+    out_dir = os.path.abspath(args.out)
+    blender = None if args.no_blender else args.blender
+    if args.dry_run:
+        for variant in variants:
+            print(' '.join(blender_command(variant, blender or 'blender', out_dir)))
+        return
+    if blender and shutil.which(blender) is None:
+        parser.error(f"Blender not found at {blender!r}; set --blender or $BLENDER, "
+                     f"or use --no-blender")
+    if args.smoke:
+        if not blender:
+            parser.error("--smoke checks the Blender build; drop --no-blender")
+        sys.exit(smoke_test(blender))
+
+    summary = build_variants(variants, out_dir, args.jobs, blender)
+    built = sum(r['status'] == 'ok' for r in summary['variants'])
+    failed = [r['name'] for r in summary['variants'] if r['status'] == 'failed']
+    print(f"Built {built}/{len(variants)} variants in "
+          f"{summary['seconds']:.1f} s on {summary['jobs']} worker(s); "
+          f"summary in {os.path.join(out_dir, 'reports', 'variants.json')}")
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,51 +1,1072 @@
+import argparse
+import hashlib
+import io
+import json
+import logging
+import mmap
 import os
+import re
+import struct
+import sys
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+import pypdf  # pip install "pypdf>=6,<7" - see PYPDF_MAJOR
 from pypdf import PdfReader, PdfWriter
+from pypdf.errors import PyPdfError
+from pypdf.generic import (ArrayObject, ByteStringObject, ContentStream, DictionaryObject,
+                           IndirectObject, NameObject, NullObject, NumberObject, StreamObject,
+                           read_object)
 
-def split_and_merge_to_pdf(pdf_path, output_dir):
-    # Create the output directory if it doesn't exist
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
-
-    # Define page ranges based on the document's structure.
-    # Format: (Start Page, End Page) -> End page is where the NEXT chapter starts.
-    common_range = (10, 19) # Chapter 1: Common Core Units
-    
-    categories = {
-        "Category_A_Motorcycles": (19, 25),
-        "Category_B_Light_Vehicles": (25, 30),
-        "Category_B_Professional_PLV": (30, 45),
-        "Category_D_Public_Service_PSV": (45, 54),
-        "Category_A3_Motorcycle_Taxi": (54, 61),
-        "Category_C_Truck_Drivers": (61, 83),
-        "Category_E_Special_Professional": (83, 98),
-        "Category_G_Industrial_Agri_ICA": (98, 103)
-    }
+try:
+    import resource  # not on Windows; peak RSS is reported where it exists
+except ImportError:
+    resource = None
+
+try:
+    from PIL import Image  # optional: image downsampling (pypdf needs Pillow for it too)
+except ImportError:
+    Image = None
+
+try:
+    from fontTools import subset as font_subset  # optional: font subsetting
+    from fontTools.agl import toUnicode
+    from fontTools.ttLib import TTFont
+except ImportError:
+    font_subset = None
+
+# Define page ranges based on the document's structure.
+# Format: (Start Page, End Page) -> End page is where the NEXT chapter starts.
+COMMON_RANGE = (10, 19) # Chapter 1: Common Core Units
+
+CATEGORIES = {
+    "Category_A_Motorcycles": (19, 25),
+    "Category_B_Light_Vehicles": (25, 30),
+    "Category_B_Professional_PLV": (30, 45),
+    "Category_D_Public_Service_PSV": (45, 54),
+    "Category_A3_Motorcycle_Taxi": (54, 61),
+    "Category_C_Truck_Drivers": (61, 83),
+    "Category_E_Special_Professional": (83, 98),
+    "Category_G_Industrial_Agri_ICA": (98, 103)
+}
+
+# Never start more worker processes than this, however many cores there are
+MAX_WORKERS = 8
+
+# Output layouts:
+#   merged - one self-contained PDF per category (common core + category units)
+#   split  - the common core once, a category-only PDF per category and a
+#            manifest.json, so the app can cache the shared part
+#   both   - all of the above
+LAYOUTS = ("merged", "split", "both")
+COMMON_CORE_NAME = "Common_Core_Units"
+MANIFEST_NAME = "manifest.json"
+
+# Build cache kept next to the outputs (dotfiles are not synced to R2). An
+# output is rebuilt only when its key - source hash, page ranges, this
+# version and the pypdf version - changes or the file on disk was altered.
+# Bump CACHE_VERSION whenever a change here alters the bytes written.
+CACHE_NAME = ".split-cache.json"
+CACHE_VERSION = 1
+
+# Size profiles for --optimize. Every step is lossless except image
+# downsampling, which only touches images above image_dpi. Downsampling
+# needs Pillow and font subsetting needs fontTools; without them those
+# steps are skipped and the run says so.
+OPTIMIZE_PROFILES = {
+    "mobile": {
+        "content_level": 9,       # zlib level for page content streams
+        "image_dpi": 150,         # downsample images sharper than this...
+        "jpeg_quality": 75,       # ...and re-encode them as JPEG at this quality
+        "subset_fonts": True,     # keep only the glyphs the output shows
+        "object_streams": True,   # pack dictionaries into compressed object streams
+    },
+}
+OBJECT_STREAM_SIZE = 100  # objects per object stream
+
+# pypdf has no public way to set a writer's trailer /ID, so build_pdf sets
+# PdfWriter._ID, which its trailer is written from. That is checked against
+# this major version only; build_pdf refuses others rather than lose the /ID.
+PYPDF_MAJOR = 6
+
+# --linearize: the first object of a linearised file (its parameter
+# dictionary) must start within its first 1024 bytes
+FIRST_OBJECT = re.compile(rb"%PDF-\d\.\d[^\r\n]*[\r\n]+(?:%[^\r\n]*[\r\n]+)*(\d+)\s+0\s+obj\s*")
+OBJECT_AT = re.compile(rb"(\d+)\s+\d+\s+obj\b")  # an object header, "12 0 obj"
+
+# Readers opened by this process, one per source PDF. A worker keeps its
+# readers for every category it is handed instead of re-parsing the source.
+_readers = {}
+
+def open_source(pdf_path, stream=False):
+    """
+    Return this process's PdfReader for `pdf_path`, memory-mapping the file
+    once. A streaming reader reads through a plain file handle instead, as
+    every mapped page it touches would stay resident. Readers are kept per
+    process: a forked worker must not share its parent's file offset.
+    """
+    key = (pdf_path, stream, os.getpid())
+    if key not in _readers:
+        f = open(pdf_path, 'rb')
+        if not stream:
+            with f:
+                f = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        _readers[key] = PdfReader(f)
+    return _readers[key]
+
+def file_digest(path):
+    """sha256 hex digest of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def build_key(source_hash, page_ranges, **options):
+    """Cache key of one output PDF; also the seed of its document ID."""
+    inputs = {"version": CACHE_VERSION, "pypdf": pypdf.__version__,
+              "source": source_hash, "pages": [list(r) for r in page_ranges]}
+    inputs.update((name, value) for name, value in options.items() if value)
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode()).hexdigest()
+
+def load_cache(output_dir):
+    try:
+        with open(os.path.join(output_dir, CACHE_NAME)) as f:
+            cache = json.load(f)
+        return cache if cache.get("version") == CACHE_VERSION else {"files": {}}
+    except (OSError, ValueError):
+        return {"files": {}}
+
+def save_cache(output_dir, cache):
+    with open(os.path.join(output_dir, CACHE_NAME), 'w') as f:
+        json.dump(dict(cache, version=CACHE_VERSION), f, indent=2, sort_keys=True)
+
+def is_fresh(entry, path, key):
+    """True when `path` was built from `key` and hasn't been changed since."""
+    return (entry is not None and entry.get("key") == key and os.path.exists(path)
+            and file_digest(path) == entry.get("sha256"))
+
+def peak_rss_mib(who="self"):
+    """Peak resident set size of this process (or its finished children) in MiB, if known."""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF if who == "self" else resource.RUSAGE_CHILDREN)
+    # ru_maxrss is in KiB on Linux but in bytes on macOS
+    return usage.ru_maxrss / (1 << 20 if sys.platform == "darwin" else 1 << 10)
+
+def stream_pages(reader, page_numbers, out_file, doc_id=None, object_streams=False):
+    """
+    Write the given pages of `reader` as a complete PDF, page by page.
+
+    Each page and every object it reaches (contents, fonts, images) are
+    written as soon as they are found, with their stream data copied still
+    encoded, and the reader's object cache is dropped after every page. What
+    stays in memory is one page's objects plus an offset per object written,
+    however large the document. Objects shared by several pages are written
+    once, the first time a page needs them.
+
+    With `object_streams` every object that isn't a stream is packed,
+    OBJECT_STREAM_SIZE at a time, into compressed object streams, and the
+    cross-reference table becomes a compressed xref stream (PDF 1.5).
+    """
+    # Per object number: a byte offset, or (object stream, index) once packed.
+    # 0 is the free entry, 1 the catalog, 2 the page tree.
+    offsets = [None, None, None]
+    packed = []  # (number, serialised object) waiting for an object stream
+    source_pages = {page.indirect_reference.idnum for page in reader.pages}
+    page_ids = {}
+    for n in page_numbers:
+        page_ids[reader.pages[n].indirect_reference.idnum] = len(offsets)
+        offsets.append(None)
+    ids, pending = {}, []
+
+    def remap(obj):
+        """Copy of a direct object with its references renumbered for the output."""
+        if isinstance(obj, IndirectObject):
+            if obj.idnum in page_ids:
+                return IndirectObject(page_ids[obj.idnum], 0, None)
+            if obj.idnum in source_pages:
+                return NullObject()  # a link or annotation to a page left out
+            if obj.idnum not in ids:
+                ids[obj.idnum] = len(offsets)
+                offsets.append(None)
+                pending.append(obj)  # the reference, so its generation is kept
+            return IndirectObject(ids[obj.idnum], 0, None)
+        if isinstance(obj, DictionaryObject):
+            copy = DictionaryObject()
+            for key, value in dict.items(obj):
+                copy[key] = remap(value)
+            return copy
+        if isinstance(obj, ArrayObject):
+            return ArrayObject(remap(value) for value in list.__iter__(obj))
+        return obj
+
+    def emit(num, obj, data=None):
+        """Write object `num`, already renumbered, with `data` as its stream."""
+        if object_streams and data is None:
+            text = io.BytesIO()
+            obj.write_to_stream(text)
+            packed.append((num, text.getvalue()))
+            if len(packed) == OBJECT_STREAM_SIZE:
+                pack()
+            return
+        offsets[num] = out_file.tell()
+        out_file.write(b"%d 0 obj\n" % num)
+        obj.write_to_stream(out_file)
+        if data is not None:
+            out_file.write(b"\nstream\n")
+            out_file.write(data)
+            out_file.write(b"\nendstream")
+        out_file.write(b"\nendobj\n")
+
+    def pack():
+        """Write the objects waiting in `packed` as one object stream."""
+        stm = len(offsets)
+        offsets.append(None)
+        index, body = [], io.BytesIO()
+        for i, (num, text) in enumerate(packed):
+            index.append(b"%d %d" % (num, body.tell()))
+            body.write(text + b"\n")
+            offsets[num] = (stm, i)
+        first = b" ".join(index) + b"\n"
+        data = zlib.compress(first + body.getvalue(), 9)
+        packed.clear()
+        emit(stm, DictionaryObject({NameObject("/Type"): NameObject("/ObjStm"),
+                                    NameObject("/N"): NumberObject(len(index)),
+                                    NameObject("/First"): NumberObject(len(first)),
+                                    NameObject("/Filter"): NameObject("/FlateDecode"),
+                                    NameObject("/Length"): NumberObject(len(data))}), data)
+
+    def copy(num, obj):
+        """Write a source object as output object `num`."""
+        if not isinstance(obj, StreamObject):
+            return emit(num, remap(obj))
+        # _data is the stream as stored (still filtered); the length is
+        # written direct so an indirect /Length isn't copied as well
+        head = remap(DictionaryObject({k: v for k, v in dict.items(obj) if k != "/Length"}))
+        head[NameObject("/Length")] = NumberObject(len(obj._data))
+        emit(num, head, obj._data)
+
+    header = reader.pdf_header
+    if object_streams and header < "%PDF-1.5":
+        header = "%PDF-1.5"
+    out_file.write(header.encode() + b"\n%\xe2\xe3\xcf\xd3\n")
+    for n in page_numbers:
+        page = reader.pages[n]
+        head = remap(DictionaryObject({k: v for k, v in dict.items(page) if k != "/Parent"}))
+        head[NameObject("/Parent")] = IndirectObject(2, 0, None)
+        emit(page_ids[page.indirect_reference.idnum], head)
+        while pending:
+            ref = pending.pop()
+            copy(ids[ref.idnum], ref.get_object())
+        reader.resolved_objects.clear()  # pypdf's cache of parsed objects
+
+    kids = ArrayObject(IndirectObject(num, 0, None) for num in page_ids.values())
+    emit(2, DictionaryObject({NameObject("/Type"): NameObject("/Pages"),
+                              NameObject("/Kids"): kids,
+                              NameObject("/Count"): NumberObject(len(kids))}))
+    emit(1, DictionaryObject({NameObject("/Type"): NameObject("/Catalog"),
+                              NameObject("/Pages"): IndirectObject(2, 0, None)}))
+
+    trailer = DictionaryObject({NameObject("/Root"): IndirectObject(1, 0, None)})
+    if doc_id:
+        trailer[NameObject("/ID")] = ArrayObject(
+            [ByteStringObject(bytes.fromhex(doc_id[:32]))] * 2)
+    if object_streams:
+        if packed:
+            pack()
+        # The xref stream is an object too: type 1 rows hold (offset, 0),
+        # type 2 rows (object stream, index), the free head (0, 65535)
+        num, xref = len(offsets), out_file.tell()
+        offsets.append(xref)
+        rows = [struct.pack(">BIH", 0, 0, 65535)] + [
+            struct.pack(">BIH", 2, *entry) if isinstance(entry, tuple)
+            else struct.pack(">BIH", 1, entry, 0) for entry in offsets[1:]]
+        data = zlib.compress(b"".join(rows), 9)
+        trailer.update({NameObject("/Type"): NameObject("/XRef"),
+                        NameObject("/Size"): NumberObject(len(offsets)),
+                        NameObject("/W"): ArrayObject(NumberObject(w) for w in (1, 4, 2)),
+                        NameObject("/Filter"): NameObject("/FlateDecode"),
+                        NameObject("/Length"): NumberObject(len(data))})
+        emit(num, trailer, data)
+    else:
+        xref = out_file.tell()
+        out_file.write(b"xref\n0 %d\n0000000000 65535 f \n" % len(offsets))
+        out_file.write(b"".join(b"%010d 00000 n \n" % offset for offset in offsets[1:]))
+        trailer[NameObject("/Size")] = NumberObject(len(offsets))
+        out_file.write(b"trailer\n")
+        trailer.write_to_stream(out_file)
+    out_file.write(b"\nstartxref\n%d\n%%%%EOF\n" % xref)
+
+def pack_bits(values, width):
+    """`values` as consecutive `width`-bit big-endian fields, zero-padded to whole bytes."""
+    number = 0
+    for value in values:
+        if not 0 <= value < 1 << width:
+            raise ValueError(f"{value} doesn't fit in {width} bits")
+        number = number << width | value
+    size = (len(values) * width + 7) // 8
+    return (number << (size * 8 - len(values) * width)).to_bytes(size, "big")
+
+def unpack_bits(data, offset, count, width):
+    """Read what pack_bits wrote at byte `offset`: (values, offset of the next byte)."""
+    size = (count * width + 7) // 8
+    if offset + size > len(data):
+        raise ValueError("hint table is truncated")
+    number = int.from_bytes(data[offset:offset + size], "big") >> (size * 8 - count * width)
+    mask = (1 << width) - 1
+    return [number >> (width * (count - 1 - i)) & mask for i in range(count)], offset + size
+
+def page_objects(reader, refs=None):
+    """
+    Per page of `reader`, the numbers of the objects drawing it needs, page
+    object first and the rest in the order they are reached. The page tree
+    (/Parent) and other pages are not followed. `refs`, if given, is filled
+    with the reference (number and generation) each number was reached by.
+    """
+    page_ids = {page.indirect_reference.idnum for page in reader.pages}
+    needed = []
+    for page in reader.pages:
+        found = {page.indirect_reference.idnum: None}  # a dict keeps the order found
+        stack = [value for key, value in reversed(dict.items(page)) if key != "/Parent"]
+        while stack:
+            obj = stack.pop()
+            if isinstance(obj, IndirectObject):
+                if obj.idnum in found or obj.idnum in page_ids:
+                    continue
+                target = obj.get_object()
+                if isinstance(target, DictionaryObject) and target.get("/Type") == "/Page":
+                    continue  # a link or annotation to a page outside the tree
+                found[obj.idnum] = None
+                if refs is not None:
+                    refs[obj.idnum] = obj
+                obj = target
+            if isinstance(obj, DictionaryObject):
+                # a stream's /Length is written direct, so isn't needed
+                stack.extend(value for key, value in reversed(dict.items(obj))
+                             if not (key == "/Length" and isinstance(obj, StreamObject)))
+            elif isinstance(obj, ArrayObject):
+                stack.extend(reversed(list(list.__iter__(obj))))
+        needed.append(list(found))
+    return needed
+
+def linearize_pages(reader, out_file, doc_id=None):
+    """
+    Write the document in `reader` as a linearised ("fast web view") PDF, as
+    laid out in annex F of the PDF 1.7 specification.
+
+    The linearization dictionary, a cross-reference section for the first
+    page, the catalog, the hint stream and every object the first page needs
+    come first, so a viewer fetching by byte ranges can draw page 1 from the
+    first /E bytes. The other pages follow in order, each with the objects
+    only it uses, then the objects shared between pages; the hint tables tell
+    the viewer where each page's objects are. A classic cross-reference table
+    is written, so object streams aren't used.
+    """
+    pages = {page.indirect_reference.idnum: page for page in reader.pages}
+    refs = {}
+    needed = page_objects(reader, refs)
+    users = {}  # object -> the pages that need it
+    for i, objects in enumerate(needed):
+        for idnum in objects:
+            users.setdefault(idnum, set()).add(i)
+    first = needed[0]
+    sections = [[objects[0]] + [idnum for idnum in objects[1:] if users[idnum] == {i}]
+                for i, objects in enumerate(needed[1:], 1)]
+    shared = [idnum for idnum, used_by in users.items() if len(used_by) > 1 and 0 not in used_by]
+
+    # The main section (later pages, shared objects, page tree) is numbered
+    # from 1 and the first-page section after it, each in file order, as the
+    # hint tables refer to runs of consecutive object numbers
+    order = [idnum for section in sections for idnum in section] + shared
+    numbers = {idnum: num for num, idnum in enumerate(order, 1)}
+    pages_num = len(order) + 1
+    lin_num, catalog_num, hint_num = pages_num + 1, pages_num + 2, pages_num + 3
+    numbers.update((idnum, num) for num, idnum in enumerate(first, hint_num + 1))
+    size = hint_num + 1 + len(first)
+
+    def renumber(obj):
+        if isinstance(obj, IndirectObject):
+            return IndirectObject(numbers[obj.idnum], 0, None) if obj.idnum in numbers else NullObject()
+        if isinstance(obj, DictionaryObject):
+            return DictionaryObject({key: renumber(value) for key, value in dict.items(obj)})
+        if isinstance(obj, ArrayObject):
+            return ArrayObject(renumber(value) for value in list.__iter__(obj))
+        return obj
+
+    def serialise(num, obj, data=None):
+        text = io.BytesIO()
+        text.write(b"%d 0 obj\n" % num)
+        obj.write_to_stream(text)
+        if data is not None:
+            text.write(b"\nstream\n" + data + b"\nendstream")
+        text.write(b"\nendobj\n")
+        return text.getvalue()
+
+    def copy(idnum):
+        obj = pages.get(idnum) or refs[idnum].get_object()
+        if not isinstance(obj, DictionaryObject):
+            return serialise(numbers[idnum], renumber(obj))
+        # as in stream_pages, stream data is copied still encoded with a direct /Length
+        skip = "/Parent" if idnum in pages else "/Length" if isinstance(obj, StreamObject) else None
+        head = renumber(DictionaryObject({k: v for k, v in dict.items(obj) if k != skip}))
+        if idnum in pages:
+            head[NameObject("/Parent")] = IndirectObject(pages_num, 0, None)
+        if not isinstance(obj, StreamObject):
+            return serialise(numbers[idnum], head)
+        head[NameObject("/Length")] = NumberObject(len(obj._data))
+        return serialise(numbers[idnum], head, obj._data)
+
+    catalog = serialise(catalog_num, DictionaryObject({
+        NameObject("/Type"): NameObject("/Catalog"),
+        NameObject("/Pages"): IndirectObject(pages_num, 0, None)}))
+    first_objs = [copy(idnum) for idnum in first]
+    page_sections = [[copy(idnum) for idnum in section] for section in sections]
+    shared_objs = [copy(idnum) for idnum in shared]
+    kids = ArrayObject(IndirectObject(numbers[idnum], 0, None) for idnum in pages)
+    page_tree = serialise(pages_num, DictionaryObject({NameObject("/Type"): NameObject("/Pages"),
+                                                       NameObject("/Kids"): kids,
+                                                       NameObject("/Count"): NumberObject(len(kids))}))
+
+    # Values only known once everything is placed are written fixed-width,
+    # so filling them in moves nothing
+    def lin_dict(length=0, hint=(0, 0), end=0, main=0):
+        return (b"%d 0 obj\n<< /Linearized 1 /L %10d /H [ %10d %10d ] /O %d /E %10d /N %d "
+                b"/T %10d >>\nendobj\n" % (lin_num, length, *hint, numbers[first[0]], end,
+                                          len(needed), main))
+
+    def first_xref(offsets=(0,) * (size - lin_num), prev=0):
+        doc = b" /ID [<%s> <%s>]" % ((doc_id[:32].encode(),) * 2) if doc_id else b""
+        return (b"xref\n%d %d\n" % (lin_num, size - lin_num)
+                + b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+                + b"trailer\n<< /Size %d /Root %d 0 R /Prev %10d%s >>\nstartxref\n0\n%%%%EOF\n"
+                % (size, catalog_num, prev, doc))
+
+    header = reader.pdf_header.encode() + b"\n%\xe2\xe3\xcf\xd3\n"
+    xref_at = len(header) + len(lin_dict())
+    catalog_at = xref_at + len(first_xref())
+    hint_at = catalog_at + len(catalog)
+
+    # Offsets in the hint tables are counted as if the hint stream weren't there
+    body = ([(numbers[idnum], chunk) for idnum, chunk in zip(first, first_objs)]
+            + [(numbers[idnum], chunk) for section, chunks in zip(sections, page_sections)
+               for idnum, chunk in zip(section, chunks)]
+            + [(numbers[idnum], chunk) for idnum, chunk in zip(shared, shared_objs)]
+            + [(pages_num, page_tree)])
+    offsets, pos = {}, hint_at
+    for num, chunk in body:
+        offsets[num] = pos
+        pos += len(chunk)
+
+    # Page offset hint table (F.4.1). Like Acrobat (implementation note 127),
+    # content stream offsets are left at 0 and their lengths are the page's.
+    counts = [len(first)] + [len(section) for section in sections]
+    lengths = [sum(map(len, first_objs))] + [sum(map(len, chunks)) for chunks in page_sections]
+    index = {idnum: i for i, idnum in enumerate(first + shared)}  # shared object identifiers
+    refs = [[]] + [[index[idnum] for idnum in objects if idnum in index] for objects in needed[1:]]
+    least_count, least_length = min(counts), min(lengths)
+    count_bits = (max(counts) - least_count).bit_length()
+    length_bits = (max(lengths) - least_length).bit_length()
+    ref_bits = max(map(len, refs)).bit_length()
+    id_bits = max((i for ids in refs for i in ids), default=0).bit_length()
+    length_deltas = [length - least_length for length in lengths]
+    page_table = (struct.pack(">IIHIHIHIHHHHH", least_count, hint_at, count_bits, least_length,
+                              length_bits, 0, 0, least_length, length_bits, ref_bits, id_bits, 0, 1)
+                  + pack_bits([count - least_count for count in counts], count_bits)
+                  + pack_bits(length_deltas, length_bits)
+                  + pack_bits(list(map(len, refs)), ref_bits)
+                  + pack_bits([i for ids in refs for i in ids], id_bits)
+                  + pack_bits(length_deltas, length_bits))  # (0-bit numerators and offsets)
+
+    # Shared object hint table (F.4.2): the first page's objects, then the
+    # shared section, one object per group and no MD5 signatures
+    groups = list(map(len, first_objs + shared_objs))
+    least_group = min(groups)
+    group_bits = (max(groups) - least_group).bit_length()
+    first_shared = numbers[shared[0]] if shared else 0
+    shared_table = (struct.pack(">IIIIHIH", first_shared, offsets.get(first_shared, 0),
+                                len(first), len(groups), 0, least_group, group_bits)
+                    + pack_bits([group - least_group for group in groups], group_bits)
+                    + pack_bits([0] * len(groups), 1))
 
+    data = zlib.compress(page_table + shared_table, 9)
+    hint = serialise(hint_num, DictionaryObject({NameObject("/S"): NumberObject(len(page_table)),
+                                                 NameObject("/Filter"): NameObject("/FlateDecode"),
+                                                 NameObject("/Length"): NumberObject(len(data))}),
+                     data)
+    main_at = pos + len(hint)
+    main_xref = (b"xref\n0 %d\n0000000000 65535 f \n" % (pages_num + 1)
+                 + b"".join(b"%010d 00000 n \n" % (offsets[num] + len(hint))
+                            for num in range(1, pages_num + 1))
+                 + b"trailer\n<< /Size %d >>\nstartxref\n%d\n%%%%EOF\n" % (pages_num + 1, xref_at))
+    first_offsets = [len(header), catalog_at, hint_at] + [offsets[numbers[idnum]] + len(hint)
+                                                          for idnum in first]
+
+    out_file.write(header)
+    out_file.write(lin_dict(main_at + len(main_xref), (hint_at, len(hint)),
+                            hint_at + len(hint) + lengths[0],
+                            main_at + len(b"xref\n0 %d" % (pages_num + 1))))
+    out_file.write(first_xref(first_offsets, main_at))
+    out_file.write(catalog)
+    out_file.write(hint)
+    for num, chunk in body:
+        out_file.write(chunk)
+    out_file.write(main_xref)
+
+def linearization_params(data):
+    """(object number, parameter dictionary) opening the PDF bytes `data`, or None."""
+    match = FIRST_OBJECT.match(data, 0, 1024)
+    if not match:
+        return None
+    try:
+        params = read_object(io.BytesIO(data[match.end():1024]), None)
+    except (PyPdfError, ValueError):
+        return None
+    if not isinstance(params, DictionaryObject) or "/Linearized" not in params:
+        return None
+    return int(match.group(1)), params
+
+def check_linearization(path):
+    """
+    Check that `path` is a valid linearised PDF: its linearization dictionary
+    matches the file, the catalog and everything the first page needs lie
+    within the first /E bytes, the cross-reference sections are chained as
+    annex F requires, and the hint tables say where every page's objects
+    really are. Returns the problems found; an empty list means it is valid.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    found = linearization_params(data)
+    if found is None:
+        return ["no linearization dictionary in the first 1024 bytes"]
+    lin_num, lin = found
+    problems = []
+
+    def skip_space(pos):
+        while pos < len(data) and data[pos] in b" \t\r\n\f\0":
+            pos += 1
+        return pos
+
+    # A linearised file's first cross-reference section starts after object 0,
+    # which pypdf's strict mode warns about as if it were a mistake
+    logger = logging.getLogger("pypdf._reader")
+    expected = lambda record: "not zero-indexed" not in record.getMessage()
     try:
-        reader = PdfReader(pdf_path)
-        total_pages = len(reader.pages)
-        print(f"Loaded '{pdf_path}' with {total_pages} pages.\n")
+        logger.addFilter(expected)
+        try:
+            reader = PdfReader(io.BytesIO(data), strict=True)
+        finally:
+            logger.removeFilter(expected)
+        if reader.xref_objStm:
+            return ["uses object streams; only cross-reference tables can be checked"]
+        xref = {idnum: offset for table in reader.xref.values() for idnum, offset in table.items()}
+        for idnum, offset in sorted(xref.items()):
+            match = OBJECT_AT.match(data, offset)
+            if not match or int(match.group(1)) != idnum:
+                problems.append(f"cross-reference entry for object {idnum} doesn't point at it")
+        length, (hint_at, hint_length) = lin["/L"], lin["/H"][:2]
+        first_page = reader.pages[0].indirect_reference.idnum
+        if length != len(data):
+            problems.append(f"/L is {length} but the file is {len(data)} bytes")
+        if lin["/N"] != len(reader.pages):
+            problems.append(f"/N is {lin['/N']} but there are {len(reader.pages)} pages")
+        if lin["/O"] != first_page:
+            problems.append(f"/O is {lin['/O']} but the first page is object {first_page}")
+
+        # startxref -> first-page section just after the dictionary -> /Prev -> main section
+        first_xref = skip_space(data.index(b"endobj", xref[lin_num]) + 6)
+        startxref = int(data[data.rindex(b"startxref"):].split()[1])
+        if startxref != first_xref or not data.startswith(b"xref", first_xref):
+            problems.append("startxref doesn't point at a cross-reference table after "
+                            "the linearization dictionary")
+        trailer = data[first_xref:data.index(b"startxref", first_xref)]
+        prev = re.search(rb"/Prev\s+(\d+)", trailer)
+        main = prev and re.compile(rb"xref\s+0\s+\d+").match(data, int(prev.group(1)))
+        if not main:
+            return problems + ["first-page trailer has no /Prev to a main table for object 0"]
+        if skip_space(lin["/T"]) != skip_space(main.end()):
+            problems.append(f"/T is {lin['/T']} but the main table's first entry is at "
+                            f"{skip_space(main.end())}")
+
+        # An object runs up to whatever starts next: another object or a table
+        starts = sorted(set(xref.values()) | {first_xref, main.start(), len(data)})
+        ends = dict(zip(starts, starts[1:]))
+
+        def span(num, count=1):
+            return sum(ends[xref[n]] - xref[n] for n in range(num, num + count))
+
+        match = OBJECT_AT.match(data, hint_at)
+        hint_num = match and int(match.group(1))
+        if hint_num not in xref or span(hint_num) != hint_length:
+            return problems + [f"/H [{hint_at} {hint_length}] isn't the hint stream"]
+
+        def adjusted(offset):
+            """A hint table offset as a file offset: they don't count the hint stream."""
+            return offset + hint_length if offset >= hint_at else offset
+
+        hint = reader.get_object(hint_num)
+        tables = hint.get_data()
+        (least_count, page_at, count_bits, least_length, length_bits, _, _, _, _,
+         ref_bits, id_bits, _, _) = struct.unpack_from(">IIHIHIHIHHHHH", tables, 0)
+        pos = struct.calcsize(">IIHIHIHIHHHHH")
+        counts, pos = unpack_bits(tables, pos, len(reader.pages), count_bits)
+        lengths, pos = unpack_bits(tables, pos, len(reader.pages), length_bits)
+        nrefs, pos = unpack_bits(tables, pos, len(reader.pages), ref_bits)
+        ids, pos = unpack_bits(tables, pos, sum(nrefs), id_bits)
+
+        (first_shared, shared_at, first_groups, total_groups, objects_bits, least_group,
+         group_bits) = struct.unpack_from(">IIIIHIH", tables, hint["/S"])
+        pos = hint["/S"] + struct.calcsize(">IIIIHIH")
+        groups, pos = unpack_bits(tables, pos, total_groups, group_bits)
+        signed, pos = unpack_bits(tables, pos, total_groups, 1)
+        pos += 16 * sum(signed)
+        group_sizes, pos = unpack_bits(tables, pos, total_groups, objects_bits)
+
+        # Shared object groups: the first page's objects from its page object
+        # on, then the shared section from first_shared on
+        group_objects, num = [], first_page
+        for i in range(total_groups):
+            if i == first_groups:
+                num = first_shared
+                if xref.get(num) != adjusted(shared_at):
+                    problems.append("shared section offset in the hint stream is wrong")
+            count = group_sizes[i] + 1
+            if span(num, count) != least_group + groups[i]:
+                problems.append(f"shared object group {i} length in the hint stream is wrong")
+            group_objects.append(range(num, num + count))
+            num += count
+
+        needed = page_objects(reader)
+        offset = adjusted(page_at)
+        for i, page in enumerate(reader.pages):
+            num = page.indirect_reference.idnum
+            if xref[num] != offset:
+                problems.append(f"page {i + 1} is at {xref[num]}; the hint stream says {offset}")
+            count, page_length = least_count + counts[i], least_length + lengths[i]
+            if span(num, count) != page_length:
+                problems.append(f"page {i + 1} length in the hint stream is wrong")
+            offset = xref[num] + page_length
+            listed = set(range(num, num + count))
+            start = sum(nrefs[:i])
+            for j in ids[start:start + nrefs[i]]:
+                listed.update(group_objects[j])
+            missing = [idnum for idnum in needed[i] if idnum not in listed]
+            if missing:
+                problems.append(f"page {i + 1} needs objects the hint stream doesn't list: {missing[:5]}")
+        if nrefs[0]:
+            problems.append("the first page has shared object entries")
+
+        end = xref[first_page] + least_length + lengths[0]
+        if lin["/E"] != end:
+            problems.append(f"/E is {lin['/E']} but the first page section ends at {end}")
+        catalog = reader.trailer.raw_get("/Root").idnum
+        if xref[catalog] + span(catalog) > lin["/E"]:
+            problems.append("the catalog lies after the first page section")
+    except (LookupError, ValueError, TypeError, struct.error, PyPdfError) as e:
+        problems.append(f"unreadable: {e}")
+    return problems
+
+def shown_strings(content, resources, pdf, fonts, seen, current=None):
+    """
+    Collect into fonts[font id] = (font, set of strings) the strings that
+    `content` shows, following forms and tiling patterns it draws. `current`
+    is the font reference in effect when the content starts.
+    """
+    resources = resources.get_object() if resources is not None else DictionaryObject()
+    font_refs = resources.get("/Font", DictionaryObject()).get_object()
+    saved = []  # the font is part of the graphics state that q / Q save and restore
+    # "bytes" keeps every string as the raw codes pypdf would otherwise decode
+    for operands, operator in ContentStream(content, pdf, "bytes").operations:
+        if operator == b"q":
+            saved.append(current)
+        elif operator == b"Q" and saved:
+            current = saved.pop()
+        elif operator == b"Tf":
+            ref = font_refs.raw_get(operands[0]) if operands[0] in font_refs else None
+            current = ref if isinstance(ref, IndirectObject) else None
+            if current is not None and current.idnum not in fonts:
+                fonts[current.idnum] = (current.get_object(), set())
+        elif operator in (b"Tj", b"'", b'"', b"TJ") and current is not None:
+            shown = operands[-1] if operator != b"TJ" else [
+                item for item in operands[0] if not isinstance(item, (int, float))]
+            strings = fonts[current.idnum][1]
+            for string in (shown if operator == b"TJ" else [shown]):
+                strings.add(bytes(string))
+
+    # Forms and patterns may carry text of their own
+    children = list(resources.get("/XObject", DictionaryObject()).get_object().values())
+    children += list(resources.get("/Pattern", DictionaryObject()).get_object().values())
+    for child in children:
+        ref = child
+        child = child.get_object()
+        if not isinstance(child, StreamObject) or child.get("/Subtype") == "/Image":
+            continue
+        key = ref.idnum if isinstance(ref, IndirectObject) else id(child)
+        if key not in seen:
+            seen.add(key)
+            shown_strings(child, child.get("/Resources", resources), pdf, fonts, seen, current)
+
+def _simple_font_glyphs(tt, font, codes):
+    """Every glyph a viewer might pick for one-byte `codes` of a simple TrueType font."""
+    differences, encoding = {}, font.get("/Encoding")
+    codec = "mac_roman" if encoding == "/MacRomanEncoding" else "cp1252"
+    if isinstance(encoding, DictionaryObject):
+        codec = "mac_roman" if encoding.get("/BaseEncoding") == "/MacRomanEncoding" else codec
+        code = 0
+        for item in encoding.get("/Differences", []):
+            if isinstance(item, int):
+                code = item
+            else:
+                differences[code] = item[1:]
+                code += 1
+    order = set(tt.getGlyphOrder())
+    names = {differences[code] for code in codes if differences.get(code) in order}
+    for table in tt["cmap"].tables:
+        for code in codes:
+            # (3,0) symbol tables put codes at U+F000.., (1,0) uses them as-is
+            keys = {code, 0xF000 | code, 0xF100 | code, 0xF200 | code}
+            if table.isUnicode():
+                char = (toUnicode(differences[code]) if code in differences
+                        else bytes([code]).decode(codec, errors="ignore"))
+                keys.update(ord(c) for c in char)
+            names.update(table.cmap[key] for key in keys if key in table.cmap)
+    return {tt.getGlyphID(name) for name in names}
+
+def subset_fonts(pages, pdf):
+    """
+    Cut every embedded TrueType font (FontFile2) down to the glyphs `pages`
+    show. Glyph ids are kept, so page content and widths stay valid. Only
+    simple TrueType and Identity-H CIDFontType2 fonts are understood; a font
+    file also used through anything else is left whole. Returns bytes saved.
+    """
+    fonts, seen = {}, set()
+    for page in pages:
+        if "/Contents" in page:
+            shown_strings(page["/Contents"], page.get("/Resources"), pdf, fonts, seen)
+        for annot in page.get("/Annots", []):
+            appearance = annot.get_object().get("/AP", DictionaryObject()).get("/N")
+            streams = [appearance] if isinstance(appearance, StreamObject) else (
+                [v.get_object() for v in appearance.values()] if appearance else [])
+            for stream in streams:
+                shown_strings(stream, stream.get("/Resources"), pdf, fonts, seen)
+
+    files, blocked = {}, set()
+    for font, strings in fonts.values():
+        if font.get("/Subtype") == "/Type0":
+            descendant = font["/DescendantFonts"][0].get_object()
+            descriptor = descendant.get("/FontDescriptor", DictionaryObject()).get_object()
+        else:
+            descendant, descriptor = None, font.get("/FontDescriptor", DictionaryObject()).get_object()
+        ref = descriptor.raw_get("/FontFile2") if "/FontFile2" in descriptor else None
+        if not isinstance(ref, IndirectObject):
+            continue
+        entry = files.setdefault(ref.idnum, (ref.get_object(), set(), []))
+        if font.get("/Subtype") == "/TrueType":
+            entry[2].append((font, {b for s in strings for b in s}))
+        elif (font.get("/Subtype") == "/Type0" and font.get("/Encoding") == "/Identity-H"
+              and descendant.get("/Subtype") == "/CIDFontType2"):
+            cids = {int.from_bytes(s[i:i + 2], "big") for s in strings
+                    for i in range(0, len(s) - 1, 2)}
+            cid_map = descendant.get("/CIDToGIDMap", NameObject("/Identity"))
+            if isinstance(cid_map, StreamObject):
+                table = cid_map.get_data()
+                cids = {int.from_bytes(table[2 * c:2 * c + 2], "big") for c in cids
+                        if 2 * c + 2 <= len(table)}
+            entry[1].update(cids)
+        else:
+            blocked.add(ref.idnum)
+
+    saved = 0
+    for idnum, (stream, gids, simple) in files.items():
+        if idnum in blocked or stream.get("/Filter") not in (None, "/FlateDecode"):
+            continue
+        data = stream.get_data()
+        tt = TTFont(io.BytesIO(data), recalcTimestamp=False)
+        for font, codes in simple:
+            gids |= _simple_font_glyphs(tt, font, codes)
+        options = font_subset.Options()
+        options.retain_gids = True         # glyph ids are what the pages refer to
+        options.notdef_outline = True
+        options.glyph_names = True         # /Differences may name glyphs
+        options.legacy_cmap = options.symbol_cmap = True
+        options.layout_features = []       # PDFs place glyphs themselves
+        options.recalc_timestamp = False
+        subsetter = font_subset.Subsetter(options)
+        subsetter.populate(gids=sorted(gid for gid in gids | {0} if gid < len(tt.getGlyphOrder())))
+        subsetter.subset(tt)
+        out = io.BytesIO()
+        tt.save(out)
+        before = len(stream._data)
+        stream.set_data(out.getvalue())
+        if len(stream._data) < before:
+            stream[NameObject("/Length1")] = NumberObject(len(out.getvalue()))
+            saved += before - len(stream._data)
+        else:
+            stream.set_data(data)
+    return saved
+
+def downsample_images(page, dpi, quality):
+    """
+    Re-encode, as JPEG, images stored sharper than `dpi`. An image is judged
+    as if it filled the page, so the DPI it is drawn at is never below the
+    target. Masked, alpha and non-8-bit images are left alone.
+    """
+    width_in, height_in = float(page.mediabox.width) / 72, float(page.mediabox.height) / 72
+    for image in page.images:
+        obj = image.indirect_reference and image.indirect_reference.get_object()
+        if (obj is None or "/SMask" in obj or "/Mask" in obj or obj.get("/ImageMask")
+                or obj.get("/BitsPerComponent") != 8):
+            continue
+        width, height = obj["/Width"], obj["/Height"]
+        scale = dpi / min(width / width_in, height / height_in)
+        if scale >= 1:
+            continue
+        picture = image.image
+        if picture.mode not in ("RGB", "L"):
+            picture = picture.convert("RGB")
+        size = (max(1, round(width * scale)), max(1, round(height * scale)))
+        image.replace(picture.resize(size, Image.LANCZOS), quality=quality)
 
-        for category_name, (start, end) in categories.items():
-            print(f"Generating PDF for {category_name}...")
-            writer = PdfWriter()
+def optimize_writer(writer, profile):
+    """Apply an OPTIMIZE_PROFILES entry to `writer` (object streams are up to the caller)."""
+    if font_subset is not None and profile["subset_fonts"]:
+        subset_fonts(writer.pages, writer)
+    for page in writer.pages:
+        if Image is not None:
+            downsample_images(page, profile["image_dpi"], profile["jpeg_quality"])
+        page.compress_content_streams(level=profile["content_level"])
+    writer.compress_identical_objects(remove_duplicates=True, remove_unreferenced=True)
 
-            # 1. Add Common Core Units pages (Pages 10 to 18)
-            # We subtract 1 because Python uses 0-based indexing (Page 1 = Index 0)
-            for page_num in range(common_range[0] - 1, min(common_range[1] - 1, total_pages)):
-                writer.add_page(reader.pages[page_num])
+def optional_steps(profile):
+    """The profile's steps that can't run here for want of Pillow or fontTools."""
+    missing = [] if Image is not None else ["image downsampling (pip install pillow)"]
+    if font_subset is None and profile["subset_fonts"]:
+        missing.append("font subsetting (pip install fonttools)")
+    return missing
 
-            # 2. Add Specific Category Units pages
-            for page_num in range(start - 1, min(end - 1, total_pages)):
-                writer.add_page(reader.pages[page_num])
+def check_options(stream=False, optimize=None, linearize=False):
+    """Raise ValueError for options build_pdf can't combine."""
+    if stream and (optimize or linearize):
+        other = "optimize" if optimize else "linearize"
+        raise ValueError(f"stream can't be combined with {other}, which needs whole documents "
+                         "in memory")
 
-            # Save to a new PDF file
-            output_filepath = os.path.join(output_dir, f"{category_name}.pdf")
+def build_pdf(pdf_path, output_filepath, page_ranges, doc_id=None, stream=False, optimize=None,
+              linearize=False):
+    """
+    Write the (start, end) page ranges of `pdf_path` to one PDF. Returns (path,
+    pages, seconds, peak RSS of this process in MiB, bytes before optimising).
+
+    The output holds no timestamps, and `doc_id` (hex) becomes both halves of
+    its /ID, so the same inputs always give the same bytes. With `stream`
+    the pages are copied by stream_pages() instead of through a PdfWriter;
+    `optimize` names an OPTIMIZE_PROFILES entry. With `linearize` the file is
+    written by linearize_pages() and then checked, raising ValueError if the
+    check fails. `stream` can't be combined with either (see check_options).
+    """
+    check_options(stream, optimize, linearize)
+    started = time.perf_counter()
+    reader = open_source(pdf_path, stream)
+    total_pages = len(reader.pages)
+
+    # We subtract 1 because Python uses 0-based indexing (Page 1 = Index 0)
+    page_numbers = [page_num for start, end in page_ranges
+                    for page_num in range(start - 1, min(end - 1, total_pages))]
+
+    # Save to a new PDF file
+    plain = None
+    if stream:
+        if reader.is_encrypted:
+            raise ValueError(f"{pdf_path}: streaming needs an unencrypted source")
+        with open(output_filepath, 'wb') as out_file:
+            stream_pages(reader, page_numbers, out_file, doc_id)
+    else:
+        writer = PdfWriter()
+        if doc_id:
+            if int(pypdf.__version__.split(".")[0]) != PYPDF_MAJOR or "_ID" not in vars(writer):
+                raise RuntimeError(f"pypdf {pypdf.__version__} isn't supported: the /ID is set "
+                                   f"through PdfWriter._ID, checked on pypdf {PYPDF_MAJOR}.x only")
+            writer._ID = ArrayObject([ByteStringObject(bytes.fromhex(doc_id[:32]))] * 2)
+        for page_num in page_numbers:
+            writer.add_page(reader.pages[page_num])
+        if not optimize and not linearize:
             with open(output_filepath, 'wb') as out_file:
                 writer.write(out_file)
-                
-            print(f" -> Successfully saved: {output_filepath}")
-            
+        else:
+            profile = OPTIMIZE_PROFILES.get(optimize)
+            if profile:
+                before = io.BytesIO()
+                writer.write(before)
+                plain = len(before.getvalue())
+                optimize_writer(writer, profile)
+            document = io.BytesIO()
+            writer.write(document)
+            with open(output_filepath, 'wb') as out_file:
+                if linearize:
+                    # a linearised file keeps a classic xref table, so no object streams
+                    linearize_pages(PdfReader(document), out_file, doc_id)
+                elif profile["object_streams"]:
+                    # pypdf can't write object streams; re-serialise its output
+                    packed = PdfReader(document)
+                    stream_pages(packed, range(len(packed.pages)), out_file, doc_id,
+                                 object_streams=True)
+                else:
+                    out_file.write(document.getvalue())
+            problems = check_linearization(output_filepath) if linearize else []
+            if problems:
+                raise ValueError(f"{output_filepath}: linearisation check failed: "
+                                 + "; ".join(problems))
+    return output_filepath, len(page_numbers), time.perf_counter() - started, peak_rss_mib(), plain
+
+def plan_outputs(output_dir, categories, layout="merged", common_range=COMMON_RANGE):
+    """[(label, output path, page ranges)] for one source in the given layout."""
+    outputs = []
+    if layout in ("merged", "both"):
+        # Common Core Units pages (10 to 18), then the category's own units
+        outputs += [(name, os.path.join(output_dir, f"{name}.pdf"), [common_range, pages])
+                    for name, pages in categories.items()]
+    if layout in ("split", "both"):
+        outputs.append((COMMON_CORE_NAME, os.path.join(output_dir, f"{COMMON_CORE_NAME}.pdf"),
+                        [common_range]))
+        outputs += [(f"{name}_Only", os.path.join(output_dir, f"{name}_Only.pdf"), [pages])
+                    for name, pages in categories.items()]
+    return outputs
+
+def file_entry(path, pages):
+    """Manifest entry for a written PDF: file name, page count, size and sha256."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    return {"file": os.path.basename(path), "pages": pages, "bytes": len(data),
+            "sha256": hashlib.sha256(data).hexdigest()}
+
+def write_manifest(pdf_path, output_dir, categories, results, common_range=COMMON_RANGE):
+    """
+    Describe a split layout for the app: fetch and cache `common` once, then
+    only the category's `units`; the full course is common + units, in that
+    order. `merged` names the self-contained file when it was written too.
+    """
+    written = {os.path.basename(path): pages for path, pages, *_ in results}
+
+    def entry(filename):
+        if filename in written:
+            return file_entry(os.path.join(output_dir, filename), written[filename])
+
+    manifest = {
+        "version": 1,
+        "source": os.path.basename(pdf_path),
+        "common": dict(entry(f"{COMMON_CORE_NAME}.pdf"), sourcePages=list(common_range)),
+        "categories": {},
+    }
+    for name, pages in categories.items():
+        manifest["categories"][name] = {
+            "sourcePages": list(pages),
+            "units": entry(f"{name}_Only.pdf"),
+            "merged": entry(f"{name}.pdf"),
+        }
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest_path
+
+def split_sources(sources, jobs=1, layout="merged", force=False, stream=False, optimize=None,
+                  linearize=False):
+    """
+    Build the category PDFs of several curricula at once.
+
+    `sources` is a list of (pdf_path, output_dir[, categories]) entries, where
+    categories defaults to CATEGORIES. Every output PDF of every source is one
+    task; with jobs > 1 they are shared out over a pool of at most `jobs`
+    (and MAX_WORKERS) processes, so the run scales with cores rather than
+    with the number of categories. `layout` is one of LAYOUTS.
+
+    Outputs whose inputs haven't changed since the last run (see CACHE_NAME)
+    are left alone unless `force` is set. `stream` copies pages with bounded
+    memory (see stream_pages); peak RSS is reported either way. `optimize`
+    names an OPTIMIZE_PROFILES entry, and the size saved is reported per PDF.
+    `linearize` writes fast web view PDFs (see linearize_pages), each checked
+    once written, and reports how much of each file page 1 needs.
+    """
+    check_options(stream, optimize, linearize)
+    if optimize:
+        for step in optional_steps(OPTIMIZE_PROFILES[optimize]):
+            print(f"Note: skipping {step}")
+    tasks, labels, spans, results, caches = [], [], [], [], {}
+    for source in sources:
+        pdf_path, output_dir = source[0], source[1]
+        categories = source[2] if len(source) > 2 else CATEGORIES
+        if not os.path.exists(pdf_path):
+            raise FileNotFoundError(pdf_path)
+        # Create the output directory if it doesn't exist
+        os.makedirs(output_dir, exist_ok=True)
+        print(f"Loaded '{pdf_path}' with {len(open_source(pdf_path, stream).pages)} pages.")
+        source_hash = file_digest(pdf_path)
+        cache = caches.get(output_dir) or caches.setdefault(output_dir, load_cache(output_dir))
+        first = len(results)
+        for label, path, ranges in plan_outputs(output_dir, categories, layout):
+            key = build_key(source_hash, ranges, stream=stream, optimize=optimize,
+                            tools=optimize and [t is not None for t in (Image, font_subset)],
+                            linearize=linearize)
+            entry = cache["files"].get(os.path.basename(path))
+            labels.append(label)
+            if not force and is_fresh(entry, path, key):
+                results.append((path, entry["pages"], None, None, None))
+            else:
+                tasks.append((len(results), output_dir, key,
+                              (pdf_path, path, ranges, key, stream, optimize, linearize)))
+                results.append(None)
+        spans.append((pdf_path, output_dir, categories, first, len(results)))
+
+    workers = max(1, min(jobs, MAX_WORKERS, len(tasks)))
+    print(f"Rebuilding {len(tasks)} of {len(results)} PDFs with {workers} worker(s)...\n")
+    started = time.perf_counter()
+    if workers == 1:
+        built = [build_pdf(*args) for *_, args in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            built = list(pool.map(build_pdf, *zip(*(args for *_, args in tasks))))
+    for (index, output_dir, key, _), result in zip(tasks, built):
+        results[index] = result
+        path, pages = result[:2]
+        caches[output_dir]["files"][os.path.basename(path)] = {
+            "key": key, "pages": pages, "sha256": file_digest(path)}
+    for output_dir, cache in caches.items():
+        save_cache(output_dir, cache)
+
+    for label, (path, pages, seconds, rss, plain) in zip(labels, results):
+        timing = "unchanged" if seconds is None else f"{seconds:6.2f}s"
+        memory = f"{rss:6.1f} MiB" if rss is not None else ""
+        print(f" -> {label:<39} {pages:3d} pages {timing:>9} {memory:>10}  {path}")
+        if plain:
+            size = os.path.getsize(path)
+            print(f"    {plain / 1024:8.1f} KiB -> {size / 1024:8.1f} KiB "
+                  f"({100 * (plain - size) / plain:4.1f}% smaller)")
+        if linearize:
+            with open(path, 'rb') as f:
+                params = linearization_params(f.read(1024))[1]
+            print(f"    linearised: page 1 is in the first {params['/E'] / 1024:.1f} KiB "
+                  f"of {params['/L'] / 1024:.1f} KiB")
+    wall = time.perf_counter() - started
+    busy = sum(result[2] for result in built)
+    print(f"\nRebuilt {len(built)} PDFs, {len(results) - len(built)} unchanged, in {wall:.2f}s "
+          f"({busy:.2f}s of work over {workers} worker(s))")
+    if resource is not None:
+        workers_rss = max([peak_rss_mib("children")] + [r[3] for r in built if workers > 1])
+        print(f"Peak RSS: {peak_rss_mib():.1f} MiB in this process"
+              + (f", {workers_rss:.1f} MiB per worker" if workers > 1 else "")
+              + (" (streaming)" if stream else ""))
+
+    if layout in ("split", "both"):
+        for pdf_path, output_dir, categories, first, last in spans:
+            manifest_path = write_manifest(pdf_path, output_dir, categories, results[first:last])
+            print(f" -> Manifest saved: {manifest_path}")
+    return results
+
+def split_and_merge_to_pdf(pdf_path, output_dir, jobs=1, layout="merged", force=False,
+                           stream=False, optimize=None, linearize=False):
+    check_options(stream, optimize, linearize)  # a usage error, not reported as a failed run
+    try:
+        return split_sources([(pdf_path, output_dir)], jobs, layout, force, stream, optimize,
+                             linearize)
     except FileNotFoundError:
         print(f"Error: The file '{pdf_path}' was not found. Please check the file name and path.")
     except Exception as e:
@@ -54,11 +1075,48 @@ def split_and_merge_to_pdf(pdf_path, output_dir):
 if __name__ == "__main__":
     # --- CONFIGURATION ---
     # Put the exact name of your source PDF file here
-    INPUT_PDF = "New Driving Curriculum Ntsa.pdf" 
-    
+    INPUT_PDF = "New Driving Curriculum Ntsa.pdf"
+
     # Folder where the new PDFs will be saved
     OUTPUT_FOLDER = "Categorized_License_PDFs"
-    
+
+    parser = argparse.ArgumentParser(description="Split the NTSA curriculum into category PDFs.")
+    parser.add_argument("input", nargs="?", default=INPUT_PDF)
+    parser.add_argument("output", nargs="?", default=OUTPUT_FOLDER)
+    parser.add_argument("-j", "--jobs", type=int, default=min(os.cpu_count() or 1, MAX_WORKERS),
+                        help=f"worker processes (default: one per core, at most {MAX_WORKERS})")
+    parser.add_argument("--layout", choices=LAYOUTS, default="merged",
+                        help="merged: one full PDF per category (default); split: the common "
+                             "core once + category-only PDFs + manifest.json; both")
+    parser.add_argument("--force", action="store_true",
+                        help=f"rebuild every PDF, ignoring {CACHE_NAME}")
+    parser.add_argument("--stream", action="store_true",
+                        help="copy pages one at a time so memory is bounded by the largest page")
+    parser.add_argument("--optimize", choices=sorted(OPTIMIZE_PROFILES),
+                        help="shrink the PDFs for download (mobile: recompressed content, "
+                             "subset fonts, downsampled images, object streams)")
+    parser.add_argument("--linearize", action="store_true",
+                        help="write linearised (fast web view) PDFs, so a viewer reading byte "
+                             "ranges can show page 1 before the rest has downloaded")
+    parser.add_argument("--check-linearized", nargs="+", metavar="PDF",
+                        help="only check that the given PDFs are validly linearised")
+    args = parser.parse_args()
+    try:
+        check_options(args.stream, args.optimize, args.linearize)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.check_linearized:
+        failed = 0
+        for path in args.check_linearized:
+            problems = check_linearization(path)
+            print(f"{path}: {'not linearised' if problems else 'OK'}")
+            for problem in problems:
+                print(f"  - {problem}")
+            failed += bool(problems)
+        sys.exit(1 if failed else 0)
+
     print("Starting PDF separation process...\n")
-    split_and_merge_to_pdf(INPUT_PDF, OUTPUT_FOLDER)
-    print("\nDone! All customized category PDFs are ready.")
\ No newline at end of file
+    split_and_merge_to_pdf(args.input, args.output, args.jobs, args.layout, args.force,
+                           args.stream, args.optimize, args.linearize)
+    print("\nDone! All customized category PDFs are ready.")